@@ -0,0 +1,128 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """
+    Audit entries, written off the request thread.
+
+    ``record`` puts the entry on a bounded in-memory queue and returns; a
+    daemon thread (started on first use in each process) inserts the queue
+    in batches of up to ``AUDIT_BATCH_SIZE``, waiting at most
+    ``AUDIT_FLUSH_SECONDS`` for a batch to fill. When the queue is full, or
+    an insert fails, entries are dropped and counted rather than slowing
+    requests down. ``flush`` writes what is queued from the calling thread
+    (tests, exit).
+    """
+
+    def __init__(self, maxsize=10000):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.written = self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def record(self, **entry):
+        entry.setdefault("created_at", timezone.now())
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if settings.AUDIT_BACKGROUND_FLUSH:
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        # threads do not survive a fork (gunicorn, Celery prefork): one per process
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is None:
+                atexit.register(self.flush)
+            self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + settings.AUDIT_FLUSH_SECONDS
+            while len(batch) < settings.AUDIT_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            connection.close_if_unusable_or_obsolete()
+            self.write(batch)
+
+    def write(self, batch):
+        from apps.core.models import AuditEntry
+
+        try:
+            AuditEntry.objects.bulk_create(AuditEntry(**entry) for entry in batch)
+        except Exception:
+            logger.exception(f"Could not write {len(batch)} audit entries")
+            self.dropped += len(batch)
+        else:
+            self.written += len(batch)
+
+    def flush(self):
+        """Write every queued entry now, in batches; returns how many were taken."""
+        batch, taken = [], 0
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) == settings.AUDIT_BATCH_SIZE:
+                self.write(batch)
+                taken, batch = taken + len(batch), []
+        if batch:
+            self.write(batch)
+        return taken + len(batch)
+
+
+audit_log = AuditLog(maxsize=settings.AUDIT_QUEUE_SIZE)
+
+
+def audit_entry(view, request, response):
+    user = request.user
+    object_id = view.kwargs.get(getattr(view, "lookup_url_kwarg", None) or getattr(view, "lookup_field", "pk"), "")
+    if not object_id and response.status_code == 201 and isinstance(response.data, dict):
+        object_id = response.data.get("id", "")
+    return {
+        "actor_id": user.pk if user.is_authenticated else None,
+        "actor_email": getattr(user, "email", "") or "",
+        "view": view.__class__.__name__,
+        "action": getattr(view, "action", None) or request.method.lower(),
+        "method": request.method,
+        "path": request.path[:255],
+        "object_id": str(object_id)[:64],
+        "status": response.status_code,
+    }
+
+
+class AuditMixin:
+    """Audit every non-safe request to the view, refused ones included."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            audit_log.record(**audit_entry(self, request, response))
+        return response
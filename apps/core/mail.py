@@ -0,0 +1,198 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+# refused by the server for this message only; anything else (disconnects,
+# timeouts, auth) is the connection's fault and fails the whole run
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def queue_email(subject, body, to, kind="", from_email=None):
+    """Queue an email; delivery is kicked off when the current transaction commits."""
+    return queue_emails([{"subject": subject, "body": body, "to": to, "kind": kind, "from_email": from_email}])[0]
+
+
+def queue_emails(messages):
+    """Queue several emails (dicts of ``queue_email``'s arguments) with one insert."""
+    from .tasks import deliver_email
+
+    emails = QueuedEmail.objects.bulk_create(
+        QueuedEmail(
+            subject=message["subject"],
+            body=message["body"],
+            to=list(message["to"]),
+            kind=message.get("kind", ""),
+            from_email=message.get("from_email") or settings.DEFAULT_FROM_EMAIL,
+        )
+        for message in messages
+    )
+    transaction.on_commit(deliver_email.delay, robust=True)
+    return emails
+
+
+class ConnectionPool:
+    """
+    Open email backend connections, one per worker thread, reused across
+    batches.
+
+    SMTP login and TLS setup cost more than sending a message, so the
+    connection is kept open between runs; it is replaced when it has been
+    idle longer than ``max_idle`` seconds (servers drop idle clients), when
+    a NOOP fails, or after a fork.
+    """
+
+    def __init__(self, max_idle=60):
+        self.max_idle = max_idle
+        self.opened = 0
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            # inherited through a fork: the socket belongs to the parent
+            self._local.__dict__.update(connection=None, used=0.0, pid=os.getpid())
+        return self._local.connection
+
+    def get(self):
+        connection = self.connection
+        if connection is not None and (time.monotonic() - self._local.used > self.max_idle or not self._alive()):
+            self.discard()
+            connection = None
+        if connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            self._local.connection = connection
+            self.opened += 1
+        self._local.used = time.monotonic()
+        return connection
+
+    def _alive(self):
+        smtp = getattr(self.connection, "connection", None)
+        if smtp is None:
+            # not SMTP (locmem, console, ...): nothing to go stale
+            return not hasattr(self.connection, "connection")
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def discard(self):
+        connection, self._local.connection = self.connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+pool = ConnectionPool(max_idle=settings.EMAIL_CONNECTION_MAX_IDLE)
+
+
+def backoff(attempts):
+    """Delay before attempt ``attempts + 1``: doubling from ``EMAIL_RETRY_DELAY``, capped at an hour."""
+    return timedelta(seconds=min(3600, settings.EMAIL_RETRY_DELAY * 2 ** (attempts - 1)))
+
+
+def as_message(email):
+    return EmailMessage(email.subject, email.body, email.from_email, email.to)
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to ``batch_size`` due emails for this worker; returns them.
+
+    One short transaction: the rows are switched from pending to sending
+    with a conditional update, so two workers never take the same email
+    (SQLite has no ``SKIP LOCKED``; elsewhere it keeps them from queueing
+    on each other). The claim lasts ``EMAIL_CLAIM_SECONDS``: rows of a
+    worker that died mid-batch are due again after it.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=QueuedEmail.DUE_STATUSES, send_after__lte=now)
+            .order_by("send_after", "id")[:batch_size]
+        )
+        QueuedEmail.objects.filter(
+            pk__in=[email.pk for email in emails], status__in=QueuedEmail.DUE_STATUSES, send_after__lte=now
+        ).update(status=QueuedEmail.STATUS_SENDING, send_after=now + timedelta(seconds=settings.EMAIL_CLAIM_SECONDS))
+    return emails
+
+
+def deliver_batch(connection, batch_size):
+    """
+    Send up to ``batch_size`` due emails over ``connection``; returns
+    ``(sent, taken)``, the second counting refused messages too.
+
+    The batch is claimed first (``claim_batch``) and sent with no
+    transaction open. A message the server refuses is retried later with
+    backoff, up to ``EMAIL_MAX_ATTEMPTS``. A connection error stops the
+    batch: what was sent is marked sent, the rest is released, and the
+    error is raised for the caller to retry.
+    """
+    emails = claim_batch(batch_size)
+    now = timezone.now()
+    sent, error = [], None
+    for position, email in enumerate(emails):
+        try:
+            connection.send_messages([as_message(email)])
+        except MESSAGE_ERRORS as exc:
+            email.attempts += 1
+            email.last_error = str(exc)[:1000]
+            if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                email.status = QueuedEmail.STATUS_FAILED
+                logger.error(f"Giving up on email {email.pk} after {email.attempts} attempts: {exc}")
+            else:
+                email.status, email.send_after = QueuedEmail.STATUS_PENDING, now + backoff(email.attempts)
+            email.save(update_fields=["attempts", "last_error", "status", "send_after"])
+        except Exception as exc:
+            error = exc
+            unsent = [email.pk for email in emails[position:]]
+            QueuedEmail.objects.filter(pk__in=unsent).update(status=QueuedEmail.STATUS_PENDING, send_after=now)
+            break
+        else:
+            sent.append(email.pk)
+    QueuedEmail.objects.filter(pk__in=sent).update(status=QueuedEmail.STATUS_SENT, sent_at=timezone.now())
+    if error is not None:
+        raise error
+    return len(sent), len(emails)
+
+
+def deliver_emails(batch_size=None, max_batches=None):
+    """
+    Send every due email, ``batch_size`` (default ``EMAIL_BATCH_SIZE``) at a
+    time over the pooled connection. Returns ``{"sent": n, "batches": n}``.
+    """
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    report = {"sent": 0, "batches": 0}
+    while max_batches is None or report["batches"] < max_batches:
+        try:
+            sent, taken = deliver_batch(pool.get(), batch_size)
+        except Exception:
+            pool.discard()
+            raise
+        report["sent"] += sent
+        report["batches"] += 1 if taken else 0
+        if taken < batch_size:
+            break
+    if report["sent"]:
+        logger.info("core.mail", extra=report)
+    return report
+
+
+def prune_sent(retention):
+    """Delete emails sent more than ``retention`` ago."""
+    return QueuedEmail.objects.filter(sent_at__lt=timezone.now() - retention).delete()[0]
@@ -0,0 +1,153 @@
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single ``bytes=`` range, or ``None``
+    to send the whole file (no header, several ranges or a malformed one).
+    Raises ``ValueError`` when the range starts past the end of the file.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # invalid: ignored, as RFC 9110 allows
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+class FileRange:
+    """
+    Read-only view of ``length`` bytes of an unbuffered file from its
+    current position.
+
+    Exposes ``fileno()`` so a WSGI server with ``wsgi.file_wrapper`` can
+    ``sendfile()`` from the descriptor (gunicorn sends ``Content-Length``
+    bytes from the descriptor's offset); otherwise it is read in blocks.
+    It has no ``name`` and is not seekable, so ``FileResponse`` leaves
+    ``Content-Length`` to the caller.
+    """
+
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size) if size else b""
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.fh.fileno()
+
+    def tell(self):
+        return self.fh.tell()
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.fh.close()
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _range_applies(request, etag, mtime):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/"')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(mtime) <= date
+
+
+def serve_media(request, name, content_type=None, root=None):
+    """
+    Respond with the file stored at ``name`` under ``root`` (``MEDIA_ROOT``).
+
+    Supports a single byte range (``206``, ``416`` past the end), conditional
+    requests on ``ETag``/``Last-Modified`` (``304``) and ``If-Range``, and is
+    cached privately for ``MEDIA_CACHE_SECONDS``. ``MEDIA_SERVE_BACKEND``
+    picks the delivery:
+
+    * ``"python"`` (default): a ``FileResponse`` over the descriptor, which
+      ``sendfile``-capable servers such as gunicorn send zero-copy.
+    * ``"x-accel-redirect"``: an empty response naming
+      ``MEDIA_ACCEL_PREFIX + name`` for nginx to serve (it handles ranges).
+    * ``"x-sendfile"``: the same with the absolute path (Apache, lighttpd).
+
+    The caller does the permission checks.
+    """
+    root = os.path.realpath(root or settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep):
+        raise Http404("Invalid media path.")
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("Media file not found.")
+
+    content_type = content_type or "application/octet-stream"
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": f"private, max-age={getattr(settings, 'MEDIA_CACHE_SECONDS', 3600)}",
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        return HttpResponse(status=304, headers=headers)
+
+    backend = getattr(settings, "MEDIA_SERVE_BACKEND", "python")
+    if backend == "x-accel-redirect":
+        prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+        headers["X-Accel-Redirect"] = quote(prefix.rstrip("/") + "/" + name)
+        return HttpResponse(content_type=content_type, headers=headers)
+    if backend == "x-sendfile":
+        headers["X-Sendfile"] = path
+        return HttpResponse(content_type=content_type, headers=headers)
+
+    size = stat.st_size
+    try:
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+    except ValueError:
+        return HttpResponse(status=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is not None and not _range_applies(request, etag, stat.st_mtime):
+        byte_range = None
+
+    start, end = byte_range or (0, size - 1)
+    fh = open(path, "rb", buffering=0)
+    fh.seek(start)
+    response = FileResponse(FileRange(fh, end - start + 1), content_type=content_type, headers=headers)
+    response.block_size = 64 * 1024
+    response["Content-Length"] = end - start + 1
+    if byte_range is not None:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return response
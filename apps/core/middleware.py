@@ -0,0 +1,100 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from apps.core import performance
+from apps.core.nplusone import flag_violations, track_queries
+
+logger = logging.getLogger(__name__)
+
+
+def view_key(request, view_func):
+    """``ViewSet.action`` for DRF views, the URL name for plain Django views."""
+    cls = getattr(view_func, "cls", None)
+    if cls is not None:
+        actions = getattr(view_func, "actions", None) or {}
+        method = request.method.lower()
+        return f"{cls.__name__}.{actions.get(method, method)}"
+    match = request.resolver_match
+    return match.view_name if match else getattr(view_func, "__name__", "unknown")
+
+
+class PerformanceMiddleware:
+    """
+    Per-request cost accounting: wall time, DB queries and DB time (through
+    ``connection.execute_wrapper``), named timers such as ``serializer`` and
+    ``render``, and response size.
+
+    Results go to the ``Server-Timing`` header, a structured log line and the
+    rolling per-endpoint stats served by ``PerformanceMetricsView``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "PERFORMANCE_SERVER_TIMING", True)
+
+    def __call__(self, request):
+        metrics = performance.RequestMetrics()
+        token = performance.activate(metrics)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            performance.deactivate(token)
+
+        metrics.finish()
+        if not response.streaming:
+            metrics.response_size = len(response.content)
+        key = getattr(request, "performance_view", None) or "unresolved"
+        performance.endpoint_stats.record(key, metrics)
+
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing()
+        logger.info(
+            "request.metrics",
+            extra={
+                "view": key,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **metrics.as_dict(),
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.performance_view = view_key(request, view_func)
+
+    def process_template_response(self, request, response):
+        metrics = performance.current_metrics()
+        if metrics is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(lambda _: metrics.add("render", time.perf_counter() - start))
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Track repeated query shapes per request when ``NPLUSONE_ENABLED`` is set.
+
+    Violations are logged as warnings (staging) or raised as ``NPlusOneError``
+    with ``NPLUSONE_RAISE`` (test suite), naming the view and the code that
+    issued the repeated query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "NPLUSONE_ENABLED", False):
+            return self.get_response(request)
+        with track_queries() as tracker:
+            response = self.get_response(request)
+        view = getattr(request, "performance_view", None) or "unresolved"
+        flag_violations(tracker, f"{view} ({request.method} {request.path})")
+        return response
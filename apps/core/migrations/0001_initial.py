@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('actor_email', models.CharField(blank=True, max_length=254)),
+                ('view', models.CharField(max_length=100)),
+                ('action', models.CharField(max_length=50)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('object_id', models.CharField(blank=True, max_length=64)),
+                ('status', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='audit_created_at_idx'), models.Index(fields=['actor_id', 'created_at'], name='audit_actor_idx')],
+            },
+        ),
+    ]
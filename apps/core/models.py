@@ -1,9 +1,13 @@
 import uuid
-from django.db import models
+from django.db import NotSupportedError, models
 from django.utils import timezone
 from django.conf import settings
 
 
+def has_updated_at(model):
+    return any(field.name == "updated_at" for field in model._meta.concrete_fields)
+
+
 class SoftDeleteQuerySet(models.QuerySet):
     def delete(self):
         return super().update(is_deleted=True, deleted_at=timezone.now())
@@ -15,7 +19,11 @@ class SoftDeleteQuerySet(models.QuerySet):
         return self.delete()
 
     def restore(self):
-        return super().update(is_deleted=False, deleted_at=None)
+        # restoring clears deleted_at, so move updated_at for change feeds to see it
+        fields = {"is_deleted": False, "deleted_at": None}
+        if has_updated_at(self.model):
+            fields["updated_at"] = timezone.now()
+        return super().update(**fields)
 
 
 class TimestampedModel(models.Model):
@@ -60,4 +68,104 @@ class SoftDeleteModel(models.Model):
     def restore(self):
         self.is_deleted = False
         self.deleted_at = None
-        self.save(update_fields=["is_deleted", "deleted_at"])
+        update_fields = ["is_deleted", "deleted_at"]
+        if has_updated_at(type(self)):
+            update_fields.append("updated_at")
+        self.save(update_fields=update_fields)
+
+
+class AuditQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise NotSupportedError("Audit entries are append-only.")
+
+    def delete(self):
+        raise NotSupportedError("Audit entries are append-only.")
+
+
+class AuditEntry(models.Model):
+    """
+    One mutating API request (see ``apps.core.audit``). Rows are only ever
+    inserted; ``update``/``delete`` raise.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now)
+    # no foreign key: entries outlive users and are never rewritten by a cascade
+    actor_id = models.PositiveBigIntegerField(null=True, blank=True)
+    actor_email = models.CharField(max_length=254, blank=True)
+    view = models.CharField(max_length=100)
+    action = models.CharField(max_length=50)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    object_id = models.CharField(max_length=64, blank=True)
+    status = models.PositiveSmallIntegerField()
+
+    objects = AuditQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # time ranges and keyset pages
+            models.Index(fields=["created_at", "id"], name="audit_created_at_idx"),
+            models.Index(fields=["actor_id", "created_at"], name="audit_actor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_email or 'anonymous'} {self.method} {self.path} {self.status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise NotSupportedError("Audit entries are append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise NotSupportedError("Audit entries are append-only.")
+
+
+class QueuedEmail(models.Model):
+    """
+    An email waiting for, or done with, delivery by ``apps.core.mail``.
+    Queued in the transaction that wants it sent, so it is never sent for a
+    change that rolled back, nor lost with a broker message.
+    """
+
+    STATUS_PENDING = "pending"
+    # claimed by a worker until ``send_after``; due again if it never reports back
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    DUE_STATUSES = [STATUS_PENDING, STATUS_SENDING]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    # e.g. "verify-email", to tell messages apart in the admin / tests
+    kind = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # next attempt not before (pushed back after each failure)
+    send_after = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(
+                fields=["send_after", "id"],
+                condition=models.Q(status__in=["pending", "sending"]),
+                name="queued_email_due_idx",
+            ),
+            # pruning
+            models.Index(fields=["sent_at"], name="queued_email_sent_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind or 'email'} to {', '.join(self.to)} ({self.status})"
@@ -0,0 +1,14 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class FirstRendererNegotiation(DefaultContentNegotiation):
+    """
+    Always the view's first renderer, whatever ``Accept`` or ``?format=`` say.
+
+    For endpoints whose body is not negotiated: file downloads, where the
+    renderer only formats errors, and exports, where ``?format=`` names the
+    file format rather than a renderer.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
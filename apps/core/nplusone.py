@@ -0,0 +1,103 @@
+import logging
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+_SPACE_RE = re.compile(r"\s+")
+
+APPS_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    """SQL with parameter lists collapsed, so per-row variants of a query compare equal."""
+    return _SPACE_RE.sub(" ", _IN_LIST_RE.sub("IN (...)", sql)).strip()
+
+
+def query_origin():
+    """First frame in project code outside this module: usually the serializer field or view."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APPS_DIR) and filename != __file__:
+            return f"{Path(filename).relative_to(Path(APPS_DIR).parent)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryShapeTracker:
+    """
+    ``execute_wrapper`` that counts queries by shape.
+
+    The call site is captured once per shape, when it first reaches the
+    threshold, so the stack walk is not paid on every query.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, "NPLUSONE_THRESHOLD", 5)
+        self.counts = Counter()
+        self.origins = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = query_shape(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold:
+            self.origins[shape] = query_origin()
+        return execute(sql, params, many, context)
+
+    def violations(self):
+        return [
+            (shape, count, self.origins.get(shape, "unknown"))
+            for shape, count in self.counts.items()
+            if count >= self.threshold
+        ]
+
+    def report(self, label):
+        lines = [f"Repeated queries in {label}:"]
+        for shape, count, origin in self.violations():
+            lines.append(f"  {count}x from {origin}: {shape[:300]}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def track_queries(threshold=None):
+    tracker = QueryShapeTracker(threshold)
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(tracker))
+        yield tracker
+
+
+def flag_violations(tracker, label, raise_errors=None):
+    if not tracker.violations():
+        return
+    if raise_errors is None:
+        raise_errors = getattr(settings, "NPLUSONE_RAISE", False)
+    message = tracker.report(label)
+    if raise_errors:
+        raise NPlusOneError(message)
+    logger.warning(message)
+
+
+@contextmanager
+def detect_nplusone(label, threshold=None, raise_errors=None):
+    """
+    Flag query shapes repeated ``threshold`` or more times inside the block.
+
+    Logs a warning by default; raises ``NPlusOneError`` when ``raise_errors``
+    (or ``settings.NPLUSONE_RAISE``) is set, as in the test suite.
+    """
+    with track_queries(threshold) as tracker:
+        yield tracker
+    flag_violations(tracker, label, raise_errors)
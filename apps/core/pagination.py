@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(position) -> str:
+    payload = json.dumps(position, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(encoded: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+    except (TypeError, ValueError, UnicodeError):
+        raise NotFound("Invalid cursor.")
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek pagination on ``(created_at, id)``, newest first.
+
+    Unlike page numbers, the cost of a page does not grow with its depth: each
+    page is a range scan that starts right after the last row of the previous
+    one, so it needs an index on ``(created_at, id)``.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    timestamp_field = "created_at"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self.get_seek_filter(decode_cursor(encoded)))
+
+        queryset = queryset.order_by(f"-{self.timestamp_field}", "-id")
+        rows = list(queryset[: self.page_size + 1])
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            last = rows[-1]
+            self.next_position = [getattr(last, self.timestamp_field).isoformat(), last.pk]
+        return rows
+
+    def get_seek_filter(self, position):
+        try:
+            timestamp, pk = position
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor.")
+        if not isinstance(timestamp, datetime):
+            raise NotFound("Invalid cursor.")
+        field = self.timestamp_field
+        return Q(**{f"{field}__lt": timestamp}) | Q(**{field: timestamp, "id__lt": pk})
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            size = int(value)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "first": self.get_first_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "first": {"type": "string", "format": "uri"},
+                "results": schema,
+            },
+        }
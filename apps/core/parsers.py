@@ -0,0 +1,33 @@
+import io
+import re
+
+from rest_framework.parsers import JSONParser, get_encoding
+
+from apps.core.renderers import FastJSONRenderer, orjson
+
+# orjson turns integers past 64 bits into floats; let the stdlib read those
+_LONG_NUMBER_RE = re.compile(rb"\d{19,}")
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` decoding with orjson when it is installed.
+
+    orjson only reads UTF-8 and 64-bit integers; other bodies (a declared
+    non-UTF-8 charset, 19+ digit numbers) and invalid JSON go through the
+    stdlib parser, so parsed values and error messages stay the same.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or get_encoding(parser_context or {}).lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _LONG_NUMBER_RE.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Cost counters for a single request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.query_count = 0
+        self.db_time = 0.0
+        self.timers = defaultdict(float)
+        self.response_size = None
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+
+    def add(self, name, seconds):
+        self.timers[name] += seconds
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total * 1000, 3),
+            "db_ms": round(self.db_time * 1000, 3),
+            "db_queries": self.query_count,
+            **{f"{name}_ms": round(value * 1000, 3) for name, value in self.timers.items()},
+            "response_bytes": self.response_size,
+        }
+
+    def server_timing(self):
+        parts = [
+            f"total;dur={self.total * 1000:.3f}",
+            f'db;dur={self.db_time * 1000:.3f};desc="{self.query_count} queries"',
+        ]
+        parts += [f"{name};dur={value * 1000:.3f}" for name, value in self.timers.items()]
+        return ", ".join(parts)
+
+
+def current_metrics():
+    return _current_metrics.get()
+
+
+def activate(metrics):
+    return _current_metrics.set(metrics)
+
+
+def deactivate(token):
+    _current_metrics.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to timer ``name`` of the current request, if any."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+class EndpointStats:
+    """
+    Rolling window of the last ``window`` requests per endpoint.
+
+    Samples are ``(total_ms, db_ms, db_queries, response_bytes)`` tuples; the
+    histogram and percentiles are computed from the window when read, so old
+    traffic ages out and a regression shows up within ``window`` requests.
+    """
+
+    def __init__(self, window=None):
+        self.window = window or getattr(settings, "PERFORMANCE_METRICS_WINDOW", 1000)
+        self._samples = {}
+        self._totals = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, key, metrics):
+        sample = (
+            metrics.total * 1000,
+            metrics.db_time * 1000,
+            metrics.query_count,
+            metrics.response_size or 0,
+        )
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._totals[key] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def snapshot(self):
+        with self._lock:
+            windows = {key: list(samples) for key, samples in self._samples.items()}
+            totals = dict(self._totals)
+        return {key: self._summarize(samples, totals[key]) for key, samples in sorted(windows.items())}
+
+    @staticmethod
+    def _summarize(samples, total):
+        latencies = sorted(sample[0] for sample in samples)
+        count = len(latencies)
+
+        def pct(point):
+            return round(latencies[min(count - 1, int(point / 100 * count))], 3)
+
+        buckets = {f"le_{bound}": 0 for bound in LATENCY_BUCKETS_MS}
+        buckets["gt_%d" % LATENCY_BUCKETS_MS[-1]] = 0
+        for latency in latencies:
+            for bound in LATENCY_BUCKETS_MS:
+                if latency <= bound:
+                    buckets[f"le_{bound}"] += 1
+                    break
+            else:
+                buckets["gt_%d" % LATENCY_BUCKETS_MS[-1]] += 1
+
+        return {
+            "requests": total,
+            "window": count,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(latencies[-1], 3),
+            "avg_db_ms": round(sum(sample[1] for sample in samples) / count, 3),
+            "avg_db_queries": round(sum(sample[2] for sample in samples) / count, 2),
+            "avg_response_bytes": round(sum(sample[3] for sample in samples) / count),
+            "histogram_ms": buckets,
+        }
+
+
+endpoint_stats = EndpointStats()
@@ -0,0 +1,58 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to DRF's stdlib encoder
+    orjson = None
+
+# DRF's encoder rules for what orjson is told to pass through: datetimes
+# (millisecond precision, "Z" for UTC), Decimal, lazy strings, querysets...
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    """``data`` as compact UTF-8 JSON bytes, the same as ``JSONRenderer`` output."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    content = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+    if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+        # JSONRenderer escapes these for JavaScript embedding
+        content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return content
+
+
+def iter_json_array(chunks):
+    """Encode an iterable of lists as one JSON array, yielding bytes per list."""
+    yield b"["
+    first = True
+    for items in chunks:
+        if not items:
+            continue
+        encoded = dumps(items)[1:-1]  # drop the list's own brackets
+        yield encoded if first else b"," + encoded
+        first = False
+    yield b"]"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson when it is installed.
+
+    Produces the same bytes as the stdlib path for API data (strings,
+    numbers, nested dicts/lists); only the types orjson cannot encode go
+    through DRF's encoder. Indented output (``; indent=`` in the Accept
+    header) and non-compact settings keep using the stdlib path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
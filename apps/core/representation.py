@@ -0,0 +1,241 @@
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.fields.files import FieldFile
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+from apps.core.performance import timed
+from apps.core.renderers import iter_json_array
+
+# Serializer fields whose to_representation returns database values unchanged
+# (method fields are given a lookup that already yields their output)
+_PASSTHROUGH_FIELDS = (
+    serializers.SerializerMethodField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+def _converter(serializer, field):
+    if isinstance(field, _PASSTHROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.FileField):
+        # values() gives the stored name; the field wants a FieldFile for .url
+        model_field = serializer.Meta.model._meta.get_field(field.source)
+        return lambda name: field.to_representation(FieldFile(None, model_field, name))
+    return field.to_representation
+
+
+def _dict_expression(serializer, lookups, prefix, namespace, fields):
+    items = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        lookup = lookups[name] if name in lookups else field.source.replace(".", "__")
+        if lookup is None:
+            items.append(f"{name!r}: None")
+            continue
+        if lookup == "*":
+            raise ImproperlyConfigured(f"{type(serializer).__name__}.{name} needs an entry in lookups.")
+        if isinstance(field, serializers.ListSerializer):
+            raise ImproperlyConfigured(f"{type(serializer).__name__}.{name} is a list: give it a None lookup.")
+        lookup = prefix + lookup
+        if lookup not in fields:
+            fields.append(lookup)
+        if isinstance(field, serializers.BaseSerializer):
+            # nested object over a foreign key: its columns come through the join
+            nested = _dict_expression(field, {}, f"{lookup}__", namespace, fields)
+            items.append(f"{name!r}: None if row[{lookup!r}] is None else {nested}")
+            continue
+        convert = _converter(serializer, field)
+        if convert is None:
+            items.append(f"{name!r}: row[{lookup!r}]")
+        else:
+            converter = f"_convert_{len(namespace)}"
+            namespace[converter] = convert
+            items.append(f"{name!r}: None if (value := row[{lookup!r}]) is None else {converter}(value)")
+    indent = "    " * (prefix.count("__") + 1)
+    return "{\n" + "".join(f"{indent}    {item},\n" for item in items) + f"{indent}}}"
+
+
+def compile_representation(serializer, lookups=None):
+    """
+    Compile a ``values()`` row -> dict function producing ``serializer``'s output.
+
+    Fields read the column named by their ``source``; ``lookups`` overrides
+    that per field (method fields, annotations, ``created_by__email``), and a
+    ``None`` lookup leaves the key as ``None`` for the caller to fill, keeping
+    the serializer's key order. A nested serializer over a foreign key reads
+    its fields through the join (``category__name``). Fields whose
+    representation is the database value itself are copied; others go through
+    the field's own ``to_representation``, so values come out exactly as DRF
+    renders them.
+
+    Returns ``(to_dict, fields)``, ``fields`` being the ``values()`` lookups.
+    The code is compiled once per serializer class and field set; each call
+    binds it to this serializer's fields (their output can depend on the
+    context, e.g. the request for absolute file URLs).
+    """
+    converters, fields = {}, []
+    expression = _dict_expression(serializer, lookups or {}, "", converters, fields)
+    source = (
+        f"def bind({', '.join(converters)}):\n"
+        f"    def to_dict(row):\n"
+        f"        return {expression}\n"
+        f"    return to_dict\n"
+    )
+    bind = _compile_binder(source, f"<{type(serializer).__name__} representation>")
+    return bind(**converters), fields
+
+
+@lru_cache(maxsize=256)
+def _compile_binder(source, filename):
+    namespace = {}
+    exec(compile(source, filename, "exec"), namespace)
+    return namespace["bind"]
+
+
+def _split_param(request, name):
+    return [value.strip() for raw in request.query_params.getlist(name) for value in raw.split(",") if value.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=a,b`` and ``?expand=c`` on read requests.
+
+    ``fields`` limits the serialized keys; ``expand`` swaps a relation's id
+    for the nested object from ``expandable_fields`` (and implies it in
+    ``fields``). On ``list`` and ``retrieve`` the queryset is cut to match:
+    ``only()`` the columns the requested fields read, ``select_related`` just
+    the joins they need, and prefetches only for requested nested lists. A
+    field's column is its ``source`` or its ``field_lookups`` entry (the map
+    ``ValuesListMixin`` uses, ``None`` naming a prefetch). Annotations are
+    left to the viewset, which can skip them with ``wants_field()``.
+    """
+
+    expandable_fields = {}
+    field_lookups = {}
+
+    def requested_fields(self):
+        """Requested field names, or ``None`` for all of them."""
+        if self.request.method not in SAFE_METHODS:
+            return None
+        fields = _split_param(self.request, "fields")
+        return set(fields) | set(self.requested_expand()) if fields else None
+
+    def requested_expand(self):
+        if self.request.method not in SAFE_METHODS:
+            return []
+        expand = _split_param(self.request, "expand")
+        unknown = sorted(set(expand) - set(self.expandable_fields))
+        if unknown:
+            raise ValidationError({"expand": [f"Cannot expand: {', '.join(unknown)}."]})
+        return expand
+
+    def wants_field(self, name):
+        fields = self.requested_fields()
+        return fields is None or name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in SAFE_METHODS:
+            self.shape_serializer(getattr(serializer, "child", serializer))
+        return serializer
+
+    def shape_serializer(self, serializer):
+        fields = self.requested_fields()
+        if fields is not None:
+            readable = {name for name, field in serializer.fields.items() if not field.write_only}
+            unknown = sorted(fields - readable)
+            if unknown:
+                raise ValidationError({"fields": [f"Unknown field(s): {', '.join(unknown)}."]})
+            for name in readable - fields:
+                serializer.fields.pop(name)
+        for name in self.requested_expand():
+            serializer.fields[name] = self.expandable_fields[name](read_only=True)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.requested_fields()
+        if fields is None or self.action not in {"list", "retrieve"}:
+            return queryset
+
+        expand = set(self.requested_expand())
+        columns, joins, prefetches = [], set(), []
+        for name in sorted(fields):
+            lookup = self.field_lookups.get(name, name)
+            if lookup is None:
+                prefetches.append(name)
+                continue
+            try:
+                queryset.model._meta.get_field(lookup.split("__")[0])
+            except FieldDoesNotExist:
+                continue  # annotation
+            if name in expand:
+                joins.add(lookup)
+                columns += [f"{lookup}__{field}" for field in self.expandable_fields[name].Meta.fields]
+                continue
+            columns.append(lookup)
+            if "__" in lookup:
+                joins.add(lookup.rsplit("__", 1)[0])
+        return (
+            queryset.select_related(None)
+            .select_related(*sorted(joins))
+            .prefetch_related(None)
+            .prefetch_related(*prefetches)
+            .only(*columns)
+        )
+
+
+class ValuesListMixin:
+    """
+    Serve ``list`` from ``.values()`` rows instead of model instances.
+
+    Skips model construction and DRF's per-field dispatch, which dominate
+    list responses, while returning the same JSON as the serializer (the
+    row function is compiled from its fields). ``field_lookups`` maps fields
+    not backed by a model column to a ``values()`` lookup, or to ``None`` for
+    nested data filled in by ``add_list_related(data, pks)``, ``pks`` being
+    the primary keys of the rows in ``data``. Turned off with
+    ``FAST_LIST_SERIALIZATION = False``.
+
+    Without pagination the JSON array is streamed, ``JSON_STREAM_CHUNK_SIZE``
+    rows at a time, instead of being built whole in memory.
+    """
+
+    field_lookups = {}
+
+    def add_list_related(self, data, pks):
+        pass
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, "FAST_LIST_SERIALIZATION", True):
+            return super().list(request, *args, **kwargs)
+
+        to_dict, fields = compile_representation(self.get_serializer(), self.field_lookups)
+        rows = self.filter_queryset(self.get_queryset()).prefetch_related(None).values("pk", *fields)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            chunks = iter_json_array(self.iter_list_chunks(rows, to_dict))
+            return StreamingHttpResponse(chunks, content_type="application/json")
+        with timed("serializer"):
+            data = [to_dict(row) for row in page]
+            self.add_list_related(data, [row["pk"] for row in page])
+        return self.get_paginated_response(data)
+
+    def iter_list_chunks(self, rows, to_dict):
+        chunk_size = getattr(settings, "JSON_STREAM_CHUNK_SIZE", 1000)
+        records = rows.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(records, chunk_size)):
+            data = [to_dict(row) for row in chunk]
+            self.add_list_related(data, [row["pk"] for row in chunk])
+            yield data
@@ -0,0 +1,21 @@
+from rest_framework.serializers import ListSerializer, ModelSerializer
+
+from apps.core.models import AuditEntry
+from apps.core.performance import timed
+
+
+class TimedSerializerMixin:
+    """Count top-level ``to_representation`` time towards the request's ``serializer`` timer."""
+
+    def to_representation(self, instance):
+        parent = self.parent
+        if parent is None or (isinstance(parent, ListSerializer) and parent.parent is None):
+            with timed("serializer"):
+                return super().to_representation(instance)
+        return super().to_representation(instance)
+
+
+class AuditEntrySerializer(ModelSerializer):
+    class Meta:
+        model = AuditEntry
+        fields = ["id", "created_at", "actor_id", "actor_email", "view", "action", "method", "path", "object_id", "status"]
@@ -0,0 +1,20 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+
+from cp360_config.celery import app
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(bind=True, max_retries=5, ignore_result=True)
+def deliver_email(self):
+    from apps.core.mail import deliver_emails, prune_sent
+
+    try:
+        deliver_emails()
+    except Exception as exc:
+        logger.warning(f"Email delivery failed: {exc}")
+        raise self.retry(exc=exc, countdown=min(300, 10 * 2 ** self.request.retries))
+    prune_sent(timedelta(days=settings.EMAIL_RETENTION_DAYS))
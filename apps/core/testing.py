@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    ``assertQueryBudget(n)``: fail if the block runs more than ``n`` queries.
+
+    Budgets are upper bounds, so an optimisation never breaks a test but any
+    new per-row query does. Pair with ``NPLUSONE_ENABLED``/``NPLUSONE_RAISE``
+    to also name the code issuing repeated queries.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        if len(context) > budget:
+            queries = "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, 1))
+            self.fail(f"{len(context)} queries executed, budget is {budget}:\n{queries}")
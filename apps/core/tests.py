@@ -1,3 +1,358 @@
-from django.test import TestCase
+import io
+import os
+import smtplib
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import NotSupportedError, transaction
+from django.db.models import Max
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.core.audit import audit_log
+from apps.core.mail import deliver_batch, deliver_emails, pool, queue_email, queue_emails
+from apps.core.models import AuditEntry, QueuedEmail
+from apps.core.parsers import FastJSONParser
+from apps.core.performance import endpoint_stats
+from apps.core.renderers import FastJSONRenderer, iter_json_array
+from apps.core.throttling import ConcurrencySlot, take
+from apps.user.models import User
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", phone="99990000", password="secret123"
+        )
+
+    def setUp(self):
+        endpoint_stats.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("admin-user-list"))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"')
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn("render;dur=", timing)
+
+    def test_metrics_endpoint_reports_per_view_stats(self):
+        for _ in range(3):
+            self.client.get(reverse("admin-user-list"))
+        response = self.client.get(reverse("performance-metrics"))
+        stats = response.data["endpoints"]["AdminUserListView.get"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["avg_db_queries"], 2)
+        self.assertEqual(sum(stats["histogram_ms"].values()), 3)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        user = User.objects.create_user(
+            email="user@example.com", username="user", phone="11110000", password="secret123"
+        )
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(reverse("performance-metrics")).status_code, 403)
+
+
+@override_settings(AUDIT_BACKGROUND_FLUSH=False)
+class AuditLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", phone="99990000", password="secret123"
+        )
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", phone="11110000", password="secret123"
+        )
+
+    def setUp(self):
+        audit_log.flush()  # whatever earlier tests queued
+        self.seen = AuditEntry.objects.aggregate(last=Max("id"))["last"] or 0
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def entries(self):
+        return AuditEntry.objects.filter(id__gt=self.seen).order_by("id")
+
+    def test_mutations_are_written_in_a_batch_after_the_request(self):
+        url = reverse("admin-user-status", args=[self.user.pk])
+        with self.assertNumQueries(3):  # nothing for the audit during the request
+            self.client.patch(url, {"is_active": False}, format="json")
+        self.client.get(reverse("admin-user-list"))
+        self.client.force_authenticate(self.user)
+        self.client.patch(reverse("admin-user-detail", args=[self.admin.pk]), {"first_name": "X"}, format="json")
+        self.assertFalse(self.entries().exists())
+
+        with self.assertNumQueries(1):
+            self.assertEqual(audit_log.flush(), 2)
+        changed, refused = self.entries()
+        self.assertEqual(
+            (changed.actor_email, changed.view, changed.action, changed.object_id, changed.status),
+            ("admin@example.com", "AdminUserStatusView", "patch", str(self.user.pk), 200),
+        )
+        self.assertEqual((refused.actor_id, refused.status), (self.user.pk, 403))
+
+    def test_entries_are_append_only(self):
+        entry = AuditEntry.objects.create(view="V", action="a", method="POST", path="/", status=200)
+        with self.assertRaises(NotSupportedError):
+            entry.save()
+        with self.assertRaises(NotSupportedError):
+            AuditEntry.objects.all().delete()
+
+    def test_time_range_query(self):
+        now = timezone.now()
+        for hours in (3, 2, 1):
+            audit_log.record(
+                created_at=now - timedelta(hours=hours), view="V", action="a", method="POST", path="/", status=200
+            )
+        audit_log.flush()
+        since = (now - timedelta(hours=2, minutes=30)).isoformat()
+        response = self.client.get(reverse("audit-log"), {"since": since, "until": now.isoformat(), "view": "V"})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(self.client.get(reverse("audit-log"), {"since": "yesterday"}).status_code, 400)
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True, EMAIL_MAX_ATTEMPTS=2, EMAIL_RETRY_DELAY=60
+)
+class EmailPipelineTests(TestCase):
+    def setUp(self):
+        pool.discard()
+
+    def queue(self, count):
+        return queue_emails({"subject": f"Hi {i}", "body": "Hello", "to": [f"u{i}@example.com"]} for i in range(count))
+
+    def refuse(self, address, error=None):
+        error = error or smtplib.SMTPRecipientsRefused({address: (550, b"No such user")})
+        send = EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            if address in messages[0].to:
+                raise error
+            return send(backend, messages)
+
+        return mock.patch.object(EmailBackend, "send_messages", send_messages)
+
+    def test_sent_on_commit_in_batches_over_one_connection(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.queue(5)
+        self.assertEqual(len(mail.outbox), 0)  # nothing in the request
+        opened = pool.opened
+        self.assertEqual(deliver_emails(batch_size=2), {"sent": 5, "batches": 3})
+        self.assertEqual(pool.opened, opened + 1)
+        self.assertEqual([message.to for message in mail.outbox], [[f"u{i}@example.com"] for i in range(5)])
+        self.assertFalse(QueuedEmail.objects.exclude(status=QueuedEmail.STATUS_SENT).exists())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_task_runs_after_commit_only(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue_email("Rolled back", "Body", ["x@example.com"])
+            raise RuntimeError
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_email("Welcome", "Body", ["y@example.com"], kind="welcome")
+        self.assertEqual([message.subject for message in mail.outbox], ["Welcome"])
+
+    def test_refused_message_is_retried_with_backoff_then_given_up(self):
+        self.queue(3)
+        with self.refuse("u1@example.com"):
+            self.assertEqual(deliver_emails()["sent"], 2)
+            refused = QueuedEmail.objects.get(status=QueuedEmail.STATUS_PENDING)
+            self.assertEqual((refused.to, refused.attempts), (["u1@example.com"], 1))
+            self.assertGreater(refused.send_after, timezone.now() + timedelta(seconds=50))
+            self.assertEqual(deliver_emails()["sent"], 0)  # not due yet
+
+            QueuedEmail.objects.filter(pk=refused.pk).update(send_after=timezone.now())
+            with self.assertLogs("apps.core.mail", "ERROR"):
+                deliver_emails()
+        refused.refresh_from_db()
+        self.assertEqual((refused.status, refused.attempts), (QueuedEmail.STATUS_FAILED, 2))
+        self.assertIn("No such user", refused.last_error)
+
+    def test_claimed_batch_is_not_taken_twice(self):
+        self.queue(3)
+
+        def send_messages(backend, messages):
+            # a worker starting meanwhile finds nothing due
+            self.assertEqual(deliver_batch(backend, 10), (0, 0))
+            return len(messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", send_messages):
+            self.assertEqual(deliver_emails()["sent"], 3)
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.STATUS_SENT).count(), 3)
+
+        email = QueuedEmail.objects.first()
+        QueuedEmail.objects.filter(pk=email.pk).update(status=QueuedEmail.STATUS_SENDING, send_after=timezone.now())
+        # claimed by a worker that never reported back
+        self.assertEqual(deliver_emails()["sent"], 1)
+
+    def test_connection_error_stops_the_batch_and_keeps_the_rest(self):
+        self.queue(3)
+        disconnected = smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        with self.refuse("u1@example.com", disconnected), self.assertRaises(smtplib.SMTPServerDisconnected):
+            deliver_emails()
+        self.assertIsNone(pool.connection)
+        self.assertEqual(QueuedEmail.objects.filter(status=QueuedEmail.STATUS_SENT).count(), 1)
+        self.assertEqual(deliver_emails()["sent"], 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class ThrottleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.agent = User.objects.create_user(
+            email="agent@example.com", username="agent", phone="11110000", password="secret123"
+        )
+        cls.staff = User.objects.create_user(
+            email="staff@example.com", username="staff", phone="22220000", password="secret123", role="staff"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_bucket_bursts_then_refills(self):
+        self.assertEqual([take("bucket", 3, 60, now=0) for _ in range(4)], [0, 0, 0, 20])
+        self.assertEqual(take("bucket", 3, 60, now=20), 0)
+        self.assertEqual(take("bucket", 3, 60, now=25), 15)
+        self.assertEqual(take("other", 3, 60, now=25), 0)
+
+    @override_settings(THROTTLE_RATES={"login": "2/min"})
+    def test_login_is_limited_per_address(self):
+        url, payload = reverse("user-login"), {"email": "agent@example.com", "password": "wrong"}
+        codes = [self.client.post(url, payload, format="json").status_code for _ in range(3)]
+        self.assertEqual(codes, [400, 400, 429])
+        response = self.client.post(url, payload, format="json")
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(self.client.post(url, payload, format="json", REMOTE_ADDR="10.0.0.2").status_code, 400)
+
+    @override_settings(THROTTLE_RATES={"default": {"end_user": "1/min", "staff": "3/min"}})
+    def test_rate_follows_role(self):
+        for user, allowed in ((self.agent, 1), (self.staff, 3)):
+            self.client.force_authenticate(user)
+            codes = [self.client.get(reverse("user-profile")).status_code for _ in range(allowed + 1)]
+            self.assertEqual(codes, [200] * allowed + [429])
+
+    def test_concurrency_cap_per_client_and_total(self):
+        limits = {"per_client": 1, "total": 2, "queue_seconds": 0, "retry_after": 7, "lease_seconds": 60}
+        first = ConcurrencySlot("export", "a", limits).acquire()
+        with self.assertRaises(Throttled) as caught:
+            ConcurrencySlot("export", "a", limits).acquire()
+        self.assertEqual(caught.exception.wait, 7)
+        ConcurrencySlot("export", "b", limits).acquire()
+        self.assertFalse(ConcurrencySlot("export", "c", limits).try_acquire())
+        first.release()
+        self.assertTrue(ConcurrencySlot("export", "c", limits).try_acquire())
+
+    def run_clients(self, clients, work, seconds=0.3):
+        """Run ``work(client)`` in a loop on threads, ``clients`` mapping a client to its thread count."""
+        outcomes = {client: [] for client in clients}
+        stop = time.monotonic() + seconds
+
+        def loop(client):
+            while time.monotonic() < stop:
+                outcomes[client].append(work(client))
+
+        threads = [threading.Thread(target=loop, args=(c,)) for c, n in clients.items() for _ in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_greedy_client_cannot_take_others_tokens(self):
+        # every thread of the greedy client shares its bucket
+        outcomes = self.run_clients({"greedy": 8, "a": 1, "b": 1}, lambda c: take(f"fair:{c}", 20, 3600) == 0)
+        for client, results in outcomes.items():
+            self.assertEqual(sum(results), 20, client)
+
+    def test_greedy_client_cannot_take_every_slot(self):
+        limits = {"per_client": 2, "total": 4, "queue_seconds": 0, "retry_after": 1, "lease_seconds": 60}
+
+        def work(client):
+            slot = ConcurrencySlot("upload", client, limits)
+            if not slot.try_acquire():
+                return False
+            time.sleep(0.002)
+            slot.release()
+            return True
+
+        outcomes = self.run_clients({"greedy": 8, "a": 1, "b": 1}, work)
+        self.assertTrue(all(outcomes["a"]) and all(outcomes["b"]))
+        self.assertIn(False, outcomes["greedy"])
+
+
+class StartupTests(SimpleTestCase):
+    def boot(self, settings_module, code):
+        """Run ``code`` in a fresh interpreter under ``settings_module``, without any mail settings."""
+        env = {name: value for name, value in os.environ.items() if not name.startswith("EMAIL_")}
+        env.pop("DEFAULT_FROM_EMAIL", None)
+        env["DJANGO_SETTINGS_MODULE"] = settings_module
+        done = subprocess.run(
+            [sys.executable, "-c", code], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+        return done.stdout.splitlines()
+
+    def test_heavy_imports_are_deferred(self):
+        after_setup, after_urls = self.boot(
+            "cp360_config.settings",
+            "import sys, django; django.setup();"
+            "print(*[name for name in ('celery', 'rest_framework_simplejwt.tokens') if name in sys.modules]);"
+            "from django.urls import resolve; resolve('/api/products/');"
+            "print(*[name for name in ('celery', 'numpy') if name in sys.modules])",
+        )
+        self.assertEqual((after_setup, after_urls), ("", ""))
+
+    def test_worker_settings_register_every_task(self):
+        [tasks] = self.boot(
+            "cp360_config.settings_worker",
+            "from cp360_config.celery import app; app.loader.import_default_modules();"
+            "print(*sorted(name for name in app.tasks if name.startswith('apps.')))",
+        )
+        self.assertIn("apps.core.tasks.deliver_email", tasks.split())
+        self.assertIn("apps.products.tasks.run_export_job", tasks.split())
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_renders_same_bytes_as_drf(self):
+        data = {
+            "price": Decimal("10.50"),
+            "category_id": uuid.uuid4(),
+            "created_at": timezone.now(),
+            "title": "caf\u00e9 \u2028 line",
+            "label": gettext_lazy("Product"),
+            1: [None, True, 2.5],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+    def test_parser_matches_drf(self):
+        for body in (b'{"title": "caf\xc3\xa9", "price": 10.5, "ids": [1, 2]}', b'{"big": 123456789012345678901234}'):
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for body in (b'{"price": NaN}', b"{oops"):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_streamed_array(self):
+        chunks = [[{"id": 1}], [], [{"id": 2}, {"id": 3}]]
+        self.assertEqual(b"".join(iter_json_array(chunks)), JSONRenderer().render([row for chunk in chunks for row in chunk]))
+        self.assertEqual(b"".join(iter_json_array([])), b"[]")
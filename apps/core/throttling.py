@@ -0,0 +1,202 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+# bucket updates are serialized with a lock key; a request that cannot get it
+# within LOCK_TRIES polls is refused rather than let through unmetered
+LOCK_TRIES = 50
+LOCK_POLL = 0.001
+SLOT_POLL = 0.05
+CONCURRENCY_DEFAULTS = {"per_client": 2, "total": 8, "queue_seconds": 0, "retry_after": 5, "lease_seconds": 600}
+
+
+def throttle_cache():
+    return caches[settings.THROTTLE_CACHE]
+
+
+def parse_rate(rate):
+    """``"N/period"`` (``s``, ``min``, ``hour``, ``day``...) as ``(N, seconds)``; ``None`` is no limit."""
+    if rate is None:
+        return None
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+def throttle_scope(view, request):
+    """The view's ``get_throttle_scope(request)``, else its ``throttle_scope``, else ``"default"``."""
+    get_scope = getattr(view, "get_throttle_scope", None)
+    if get_scope is not None:
+        return get_scope(request)
+    return getattr(view, "throttle_scope", "default")
+
+
+def client_role(request):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anon"
+    return getattr(user, "role", None) or "anon"
+
+
+def client_ident(request, throttle):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{throttle.get_ident(request)}"
+
+
+def take(key, capacity, period, now=None, cache=None):
+    """
+    Take a token from the bucket at ``key``; returns 0 when one was
+    available, else the seconds until one will be.
+
+    The bucket holds ``capacity`` tokens and refills ``capacity`` per
+    ``period`` seconds. It is stored as a single timestamp, the time it
+    will be full again (GCRA, the token bucket's one-value form), so an
+    update is one read and one write, done under a lock key taken with the
+    cache's atomic ``add``: every process sharing the cache sees the same
+    bucket.
+    """
+    cache = cache or throttle_cache()
+    now = time.time() if now is None else now
+    interval = period / capacity
+    lock = f"{key}:lock"
+    for _ in range(LOCK_TRIES):
+        if cache.add(lock, 1, 1):
+            break
+        time.sleep(LOCK_POLL)
+    else:
+        return interval
+    try:
+        full_at = max(cache.get(key, now), now)
+        # the bucket is empty when full_at is a whole period ahead
+        wait = full_at + interval - now - period
+        if wait > 0:
+            return wait
+        cache.set(key, full_at + interval, int(full_at + interval - now) + 1)
+        return 0
+    finally:
+        cache.delete(lock)
+
+
+class RoleRateThrottle(BaseThrottle):
+    """
+    Token bucket per client and scope, sized by the client's role.
+
+    The scope comes from ``throttle_scope(view, request)``;
+    ``THROTTLE_RATES[scope]`` is a rate for everyone or a dict of rates per
+    role (``UserRoles`` values and ``"anon"``), ``"*"`` covering roles not
+    listed. ``None``, or a scope or role with no rate, is not limited.
+    Clients are users when authenticated, else addresses.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_rate(self, scope, role):
+        rates = settings.THROTTLE_RATES.get(scope)
+        if isinstance(rates, dict):
+            rates = rates.get(role, rates.get("*"))
+        return parse_rate(rates)
+
+    def allow_request(self, request, view):
+        scope = throttle_scope(view, request)
+        rate = self.get_rate(scope, client_role(request))
+        if rate is None:
+            return True
+        key = f"throttle:{scope}:{client_ident(request, self)}"
+        self.wait_seconds = take(key, *rate)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class ConcurrencySlot:
+    """
+    A held place among the ``per_client`` and ``total`` requests of a scope
+    allowed to run at once. Places are cache keys taken with ``add`` and
+    expire after ``lease_seconds`` should a process die holding one.
+    """
+
+    def __init__(self, scope, ident, limits, cache=None):
+        self.cache = cache or throttle_cache()
+        self.prefix = f"throttle:slots:{scope}"
+        self.ident = ident
+        self.limits = limits
+        self.token = uuid.uuid4().hex
+        self.keys = []
+
+    def _claim(self, prefix, count):
+        for i in range(count):
+            key = f"{prefix}:{i}"
+            if self.cache.add(key, self.token, self.limits["lease_seconds"]):
+                self.keys.append(key)
+                return True
+        return False
+
+    def try_acquire(self):
+        if not self._claim(f"{self.prefix}:{self.ident}", self.limits["per_client"]):
+            return False
+        if not self._claim(self.prefix, self.limits["total"]):
+            self.release()
+            return False
+        return True
+
+    def acquire(self):
+        """Wait up to ``queue_seconds`` for a place; raise ``Throttled`` if none frees up."""
+        deadline = time.monotonic() + self.limits["queue_seconds"]
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                raise Throttled(wait=self.limits["retry_after"])
+            time.sleep(SLOT_POLL)
+        return self
+
+    def release(self):
+        keys, self.keys = self.keys, []
+        for key in keys:
+            # the lease may have expired and gone to someone else
+            if self.cache.get(key) == self.token:
+                self.cache.delete(key)
+
+
+def release_after(chunks, slot):
+    try:
+        yield from chunks
+    finally:
+        slot.release()
+
+
+class ConcurrencyLimitMixin:
+    """
+    Cap the requests of a scope in ``THROTTLE_CONCURRENCY`` running at once,
+    per client and in all (across processes sharing ``THROTTLE_CACHE``).
+
+    A request over the cap waits up to ``queue_seconds`` for a place, then
+    gets a 429 with ``Retry-After``. The place is held until the response
+    is built, or streamed for streaming responses.
+    """
+
+    concurrency_slot = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = throttle_scope(self, request)
+        limits = settings.THROTTLE_CONCURRENCY.get(scope)
+        if limits is not None:
+            slot = ConcurrencySlot(scope, client_ident(request, BaseThrottle()), CONCURRENCY_DEFAULTS | limits)
+            self.concurrency_slot = slot.acquire()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        slot, self.concurrency_slot = self.concurrency_slot, None
+        if slot is not None:
+            if response.streaming:
+                response.streaming_content = release_after(response.streaming_content, slot)
+            else:
+                slot.release()
+        return response
@@ -0,0 +1,50 @@
+import re
+
+from rest_framework import serializers
+
+# Compiled once at import; the validators below run on every request body.
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+USERNAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def as_text(value):
+    """``value`` as a string, as ``serializers.CharField`` takes it: numbers are converted, anything else refused."""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise serializers.ValidationError("Not a valid string.")
+    return str(value)
+
+
+def validate_records(records, validators):
+    """
+    Validate a list of dicts against ``{field: validator}`` in a single pass.
+
+    Each validator takes the field value and returns the cleaned value or
+    raises ``serializers.ValidationError``, so the per-field functions used by
+    serializers can be reused for bulk payloads. Values are passed through
+    ``as_text`` first, since those functions expect strings. Returns
+    ``(cleaned, errors)`` where ``errors`` maps the record index to
+    ``{field: [messages]}``; fields missing from a record are skipped.
+    """
+    cleaned = []
+    errors = {}
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[index] = {
+                "non_field_errors": [f"Invalid data. Expected a dictionary, but got {type(record).__name__}."]
+            }
+            cleaned.append({})
+            continue
+        row = dict(record)
+        row_errors = {}
+        for field, validator in validators.items():
+            if field not in row:
+                continue
+            value = row[field]
+            try:
+                row[field] = validator(value if type(value) is str else as_text(value))
+            except serializers.ValidationError as exc:
+                row_errors[field] = list(exc.detail)
+        if row_errors:
+            errors[index] = row_errors
+        cleaned.append(row)
+    return cleaned, errors
@@ -1,3 +1,55 @@
-from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from apps.core.models import AuditEntry
+from apps.core.pagination import KeysetPagination
+from apps.core.performance import endpoint_stats
+from apps.core.serializers import AuditEntrySerializer
+
+
+class PerformanceMetricsView(APIView):
+    """Rolling latency / query stats per endpoint for this process."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"window": endpoint_stats.window, "endpoints": endpoint_stats.snapshot()})
+
+    def delete(self, request, *args, **kwargs):
+        endpoint_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AuditLogView(generics.ListAPIView):
+    """
+    The audit trail, newest first, in keyset pages. ``since``/``until``
+    (ISO 8601) bound ``created_at``; ``actor``, ``view`` and ``action``
+    filter exactly.
+    """
+
+    serializer_class = AuditEntrySerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = AuditEntry.objects.all()
+        for name, lookup in (("since", "created_at__gte"), ("until", "created_at__lt")):
+            if params.get(name):
+                moment = parse_datetime(params[name])
+                if moment is None:
+                    raise ValidationError({name: "Must be an ISO 8601 datetime."})
+                if timezone.is_naive(moment):
+                    moment = timezone.make_aware(moment)
+                qs = qs.filter(**{lookup: moment})
+        if params.get("actor") and not params["actor"].isdigit():
+            raise ValidationError({"actor": "Must be a user id."})
+        for name, field in (("actor", "actor_id"), ("view", "view"), ("action", "action")):
+            if params.get(name):
+                qs = qs.filter(**{field: params[name]})
+        return qs
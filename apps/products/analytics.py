@@ -0,0 +1,151 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import FloatField, Max, Sum
+from django.db.models.functions import Cast
+
+from .models import CategoryStats, Product
+
+# optional, and imported on first use: it adds ~45 ms to every process start
+# and only the analytics endpoint needs it
+np = None
+
+PERCENTILES = (5, 25, 50, 75, 95, 99)
+# Tukey's fences: outside [q1 - k * iqr, q3 + k * iqr]
+FENCE = 1.5
+
+
+def load_numpy():
+    """Import numpy into ``np`` if not done yet; returns whether it is installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+def catalog_version():
+    """
+    Changes whenever a product changes: the newest ``updated_at`` and
+    ``deleted_at`` (index lookups) plus the live product count from the
+    catalog stats, which catches hard deletes. Unlike the export
+    ``data_version`` it costs the same at any catalog size.
+    """
+    # one aggregate per query: SQLite only answers a lone MIN/MAX from the index
+    updated = Product.objects.aggregate(last=Max("updated_at"))["last"]
+    deleted = Product.objects.aggregate(last=Max("deleted_at"))["last"]
+    live = CategoryStats.objects.aggregate(count=Sum("product_count"))["count"]
+    return f"{updated}:{deleted}:{live}"
+
+
+def read_prices(queryset, chunk_size):
+    """
+    ``(ids, category_ids, prices)`` arrays of ``queryset``'s products.
+
+    The arrays are allocated once from a count (20 bytes a product) and
+    filled ``chunk_size`` rows at a time, so besides them only one chunk of
+    tuples is held. Prices are cast to float in the query: building a
+    ``Decimal`` per row would cost more than all the maths.
+    """
+    queryset = queryset.order_by()
+    size = queryset.count()
+    ids, categories, prices = np.empty(size, np.int64), np.empty(size, np.int32), np.empty(size, np.float64)
+    rows = queryset.values_list("id", "category_id", Cast("price", FloatField())).iterator(chunk_size=chunk_size)
+    done = 0
+    while chunk := list(islice(rows, chunk_size)):
+        if done + len(chunk) > size:
+            # rows added since the count
+            size = done + len(chunk)
+            ids, categories, prices = np.resize(ids, size), np.resize(categories, size), np.resize(prices, size)
+        columns = np.array(chunk, dtype=np.float64).T
+        ids[done:done + len(chunk)], categories[done:done + len(chunk)], prices[done:done + len(chunk)] = columns
+        done += len(chunk)
+    return ids[:done], categories[:done], prices[:done]
+
+
+def distributions(ids, groups, prices, bins, points=PERCENTILES, outlier_ids=20):
+    """
+    Price distribution of every group, vectorized across groups.
+
+    Sorting by ``(group, price)`` puts each group's prices in a contiguous,
+    ordered run, so every percentile of every group is one interpolation
+    over index arrays (numpy's ``linear`` method), and the histograms are a
+    single ``bincount`` of ``group * bins + bin``. Returns a list of dicts,
+    one per group present, in group order.
+    """
+    if not len(prices):
+        return []
+    order = np.lexsort((prices, groups))
+    groups, prices = groups[order], prices[order]
+    keys, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+    del groups
+    ends = starts + counts - 1
+    member = np.repeat(np.arange(len(keys), dtype=np.int32), counts)
+
+    def percentile(q):
+        position = starts + (counts - 1) * (q / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, ends)
+        return prices[low] + (prices[high] - prices[low]) * (position - low)
+
+    quantiles = {q: percentile(q) for q in sorted({*points, 25, 75})}
+    low, high = prices[starts], prices[ends]
+    sums = np.add.reduceat(prices, starts)
+
+    width = (high - low) / bins
+    # a group with a single price: everything in the first bin
+    step = np.where(width > 0, width, 1)
+    # in place where possible: each temporary is a catalog-sized array
+    slot = prices - low[member]
+    slot /= step[member]
+    slot = slot.astype(np.int32)
+    np.minimum(slot, bins - 1, out=slot)
+    slot += member * np.int32(bins)
+    histograms = np.bincount(slot, minlength=len(keys) * bins).reshape(len(keys), bins)
+    del slot
+
+    spread = quantiles[75] - quantiles[25]
+    fences = quantiles[25] - FENCE * spread, quantiles[75] + FENCE * spread
+    outside = (prices < fences[0][member]) | (prices > fences[1][member])
+    outliers = np.bincount(member[outside], minlength=len(keys))
+    flagged = np.split(ids[order[outside]], np.cumsum(outliers)[:-1])
+
+    edges = low[:, None] + width[:, None] * np.arange(bins + 1)
+    result = []
+    for i, key in enumerate(keys.tolist()):
+        result.append(
+            {
+                "key": key,
+                "products": int(counts[i]),
+                "min": round(float(low[i]), 2),
+                "max": round(float(high[i]), 2),
+                "mean": round(float(sums[i] / counts[i]), 2),
+                "percentiles": {f"p{q}": round(float(quantiles[q][i]), 2) for q in points},
+                "histogram": {"edges": np.round(edges[i], 2).tolist(), "counts": histograms[i].tolist()},
+                "outliers": {
+                    "low_fence": round(float(fences[0][i]), 2),
+                    "high_fence": round(float(fences[1][i]), 2),
+                    "count": int(outliers[i]),
+                    "ids": sorted(flagged[i].tolist())[:outlier_ids],
+                },
+            }
+        )
+    return result
+
+
+def price_analytics(queryset, bins):
+    """Distributions per category and over the whole of ``queryset``."""
+    if not load_numpy():
+        raise ImproperlyConfigured("Price analytics needs numpy.")
+    ids, categories, prices = read_prices(queryset, settings.PRICE_ANALYTICS_CHUNK_SIZE)
+    limit = settings.PRICE_ANALYTICS_OUTLIER_IDS
+    per_category = distributions(ids, categories, prices, bins, outlier_ids=limit)
+    per_category = [{"category": entry.pop("key"), **entry} for entry in per_category]
+    overall = distributions(ids, np.zeros(len(ids), np.int32), prices, bins, outlier_ids=limit)
+    if overall:
+        del overall[0]["key"]
+    return {"products": len(ids), "bins": bins, "overall": overall[0] if overall else None, "categories": per_category}
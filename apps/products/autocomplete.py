@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Category, Product
+
+logger = logging.getLogger(__name__)
+
+# Separates the normalized text from the row id inside a key; sorts before
+# any printable character so "lamp" < "lamp shade".
+_SEP = "\x00"
+
+
+def normalize(text):
+    """Casefolded, accent-free, whitespace-collapsed form used for matching."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of ``"<normalized text>\\0<id>"`` keys searched with bisect.
+
+    A lookup is one binary search plus a scan of at most ``limit`` keys, so it
+    stays sub-millisecond at millions of entries. Inserts and removals are
+    O(n) memmoves, fine for the trickle of catalog edits. ``max_entries``
+    bounds memory: entries past it are dropped (and logged). Not thread-safe:
+    ``CatalogAutocomplete`` reads and writes it under one lock.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.truncated = False
+        self._keys = []
+        self._entries = {}  # id -> (key, payload)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def _key(text, pk):
+        return f"{normalize(text)}{_SEP}{pk}"
+
+    def load(self, rows):
+        """Bulk load ``(id, text, payload)`` rows, replacing the contents."""
+        entries = {}
+        for pk, text, payload in rows:
+            if len(entries) >= self.max_entries:
+                self.truncated = True
+                break
+            entries[pk] = (self._key(text, pk), payload)
+        self._entries = entries
+        self._keys = sorted(key for key, _ in entries.values())
+
+    def upsert(self, pk, text, payload):
+        self.remove(pk)
+        if len(self._keys) >= self.max_entries:
+            self.truncated = True
+            return
+        key = self._key(text, pk)
+        self._entries[pk] = (key, payload)
+        insort(self._keys, key)
+
+    def remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, entry[0])
+        if position < len(self._keys) and self._keys[position] == entry[0]:
+            del self._keys[position]
+
+    def search(self, prefix, limit=10):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        keys = self._keys
+        position = bisect_left(keys, prefix)
+        results = []
+        while position < len(keys) and len(results) < limit:
+            key = keys[position]
+            if not key.startswith(prefix):
+                break
+            pk = int(key.rpartition(_SEP)[2])
+            results.append(self._entries[pk][1])
+            position += 1
+        return results
+
+
+class CatalogAutocomplete:
+    """
+    Lazily built prefix index over one model's non-deleted rows.
+
+    Kept fresh two ways: model signals apply this process's own writes on
+    commit, and ``refresh()`` pulls rows whose ``updated_at``/``deleted_at``
+    moved past the last watermark (writes made by other processes or by
+    queryset updates) at most every ``AUTOCOMPLETE_REFRESH_SECONDS``. Hard
+    deletes made elsewhere leave no trace, so the index is also rebuilt every
+    ``AUTOCOMPLETE_REBUILD_SECONDS``.
+
+    Builds and refresh queries run outside ``_lock``, one thread at a time
+    (``_build_lock``), while the other threads keep searching the current
+    index; ``_lock`` is only held to search, to change entries and to swap
+    in a new index. Only the first build is waited for.
+    """
+
+    # re-read this much before the watermark to cover transactions that
+    # committed late with an earlier timestamp
+    overlap = timedelta(seconds=5)
+
+    def __init__(self, model, field, payload):
+        self.model = model
+        self.field = field
+        self.columns = (*payload, field)
+        self.index = None
+        self.watermark = None
+        self.built_at = self.checked_at = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        # writes applied while a build runs, replayed on the new index
+        self._pending = None
+
+    def _payload(self, values):
+        # tuples, not dicts: a dict per entry would double the index's memory
+        return tuple(values)
+
+    @staticmethod
+    def _apply(index, pk, text=None, payload=None):
+        # ``text`` None removes the entry
+        if text is None:
+            index.remove(pk)
+        else:
+            index.upsert(pk, text, payload)
+
+    def _current_watermark(self):
+        latest = self.model.objects.aggregate(updated=Max("updated_at"), deleted=Max("deleted_at"))
+        stamps = [stamp for stamp in latest.values() if stamp is not None]
+        return max(stamps) if stamps else timezone.now()
+
+    def build(self):
+        started = time.perf_counter()
+        index = PrefixIndex(getattr(settings, "AUTOCOMPLETE_MAX_ENTRIES", 1_000_000))
+        with self._lock:
+            self._pending = []
+        try:
+            watermark = self._current_watermark()
+            rows = (
+                self.model.objects.filter(is_deleted=False)
+                .order_by()
+                .values_list("id", *self.columns)
+                .iterator(chunk_size=5000)
+            )
+            index.load((row[0], row[-1], self._payload(row[1:])) for row in rows)
+        finally:
+            with self._lock:
+                pending, self._pending = self._pending, None
+        if index.truncated:
+            logger.warning("autocomplete.truncated", extra={"model": self.model.__name__, "entries": len(index)})
+        with self._lock:
+            for change in pending:
+                self._apply(index, *change)
+            self.index, self.watermark = index, watermark
+        self.built_at = self.checked_at = time.monotonic()
+        logger.info(
+            "autocomplete.built",
+            extra={"model": self.model.__name__, "entries": len(index), "seconds": time.perf_counter() - started},
+        )
+
+    def refresh(self):
+        watermark = self._current_watermark()
+        since = self.watermark - self.overlap
+        changed = list(
+            self.model.objects.filter(Q(updated_at__gt=since) | Q(deleted_at__gt=since))
+            .order_by()
+            .values_list("id", "is_deleted", *self.columns)
+        )
+        with self._lock:
+            for row in changed:
+                if row[1]:
+                    self._apply(self.index, row[0])
+                else:
+                    self._apply(self.index, row[0], row[-1], self._payload(row[2:]))
+            self.watermark = watermark
+        self.checked_at = time.monotonic()
+
+    def _due(self):
+        now = time.monotonic()
+        if self.index is None or now - self.built_at >= getattr(settings, "AUTOCOMPLETE_REBUILD_SECONDS", 3600):
+            return self.build
+        if now - self.checked_at >= getattr(settings, "AUTOCOMPLETE_REFRESH_SECONDS", 30):
+            return self.refresh
+        return None
+
+    def ensure_ready(self):
+        """Build or refresh the index if due; returns at once if another thread is at it."""
+        if self._due() is None:
+            return
+        if not self._build_lock.acquire(blocking=self.index is None):
+            return
+        try:
+            work = self._due()
+            if work is not None:
+                work()
+        finally:
+            self._build_lock.release()
+
+    def search(self, prefix, limit=10):
+        self.ensure_ready()
+        # under the lock: apply() and refresh() change the keys and entries
+        # in several steps, which a concurrent scan must not see halfway
+        with self._lock:
+            found = self.index.search(prefix, limit) if self.index is not None else []
+        return [dict(zip(self.columns, values)) for values in found]
+
+    def apply(self, instance, deleted=False):
+        """Apply a committed write from this process, if the index is loaded or being built."""
+        if deleted or instance.is_deleted:
+            change = (instance.pk,)
+        else:
+            values = [getattr(instance, column) for column in self.columns]
+            change = (instance.pk, values[-1], self._payload(values))
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(change)
+            if self.index is not None:
+                self._apply(self.index, *change)
+
+    def reset(self):
+        with self._lock:
+            self.index = None
+
+
+products = CatalogAutocomplete(Product, "title", ("id",))
+categories = CatalogAutocomplete(Category, "name", ("category_id",))
+INDEXES = {Product: products, Category: categories}
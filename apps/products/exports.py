@@ -0,0 +1,333 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.http import HttpRequest, HttpResponse, QueryDict, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.core.negotiation import FirstRendererNegotiation
+from apps.user.models import User
+
+from .models import Category, ExportJob, Product
+from .serializers import ExportJobSerializer
+
+# models whose rows end up in each export, for the data version (category
+# exports carry their owner's email)
+EXPORT_SOURCES = {
+    ExportJob.KIND_CATEGORIES: (Category, Product, User),
+    ExportJob.KIND_PRODUCTS: (Product,),
+}
+
+
+def export_params(query_params):
+    """Query parameters as a plain, key-sorted ``{name: [values]}`` dict."""
+    return {key: query_params.getlist(key) for key in sorted(query_params)}
+
+
+def export_fingerprint(kind, params):
+    return hashlib.sha256(json.dumps([kind, params], sort_keys=True).encode()).hexdigest()
+
+
+def data_version(kind):
+    """
+    Changes whenever a row that can appear in a ``kind`` export changes.
+
+    Built from ``max(updated_at)``, ``max(deleted_at)`` (soft-deletable
+    models only) and the row count of each source table (the first two are
+    index lookups on the catalog tables); the count catches hard deletes.
+    """
+    parts = []
+    for model in EXPORT_SOURCES[kind]:
+        # one aggregate per query: SQLite only answers a lone MIN/MAX from the index
+        updated = model.objects.aggregate(last=Max("updated_at"))["last"]
+        deleted = None
+        if hasattr(model, "deleted_at"):
+            deleted = model.objects.aggregate(last=Max("deleted_at"))["last"]
+        parts.append(f"{model._meta.model_name}:{updated}:{deleted}:{model.objects.count()}")
+    return "|".join(parts)
+
+
+def reusable_job(fingerprint, version):
+    """
+    A pending, running or finished job for the same export of the same data.
+
+    Pending and running jobs that have not progressed for
+    ``EXPORT_JOB_STALL_SECONDS`` (their worker died, or the task was lost)
+    are marked failed instead of being waited on forever.
+    """
+    now = timezone.now()
+    jobs = ExportJob.objects.filter(fingerprint=fingerprint, data_version=version)
+    jobs.filter(
+        status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING],
+        progressed_at__lt=now - timedelta(seconds=settings.EXPORT_JOB_STALL_SECONDS),
+    ).update(status=ExportJob.STATUS_FAILED, error="Stalled: no progress.", finished_at=now)
+    job = (
+        jobs.filter(status__in=[ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING, ExportJob.STATUS_SUCCESS])
+        .order_by("-created_at")
+        .first()
+    )
+    if job and job.status == ExportJob.STATUS_SUCCESS and not os.path.exists(job.file.path):
+        return None
+    return job
+
+
+# Encoders take ``columns`` (``(name, type)`` pairs, type one of int, str,
+# uuid, decimal, datetime) and an iterable of row batches, and yield bytes as
+# each batch is encoded, so nothing holds more than one batch in memory.
+
+
+def encode_csv(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    for rows in batches:
+        writer.writerows(rows)  # None is written as an empty field
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# price is DecimalField(max_digits=12): at most 12 significant digits, which a
+# float round-trips exactly, so it can be written as a JSON number
+_JSON_CONVERTERS = {"uuid": str, "decimal": float, "datetime": datetime.isoformat}
+
+
+def encode_ndjson(columns, batches):
+    names = [name for name, _ in columns]
+    converters = [(i, _JSON_CONVERTERS[kind]) for i, (_, kind) in enumerate(columns) if kind in _JSON_CONVERTERS]
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for rows in batches:
+        lines = []
+        for row in rows:
+            row = list(row)
+            for i, convert in converters:
+                if row[i] is not None:
+                    row[i] = convert(row[i])
+            lines.append(dumps(dict(zip(names, row))))
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what Arrow writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def encode_parquet(columns, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "uuid": pa.string(),
+        "decimal": pa.decimal128(12, 2),
+        "datetime": pa.timestamp("us", tz="UTC"),
+    }
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in batches:
+            arrays = []
+            for i, (_, kind) in enumerate(columns):
+                values = [row[i] for row in rows]
+                if kind == "uuid":
+                    values = [None if value is None else str(value) for value in values]
+                arrays.append(pa.array(values, type=types[kind]))
+            # one row group per batch
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+ExportFormat = namedtuple("ExportFormat", ["content_type", "extension", "encode"])
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("text/csv", "csv", encode_csv),
+    "csv.gz": ExportFormat("application/gzip", "csv.gz", lambda columns, batches: gzip_chunks(encode_csv(columns, batches))),
+    "ndjson": ExportFormat("application/x-ndjson", "ndjson", encode_ndjson),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", encode_parquet),
+}
+
+
+def export_format(params):
+    name = params.get("format", "csv")
+    if name not in EXPORT_FORMATS:
+        raise ValidationError({"format": [f"Must be one of: {', '.join(EXPORT_FORMATS)}."]})
+    if name == "parquet" and find_spec("pyarrow") is None:
+        raise ValidationError({"format": ["Parquet export needs pyarrow, which is not installed."]})
+    return name
+
+
+def iter_batches(rows, expand, chunk_size, progress=None):
+    """
+    Read ``rows`` (a ``values_list`` queryset) ``chunk_size`` records at a time
+    and yield ``expand(chunk)`` for each; ``progress(records_done)`` is called
+    after every chunk.
+    """
+    records = rows.iterator(chunk_size=chunk_size)
+    done = 0
+    while chunk := list(islice(records, chunk_size)):
+        yield expand(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done)
+
+
+def write_export(job, view):
+    """
+    Write ``job``'s file under ``MEDIA_ROOT/exports/``.
+
+    ``processed`` is saved after each ``EXPORT_CHUNK_SIZE`` records so clients
+    can poll progress. The file is written to a ``.part`` name and renamed when
+    complete, so a half-written export is never served; a failed one is
+    removed.
+    """
+    params = view.request.query_params
+    fmt = EXPORT_FORMATS[export_format(params)]
+    columns, rows, expand = view.get_export(view.filter_queryset(view.get_queryset()), params)
+
+    job.status, job.total = ExportJob.STATUS_RUNNING, rows.count()
+    job.started_at = job.progressed_at = timezone.now()
+    job.save(update_fields=["status", "started_at", "progressed_at", "total"])
+
+    def progress(done):
+        job.processed = done
+        ExportJob.objects.filter(pk=job.pk).update(processed=done, progressed_at=timezone.now())
+
+    name = f"exports/{job.pk}.{fmt.extension}"
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    batches = iter_batches(rows, expand, getattr(settings, "EXPORT_CHUNK_SIZE", 2000), progress)
+    part = f"{path}.part"
+    try:
+        with open(part, "wb") as fh:
+            for chunk in fmt.encode(columns, batches):
+                fh.write(chunk)
+        os.replace(part, path)
+    finally:
+        # only left over when the export failed
+        if os.path.exists(part):
+            os.remove(part)
+
+    job.file.name, job.status, job.finished_at = name, ExportJob.STATUS_SUCCESS, timezone.now()
+    job.save(update_fields=["file", "processed", "status", "finished_at"])
+
+
+class ExportMixin:
+    """
+    ``GET <list>/export/`` and ``POST <list>/export/jobs/``.
+
+    ``?format=`` picks csv (default), csv.gz, ndjson or parquet. The viewset
+    provides ``export_kind`` and ``get_export(queryset, params)``, returning
+    the ``(name, type)`` columns, a ``values_list`` queryset and a function
+    expanding a chunk of its tuples into output rows (e.g. one per product).
+    Both endpoints write through the same encoders, so they produce
+    identical files.
+    """
+
+    export_kind = None
+
+    def get_export(self, queryset, params):
+        raise NotImplementedError
+
+    def get_throttle_scope(self, request):
+        if self.action in ("export", "export_job"):
+            return self.action
+        return getattr(self, "throttle_scope", "default")
+
+    @classmethod
+    def for_export(cls, params, user=None):
+        """A viewset instance set up as if ``user`` had called ``export`` with ``params``."""
+        http_request = HttpRequest()
+        http_request.method = "GET"
+        http_request.GET = QueryDict(mutable=True)
+        for key, values in params.items():
+            http_request.GET.setlist(key, values)
+        request = Request(http_request)
+        request.user = user
+        return cls(request=request, args=(), kwargs={}, format_kwarg=None, action="export")
+
+    @action(detail=False, methods=["get"], url_path="export", content_negotiation_class=FirstRendererNegotiation)
+    def export(self, request):
+        name = export_format(request.query_params)
+        fmt = EXPORT_FORMATS[name]
+        columns, rows, expand = self.get_export(self.filter_queryset(self.get_queryset()), request.query_params)
+        chunks = fmt.encode(columns, iter_batches(rows, expand, getattr(settings, "EXPORT_CHUNK_SIZE", 2000)))
+
+        if name == "csv":
+            resp = HttpResponse(b"".join(chunks), content_type=fmt.content_type)
+        else:
+            # the large-export formats stream: one batch in memory at a time
+            resp = StreamingHttpResponse(chunks, content_type=fmt.content_type)
+        resp["Content-Disposition"] = f"attachment; filename={self.export_kind}_{timezone.now().date()}.{fmt.extension}"
+        return resp
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="export/jobs",
+        url_name="export-jobs",
+        content_negotiation_class=FirstRendererNegotiation,
+    )
+    def export_job(self, request):
+        export_format(request.query_params)
+        params = export_params(request.query_params)
+        fingerprint, version = export_fingerprint(self.export_kind, params), data_version(self.export_kind)
+        job = reusable_job(fingerprint, version)
+        if job is None:
+            job = ExportJob.objects.create(
+                kind=self.export_kind,
+                params=params,
+                fingerprint=fingerprint,
+                data_version=version,
+                created_by=request.user,
+            )
+            from .tasks import run_export_job
+
+            transaction.on_commit(lambda: run_export_job.delay(str(job.pk)))
+        code = status.HTTP_200_OK if job.status == ExportJob.STATUS_SUCCESS else status.HTTP_202_ACCEPTED
+        return Response(ExportJobSerializer(job, context={"request": request}).data, status=code)
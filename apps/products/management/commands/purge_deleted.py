@@ -0,0 +1,36 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.products.purge import purge_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete categories, products and videos soft-deleted longer ago than the retention period, "
+        "with their video files, in small batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rows that would be deleted.")
+        parser.add_argument("--retention-days", type=int, default=settings.PURGE_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+        parser.add_argument("--pause", type=float, default=settings.PURGE_BATCH_PAUSE_SECONDS)
+        parser.add_argument("--max-seconds", type=int, default=None, help="Stop after this long (default: run to the end).")
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options["verbosity"] > 1:
+                self.stdout.write(f"batch {report['batches']}: {dict(report['rows'])}, {report['files']} files")
+
+        report = purge_deleted(
+            retention=timedelta(days=options["retention_days"]),
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_seconds=options["max_seconds"],
+            dry_run=options["dry_run"],
+            progress=progress,
+        )
+        self.stdout.write(json.dumps(report, indent=2))
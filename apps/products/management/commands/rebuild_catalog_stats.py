@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per category and status catalog stats from the product and video tables, for all "
+        "categories or those given with --category."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", type=int, action="append", help="Category id; repeat for several.")
+
+    def handle(self, *args, **options):
+        count = rebuild(options["category"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} stats rows."))
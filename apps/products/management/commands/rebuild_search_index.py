@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.products.search import FTS_INDEXES, fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 search indexes for products and categories from non-deleted rows."
+
+    def handle(self, *args, **options):
+        for model in FTS_INDEXES:
+            if not fts_available(model):
+                raise CommandError(
+                    f"No full-text index for {model.__name__} on this database (SQLite with migration 0002 required)."
+                )
+            with transaction.atomic():
+                count = rebuild_index(model)
+            self.stdout.write(self.style.SUCCESS(f"Indexed {count} {model._meta.verbose_name_plural}."))
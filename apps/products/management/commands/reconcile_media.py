@@ -0,0 +1,34 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.reconcile import reconcile_media
+from apps.products.storage import video_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete product video files no row references, and files of videos soft-deleted longer ago than the "
+        "retention window. Prints a JSON report; --dry-run only reports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted, delete nothing.")
+        parser.add_argument("--retention-days", type=int, default=settings.MEDIA_GC_RETENTION_DAYS)
+        parser.add_argument("--grace-hours", type=int, default=settings.MEDIA_GC_GRACE_HOURS)
+        parser.add_argument("--batch-size", type=int, default=settings.MEDIA_GC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            video_storage().path("")
+        except NotImplementedError:
+            raise CommandError("Video storage is not on the local filesystem; use the store's lifecycle rules.")
+        report = reconcile_media(
+            retention=timedelta(days=options["retention_days"]),
+            grace=timedelta(hours=options["grace_hours"]),
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# FTS5 indexes over non-deleted rows, kept in sync by triggers so every write
+# path (save, soft delete, restore, queryset.update, hard delete) is covered.
+INDEXES = {
+    "products_product": ("products_product_fts", ("title", "description")),
+    "products_category": ("products_category_fts", ("name",)),
+}
+
+
+def create_sql(base, table, columns):
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{column}" for column in columns)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in (*columns, "is_deleted"))
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({cols}, tokenize = 'unicode61 remove_diacritics 2')",
+        f"INSERT INTO {table} (rowid, {cols}) SELECT id, {cols} FROM {base} WHERE NOT is_deleted",
+        f"""CREATE TRIGGER {table}_ai AFTER INSERT ON {base} WHEN NOT new.is_deleted BEGIN
+            INSERT INTO {table} (rowid, {cols}) VALUES (new.id, {new_cols});
+        END""",
+        f"""CREATE TRIGGER {table}_au AFTER UPDATE ON {base} WHEN {changed} BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+            INSERT INTO {table} (rowid, {cols}) SELECT new.id, {new_cols} WHERE NOT new.is_deleted;
+        END""",
+        f"""CREATE TRIGGER {table}_ad AFTER DELETE ON {base} BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END""",
+    ]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for base, (table, columns) in INDEXES.items():
+        for statement in create_sql(base, table, columns):
+            schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, _ in INDEXES.values():
+        for suffix in ("ai", "au", "ad"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
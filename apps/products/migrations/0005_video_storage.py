@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:41
+
+import apps.products.models
+import apps.products.storage
+from django.db import migrations, models
+
+from apps.products.storage import video_storage
+
+
+def backfill_sizes(apps, schema_editor):
+    ProductVideo = apps.get_model("products", "ProductVideo")
+    storage = video_storage()
+    for video in ProductVideo.objects.exclude(file="").only("file").iterator():
+        if storage.exists(video.file.name):
+            ProductVideo.objects.filter(pk=video.pk).update(size=storage.size(video.file.name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvideo',
+            name='checksum',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='productvideo',
+            name='size',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='productvideo',
+            name='file',
+            field=models.FileField(storage=apps.products.storage.video_storage, upload_to=apps.products.models.product_video_upload_to),
+        ),
+        migrations.RunPython(backfill_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_video_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productvideo',
+            index=models.Index(fields=['file'], name='productvideo_file_idx'),
+        ),
+    ]
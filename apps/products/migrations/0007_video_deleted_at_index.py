@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_video_file_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productvideo',
+            index=models.Index(fields=['deleted_at'], name='productvideo_deleted_at_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def backfill_stats(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    ProductVideo = apps.get_model("products", "ProductVideo")
+    CategoryStats = apps.get_model("products", "CategoryStats")
+    stats = {}
+    for row in Product.objects.filter(is_deleted=False).values("category_id", "status").order_by().annotate(
+        count=Count("id"), total=Sum("price"), low=Min("price"), high=Max("price")
+    ):
+        stats[row["category_id"], row["status"]] = CategoryStats(
+            category_id=row["category_id"], status=row["status"], product_count=row["count"],
+            price_sum=row["total"], price_min=row["low"], price_max=row["high"],
+        )
+    videos = ProductVideo.objects.filter(is_deleted=False, product__is_deleted=False)
+    for row in videos.values("product__category_id", "product__status").order_by().annotate(
+        count=Count("id"), size=Sum("size")
+    ):
+        entry = stats[row["product__category_id"], row["product__status"]]
+        entry.video_count, entry.video_bytes = row["count"], row["size"] or 0
+    CategoryStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('uploaded', 'Uploaded'), ('rejected', 'Rejected'), ('success', 'Success'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('product_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('price_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('bounds_stale', models.BooleanField(default=False)),
+                ('video_count', models.IntegerField(default=0)),
+                ('video_bytes', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='products.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'status'), name='category_stats_key')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
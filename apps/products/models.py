@@ -1,10 +1,42 @@
 import uuid
+from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.utils import timezone
 
 from apps.core.models import SoftDeleteModel, TimestampedModel
 
+from .storage import video_storage
+
+
+class StatsLockedSaveMixin:
+    """
+    Save in a transaction: ``pre_save`` reads and locks the stored row the
+    catalog stats move from (apps.products.signals), and the lock has to
+    last until the write commits.
+
+    SQLite ignores SELECT ... FOR UPDATE, so when the save starts the
+    transaction it begins it IMMEDIATE instead: the write lock is taken
+    before that read, for this save only.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        connection = connections[using]
+        if connection.vendor != "sqlite" or connection.in_atomic_block:
+            with transaction.atomic(using=using, savepoint=False):
+                super().save(*args, **kwargs)
+            return
+        mode, connection.transaction_mode = connection.transaction_mode, "IMMEDIATE"
+        try:
+            with transaction.atomic(using=using):
+                # BEGIN IMMEDIATE has run; nested blocks use the configured mode
+                connection.transaction_mode = mode
+                super().save(*args, **kwargs)
+        finally:
+            connection.transaction_mode = mode
+
 
 class Category(TimestampedModel, SoftDeleteModel):
     category_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
@@ -15,15 +47,29 @@ class Category(TimestampedModel, SoftDeleteModel):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # delta sync (``changes`` action)
+            models.Index(fields=["updated_at"], name="category_updated_at_idx"),
+            models.Index(fields=["deleted_at"], name="category_deleted_at_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
     def soft_delete(self):
-        # soft delete products under this category as well
-        for p in self.products.filter(is_deleted=False):
-            p.soft_delete()
-        super().soft_delete()
+        with transaction.atomic(savepoint=False):
+            # soft delete products under this category as well
+            products = list(self.products.filter(is_deleted=False))
+            Product.objects.filter(pk__in=[p.pk for p in products]).soft_delete()
+            super().soft_delete()
+            OutboxEvent.record_many(
+                [(p, OutboxEvent.PRODUCT_DELETED) for p in products] + [(self, OutboxEvent.CATEGORY_DELETED)]
+            )
+
+    def restore(self):
+        with transaction.atomic(savepoint=False):
+            super().restore()
+            OutboxEvent.record(self, OutboxEvent.CATEGORY_RESTORED)
 
     def hard_delete(self):
         # hard delete products first
@@ -32,7 +78,7 @@ class Category(TimestampedModel, SoftDeleteModel):
         return super().hard_delete()
 
 
-class Product(TimestampedModel, SoftDeleteModel):
+class Product(StatsLockedSaveMixin, TimestampedModel, SoftDeleteModel):
     STATUS_UPLOADED = "uploaded"
     STATUS_REJECTED = "rejected"
     STATUS_SUCCESS = "success"
@@ -44,6 +90,7 @@ class Product(TimestampedModel, SoftDeleteModel):
         (STATUS_SUCCESS, "Success"),
         (STATUS_CANCELLED, "Cancelled"),
     ]
+    STATUS_VALUES = frozenset(choice[0] for choice in STATUS_CHOICES)
 
     category = models.ForeignKey(
         Category, related_name="products", on_delete=models.CASCADE
@@ -55,27 +102,243 @@ class Product(TimestampedModel, SoftDeleteModel):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # delta sync (``changes`` action)
+            models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+            models.Index(fields=["deleted_at"], name="product_deleted_at_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def soft_delete(self):
+        with transaction.atomic(savepoint=False):
+            super().soft_delete()
+            OutboxEvent.record(self, OutboxEvent.PRODUCT_DELETED)
+
+    def restore(self):
+        with transaction.atomic(savepoint=False):
+            super().restore()
+            OutboxEvent.record(self, OutboxEvent.PRODUCT_RESTORED)
+
+    def set_status(self, status, user):
+        """Approve / reject: the new status and its event in one transaction."""
+        self.status = status
+        self.updated_by = user
+        with transaction.atomic(savepoint=False):
+            self.save()
+            OutboxEvent.record(self, OutboxEvent.STATUS_EVENTS[status])
+
+    def stats_state(self):
+        """``(category_id, status, price, is_deleted)``, or ``None`` if not all loaded."""
+        loaded = self.__dict__
+        try:
+            return (loaded["category_id"], loaded["status"], Decimal(str(loaded["price"])), loaded["is_deleted"])
+        except KeyError:
+            return None
+
     @property
     def total_video_size_mb(self):
-        total = 0
-        for v in self.videos.all():
-            if v.file and hasattr(v.file, "size"):
-                total += v.file.size
+        total = self.videos.aggregate(total=models.Sum("size"))["total"] or 0
         return round(total / (1024 * 1024), 3)
 
 
+# every video is stored under this directory (see apps.products.reconcile)
+PRODUCT_VIDEO_ROOT = "products"
+
+
 def product_video_upload_to(instance, filename):
-    return f"products/{instance.product.id}/videos/{filename}"
+    return f"{PRODUCT_VIDEO_ROOT}/{instance.product.id}/videos/{filename}"
 
 
-class ProductVideo(SoftDeleteModel):
+class ProductVideo(StatsLockedSaveMixin, SoftDeleteModel):
     product = models.ForeignKey(Product, related_name="videos", on_delete=models.CASCADE)
-    file = models.FileField(upload_to=product_video_upload_to)
+    file = models.FileField(upload_to=product_video_upload_to, storage=video_storage)
+    # recorded on upload so quota checks and dedup need no storage round trips
+    size = models.PositiveBigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # stored files are matched to rows by name (media reconciliation)
+            models.Index(fields=["file"], name="productvideo_file_idx"),
+            # retention purge
+            models.Index(fields=["deleted_at"], name="productvideo_deleted_at_idx"),
+        ]
+
     def soft_delete(self):
         super().soft_delete()
+
+    def stats_state(self):
+        """``(product_id, size, is_deleted)``, or ``None`` if not all loaded."""
+        loaded = self.__dict__
+        try:
+            return (loaded["product_id"], loaded["size"], loaded["is_deleted"])
+        except KeyError:
+            return None
+
+
+class ExportJob(models.Model):
+    """
+    A background export of categories or products, kept for reuse.
+
+    ``format`` (the ``format`` query parameter, csv by default) picks the
+    file written: csv, csv.gz, ndjson or parquet.
+    """
+
+    KIND_CATEGORIES = "categories"
+    KIND_PRODUCTS = "products"
+    KIND_CHOICES = [(KIND_CATEGORIES, "Categories"), (KIND_PRODUCTS, "Products")]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCESS = "success"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCESS, "Success"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    fingerprint = models.CharField(max_length=64)
+    data_version = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to="exports/", blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="export_jobs", null=True, blank=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # creation, then every progress update: a job whose worker died stops moving
+    progressed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["fingerprint", "data_version"], name="export_job_lookup_idx")]
+
+    def __str__(self):
+        return f"{self.kind} export {self.pk}"
+
+    @property
+    def format(self):
+        return self.params.get("format", ["csv"])[-1]
+
+    @property
+    def progress(self):
+        if self.status == self.STATUS_SUCCESS:
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.processed * 100 // self.total)
+
+
+class OutboxEvent(models.Model):
+    """
+    A catalog event waiting to be relayed (see ``apps.products.outbox``).
+
+    Written by ``record`` in the transaction making the change, so an event
+    exists exactly when its change was committed.
+    """
+
+    PRODUCT_APPROVED = "product.approved"
+    PRODUCT_REJECTED = "product.rejected"
+    PRODUCT_DELETED = "product.deleted"
+    PRODUCT_RESTORED = "product.restored"
+    VIDEO_ADDED = "product.video_added"
+    CATEGORY_DELETED = "category.deleted"
+    CATEGORY_RESTORED = "category.restored"
+
+    STATUS_EVENTS = {Product.STATUS_SUCCESS: PRODUCT_APPROVED, Product.STATUS_REJECTED: PRODUCT_REJECTED}
+
+    type = models.CharField(max_length=50)
+    # events with the same key are delivered in the order they were recorded
+    key = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # set while a relay is sending the event; a relay that died lets it lapse
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(sent_at__isnull=True), name="outbox_pending_idx"),
+            models.Index(fields=["sent_at"], name="outbox_sent_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.key}"
+
+    @classmethod
+    def record(cls, instance, type):
+        """Add the event ``type`` about ``instance``; call inside the change's transaction."""
+        return cls.record_many([(instance, type)])[0]
+
+    @classmethod
+    def record_many(cls, events):
+        """``record`` for several ``(instance, type)`` pairs, in one insert."""
+        events = cls.objects.bulk_create(cls(type=type, **cls.describe(instance)) for instance, type in events)
+
+        from .tasks import relay_outbox
+
+        # the beat schedule relays anything a missed trigger leaves behind
+        transaction.on_commit(relay_outbox.delay, robust=True)
+        return events
+
+    @staticmethod
+    def describe(instance):
+        if isinstance(instance, ProductVideo):
+            return {
+                "key": f"product:{instance.product_id}",
+                "payload": {
+                    "product": instance.product_id,
+                    "video": instance.pk,
+                    "file": instance.file.name,
+                    "size": instance.size,
+                    "checksum": instance.checksum,
+                },
+            }
+        if isinstance(instance, Product):
+            return {
+                "key": f"product:{instance.pk}",
+                "payload": {"product": instance.pk, "category": instance.category_id, "status": instance.status},
+            }
+        return {
+            "key": f"category:{instance.pk}",
+            "payload": {"category": instance.pk, "category_id": str(instance.category_id)},
+        }
+
+
+class CategoryStats(models.Model):
+    """
+    Totals over the live products of one category in one status, kept up to
+    date by ``apps.products.stats``.
+    """
+
+    category = models.ForeignKey(Category, related_name="stats", on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Product.STATUS_CHOICES)
+    product_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    price_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    price_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # a product at the min or max left; recomputed on the next read
+    bounds_stale = models.BooleanField(default=False)
+    video_count = models.IntegerField(default=0)
+    video_bytes = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["category", "status"], name="category_stats_key")]
+
+    def __str__(self):
+        return f"{self.category_id}/{self.status}: {self.product_count}"
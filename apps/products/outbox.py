@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import time
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def get_sink():
+    """The sink configured in ``OUTBOX_SINK`` (``BACKEND`` path and ``OPTIONS``)."""
+    config = settings.OUTBOX_SINK
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+class FileSink:
+    """Appends events to ``path`` as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.writelines(json.dumps(event, cls=DjangoJSONEncoder) + "\n" for event in events)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+
+class MemorySink:
+    """Keeps events in ``MemorySink.events``, for tests and benchmarks."""
+
+    events = []
+
+    def __init__(self, **options):
+        pass
+
+    def send(self, events):
+        MemorySink.events.extend(events)
+
+
+class WebhookSink:
+    """POSTs each batch as ``{"events": [...]}`` JSON to ``url``; any non-2xx fails it."""
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url, self.timeout, self.headers = url, timeout, headers or {}
+
+    def send(self, events):
+        body = json.dumps({"events": events}, cls=DjangoJSONEncoder).encode()
+        request = urllib.request.Request(
+            self.url, data=body, method="POST", headers={"Content-Type": "application/json", **self.headers}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def as_message(event):
+    return {
+        "id": event.pk,
+        "type": event.type,
+        "key": event.key,
+        "occurred_at": event.created_at,
+        "data": event.payload,
+    }
+
+
+def claim_batch(batch_size, claim_seconds):
+    """
+    Claim the oldest ``batch_size`` pending events for ``claim_seconds``;
+    returns them, or ``[]`` when there are none or another relay holds them.
+
+    One short transaction locking the head of the outbox: a second relay
+    waits for it, then sees the claim and backs off rather than taking the
+    batch behind it, so batches (and every key) stay in order.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(OutboxEvent.objects.select_for_update().filter(sent_at__isnull=True).order_by("id")[:batch_size])
+        if any(event.claimed_until and event.claimed_until > now for event in events):
+            return []
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            claimed_until=now + timedelta(seconds=claim_seconds)
+        )
+    return events
+
+
+def relay_batch(sink, batch_size, claim_seconds=None):
+    """
+    Send the oldest ``batch_size`` pending events; returns how many were sent.
+
+    The batch is claimed and committed first, then sent with no transaction
+    open, then marked sent. A failure records the attempt on the batch,
+    releases it and re-raises: it is sent again, and everything behind it
+    waits, on the next run. Delivery is at least once.
+    """
+    if claim_seconds is None:
+        claim_seconds = settings.OUTBOX_CLAIM_SECONDS
+    events = claim_batch(batch_size, claim_seconds)
+    if not events:
+        return 0
+    claimed = OutboxEvent.objects.filter(pk__in=[event.pk for event in events])
+    try:
+        sink.send([as_message(event) for event in events])
+    except Exception as exc:
+        claimed.update(claimed_until=None, attempts=F("attempts") + 1, last_error=str(exc)[:1000])
+        raise
+    claimed.update(sent_at=timezone.now(), claimed_until=None)
+    return len(events)
+
+
+def relay_events(batch_size=500, max_batches=None, sink=None):
+    """
+    Drain the outbox into the sink in id order, ``batch_size`` events at a
+    time, until it is empty, another relay is draining it, or
+    ``max_batches`` were sent.
+
+    Returns ``{"sent": n, "batches": n, "seconds": s}``. If the sink fails
+    the error is re-raised (see ``relay_batch``).
+    """
+    sink = sink or get_sink()
+    started = time.monotonic()
+    report = {"sent": 0, "batches": 0, "seconds": 0.0}
+    while max_batches is None or report["batches"] < max_batches:
+        sent = relay_batch(sink, batch_size)
+        if not sent:
+            break
+        report["sent"] += sent
+        report["batches"] += 1
+    report["seconds"] = round(time.monotonic() - started, 3)
+    if report["sent"]:
+        logger.info("products.outbox", extra=report)
+    return report
+
+
+def prune_sent(retention):
+    """Delete events sent more than ``retention`` ago."""
+    return OutboxEvent.objects.filter(sent_at__lt=timezone.now() - retention).delete()[0]
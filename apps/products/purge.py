@@ -0,0 +1,122 @@
+import logging
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Category, Product, ProductVideo
+from .storage import video_storage
+
+logger = logging.getLogger(__name__)
+
+# children first, so purging a parent rarely has anything left to cascade to
+PURGE_ORDER = (ProductVideo, Product, Category)
+
+# ProductVideo lookup for the videos a batch of each model takes with it
+_VIDEO_LOOKUPS = {ProductVideo: "pk__in", Product: "product__in", Category: "product__category__in"}
+
+
+def purgeable(model, cutoff):
+    """Rows of ``model`` soft-deleted before ``cutoff``."""
+    qs = model.objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+    if model is Category:
+        # a product restored on its own must not go with its old category,
+        # nor one deleted after it, whose retention has not run out
+        qs = qs.exclude(products__is_deleted=False).exclude(products__deleted_at__gte=cutoff)
+    return qs
+
+
+def delete_files(names):
+    storage, failed = video_storage(), 0
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception:
+            # left for reconcile_media, which finds it unreferenced
+            logger.exception(f"Could not delete video file {name}")
+            failed += 1
+    return failed
+
+
+def purge_batch(model, pks, cutoff):
+    """
+    Hard-delete the rows of ``model`` among ``pks`` that are still purgeable.
+
+    One short transaction; files of the videos going with them that no
+    other video references are deleted once it commits. Returns ``({model label: rows}, files)``.
+    """
+    with transaction.atomic():
+        pks = list(purgeable(model, cutoff).filter(pk__in=pks).values_list("pk", flat=True))
+        if not pks:
+            return {}, 0
+        files = set(
+            ProductVideo.objects.filter(**{_VIDEO_LOOKUPS[model]: pks}).exclude(file="").values_list("file", flat=True)
+        )
+        _, rows = model.objects.filter(pk__in=pks).hard_delete()
+        # a file can be shared (duplicate uploads are linked): keep it for the videos left
+        files -= set(ProductVideo.objects.filter(file__in=files).values_list("file", flat=True))
+        transaction.on_commit(lambda: delete_files(files))
+    return rows, len(files)
+
+
+def purge_deleted(retention, batch_size=500, pause=0.05, max_seconds=None, dry_run=False, progress=None):
+    """
+    Hard-delete catalog rows soft-deleted more than ``retention`` ago.
+
+    Works through ``PURGE_ORDER`` in primary-key batches of ``batch_size``,
+    each in its own transaction, sleeping ``pause`` seconds between batches
+    so live traffic keeps the database; stops after ``max_seconds`` (the
+    next run carries on). ``progress(report)`` is called after every batch.
+    With ``dry_run`` only counts what would go.
+
+    Returns ``{"rows": {model label: n}, "files": n, "batches": n,
+    "seconds": s, "complete": bool}``, rows including cascades.
+    """
+    started = time.monotonic()
+    cutoff = timezone.now() - retention
+    report = {"rows": Counter(), "files": 0, "batches": 0, "seconds": 0.0, "complete": True, "dry_run": dry_run}
+
+    if dry_run:
+        for model in PURGE_ORDER:
+            report["rows"][model._meta.label] = purgeable(model, cutoff).count()
+        report["rows"] = dict(report["rows"])
+        return report
+
+    for model in PURGE_ORDER:
+        last = 0
+        while True:
+            if max_seconds is not None and time.monotonic() - started > max_seconds:
+                report["complete"] = False
+                break
+            pks = list(
+                purgeable(model, cutoff).filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last = pks[-1]
+            batch_started = time.monotonic()
+            rows, files = purge_batch(model, pks, cutoff)
+            report["rows"].update(rows)
+            report["files"] += files
+            report["batches"] += 1
+            report["seconds"] = round(time.monotonic() - started, 3)
+            logger.info(
+                "products.purge",
+                extra={
+                    "model": model._meta.label,
+                    "rows": sum(rows.values()),
+                    "files": files,
+                    "batch_ms": round((time.monotonic() - batch_started) * 1000, 1),
+                },
+            )
+            if progress:
+                progress(report)
+            if pause:
+                time.sleep(pause)
+        if not report["complete"]:
+            break
+
+    report["rows"] = {label: rows for label, rows in report["rows"].items() if rows}
+    report["seconds"] = round(time.monotonic() - started, 3)
+    return report
@@ -0,0 +1,156 @@
+import os
+import shutil
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import PRODUCT_VIDEO_ROOT, ProductVideo
+from .storage import video_storage
+
+KEEP = "keep"
+RECENT = "recent"  # unreferenced, but may be an upload in progress
+ORPHAN = "orphan"
+EXPIRED = "expired"
+
+
+def iter_files(root, relative=""):
+    """
+    ``(name, DirEntry)`` for every file below ``root/relative``, names
+    relative to ``root``.
+
+    Depth-first over ``os.scandir``: memory holds one open directory
+    iterator per level, however many entries each has.
+    """
+    try:
+        entries = os.scandir(os.path.join(root, relative))
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            name = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(root, name)
+            elif entry.is_file(follow_symlinks=False):
+                yield name, entry
+
+
+def classify(names, retention_cutoff):
+    """
+    ``{name: KEEP | EXPIRED}`` for the stored names referenced by a video
+    (absent names are orphans). A file is expired when every video using it
+    is soft-deleted, or belongs to a soft-deleted product, since before
+    ``retention_cutoff``.
+    """
+    verdicts = {}
+    rows = ProductVideo.objects.filter(file__in=names).values_list(
+        "file", "is_deleted", "deleted_at", "product__is_deleted", "product__deleted_at"
+    )
+    for name, deleted, deleted_at, product_deleted, product_deleted_at in rows:
+        if deleted:
+            gone_at = deleted_at
+        elif product_deleted:
+            gone_at = product_deleted_at
+        else:
+            gone_at = None
+        expired = gone_at is not None and gone_at < retention_cutoff
+        if verdicts.get(name) != KEEP:
+            verdicts[name] = EXPIRED if expired else KEEP
+    return verdicts
+
+
+def reconcile_multipart(root, young_after, dry_run):
+    """
+    Abandoned multipart uploads under ``root`` (``.multipart/<upload_id>/``):
+    those with no part written since ``young_after`` (a timestamp) are
+    deleted unless ``dry_run``. A completed or aborted upload removes its
+    own directory, so what is left belongs to a process that died.
+    """
+    report = {"uploads": 0, "stale": 0, "deleted": 0, "errors": 0, "bytes": 0}
+    try:
+        entries = os.scandir(root)
+    except FileNotFoundError:
+        return report
+    with entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            report["uploads"] += 1
+            parts = [part.stat(follow_symlinks=False) for _, part in iter_files(entry.path)]
+            touched = max([entry.stat(follow_symlinks=False).st_mtime, *(part.st_mtime for part in parts)])
+            if touched > young_after:
+                continue
+            report["stale"] += 1
+            report["bytes"] += sum(part.st_size for part in parts)
+            if dry_run:
+                continue
+            try:
+                shutil.rmtree(entry.path)
+                report["deleted"] += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                report["errors"] += 1
+    return report
+
+
+def reconcile_media(retention=timedelta(days=30), grace=timedelta(days=1), dry_run=True, batch_size=500, samples=20):
+    """
+    Find (and unless ``dry_run``, delete) video files nothing needs.
+
+    Walks ``<video storage>/products/`` (local storage only) and looks each
+    batch of ``batch_size`` names up in ``ProductVideo.file`` (one indexed
+    query per batch). Deleted are files no row references (failed uploads, hard
+    deleted products and categories) once they are older than ``grace``,
+    which covers uploads whose row is not committed yet, and files whose
+    videos were soft-deleted more than ``retention`` ago. Rows are left to
+    the purge. Multipart uploads abandoned for longer than ``grace`` go too
+    (``reconcile_multipart``).
+
+    Returns a report: counts and bytes per verdict, deleted files and
+    errors, plus up to ``samples`` example names per verdict, and the
+    multipart upload counts.
+    """
+    storage = video_storage()
+    root = storage.path("")
+    now = timezone.now()
+    young_after = (now - grace).timestamp()
+    counts, sizes, examples = Counter(), Counter(), {ORPHAN: [], EXPIRED: []}
+
+    files = iter_files(root, PRODUCT_VIDEO_ROOT)
+    while batch := list(islice(files, batch_size)):
+        verdicts = classify([name for name, _ in batch], now - retention)
+        for name, entry in batch:
+            verdict = verdicts.get(name, ORPHAN)
+            stat = entry.stat(follow_symlinks=False)
+            # a hard-linked copy keeps the source's mtime; linking updates ctime
+            if verdict == ORPHAN and max(stat.st_mtime, stat.st_ctime) > young_after:
+                verdict = RECENT
+            counts[verdict] += 1
+            sizes[verdict] += stat.st_size
+            if verdict in (KEEP, RECENT):
+                continue
+            if len(examples[verdict]) < samples:
+                examples[verdict].append(name)
+            if dry_run:
+                continue
+            try:
+                os.remove(entry.path)
+                counts["deleted"] += 1
+                sizes["deleted"] += stat.st_size
+            except FileNotFoundError:
+                pass
+            except OSError:
+                counts["errors"] += 1
+
+    multipart = reconcile_multipart(os.path.join(root, storage.multipart_dir), young_after, dry_run)
+
+    return {
+        "dry_run": dry_run,
+        "scanned": sum(counts[verdict] for verdict in (KEEP, RECENT, ORPHAN, EXPIRED)),
+        "files": {key: counts[key] for key in (KEEP, RECENT, ORPHAN, EXPIRED, "deleted", "errors")},
+        "bytes": {key: sizes[key] for key in (KEEP, RECENT, ORPHAN, EXPIRED, "deleted")},
+        "examples": examples,
+        "multipart": multipart,
+    }
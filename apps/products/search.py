@@ -0,0 +1,108 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import Category, Product
+
+# model -> (FTS5 table, indexed columns). The tables and the triggers keeping
+# them in sync with non-deleted rows are created by migration 0002.
+FTS_INDEXES = {
+    Product: ("products_product_fts", ("title", "description")),
+    Category: ("products_category_fts", ("name",)),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_available = {}
+
+
+def fts_available(model):
+    """
+    True when the model has an FTS5 index on the current database.
+
+    Only a found table is remembered: one missing now (migrations not run
+    yet) is looked for again on the next call.
+    """
+    if model not in FTS_INDEXES or connection.vendor != "sqlite":
+        return False
+    key = (connection.alias, connection.settings_dict["NAME"], model)
+    if key not in _available:
+        table = FTS_INDEXES[model][0]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+            if cursor.fetchone() is None:
+                return False
+        _available[key] = True
+    return True
+
+
+def build_match_query(terms):
+    """
+    FTS5 query matching every word of ``terms`` as a prefix.
+
+    Words are re-tokenized and quoted, so user input can never be parsed as
+    FTS5 syntax (operators, column filters, unbalanced quotes).
+    """
+    tokens = _TOKEN_RE.findall(" ".join(terms))
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def full_text_search(queryset, terms, rank=True):
+    """
+    Restrict ``queryset`` to rows whose FTS document matches ``terms``.
+
+    Filters on the rowids the FTS table matches, so the match is an index
+    lookup rather than a ``LIKE '%term%'`` scan; with ``rank`` the rows are
+    ordered by bm25 relevance (best first). Returns ``None`` if there is
+    nothing to search.
+    """
+    match = build_match_query(terms)
+    if not match:
+        return None
+    table, _ = FTS_INDEXES[queryset.model]
+    base = queryset.model._meta.db_table
+    qs = queryset.filter(id__in=RawSQL(f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s', [match]))
+    if rank:
+        # bm25() only exists within the MATCH query: run it once into a
+        # materialized table (SQLite indexes it for the lookups), rather than
+        # once per row, which costs a full match each
+        rank_sql = (
+            f'WITH ranks AS MATERIALIZED (SELECT rowid AS id, bm25("{table}") AS rank FROM "{table}" '
+            f'WHERE "{table}" MATCH %s) SELECT rank FROM ranks WHERE ranks.id = "{base}"."id"'
+        )
+        qs = qs.annotate(search_rank=RawSQL(rank_sql, [match])).order_by("search_rank", "-id")
+    return qs
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` backed by SQLite FTS5 where the model has an index.
+
+    Results are ranked by relevance unless ``?ordering=`` is given (the
+    ordering filter runs after this one). Other databases, and models without
+    an index, fall back to DRF's ``icontains`` search over ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not fts_available(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        results = full_text_search(queryset, terms, rank=True)
+        return queryset.none() if results is None else results
+
+
+def rebuild_index(model):
+    """Repopulate ``model``'s FTS table from its non-deleted rows. Returns the row count."""
+    table, columns = FTS_INDEXES[model]
+    base = model._meta.db_table
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{table}"')
+        cursor.execute(
+            f'INSERT INTO "{table}" (rowid, {column_list}) '
+            f'SELECT "id", {column_list} FROM "{base}" WHERE NOT "is_deleted"'
+        )
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO \"{table}\" (\"{table}\") VALUES ('optimize')")
+    return count
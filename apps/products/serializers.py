@@ -1,7 +1,23 @@
+from django.db.models import Sum
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Category, Product, ProductVideo
+from .models import Category, ExportJob, Product, ProductVideo
+from .storage import store_video
+from apps.core.serializers import TimedSerializerMixin
 from apps.user.constants import UserRoles
 
+MAX_VIDEO_MB = 20
+MAX_PRODUCT_VIDEOS_MB = 20
+
+
+def check_video_quota(product, sizes):
+    """Raise unless videos of ``sizes`` bytes fit in ``product``'s allowance (``product`` may be None)."""
+    existing_size = 0
+    if product is not None:
+        existing_size = product.videos.aggregate(total=Sum("size"))["total"] or 0
+    if existing_size + sum(sizes) > MAX_PRODUCT_VIDEOS_MB * 1024 * 1024:
+        raise serializers.ValidationError(f"Total videos size for this product must be <= {MAX_PRODUCT_VIDEOS_MB} MB")
+
 
 class ProductVideoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,13 +27,21 @@ class ProductVideoSerializer(serializers.ModelSerializer):
 
     def validate_file(self, value):
         # individual file size limit: not strictly required, but checking
-        max_single_mb = 20
-        if value.size > max_single_mb * 1024 * 1024:
-            raise serializers.ValidationError("Single video must be <= 20 MB")
+        if value.size > MAX_VIDEO_MB * 1024 * 1024:
+            raise serializers.ValidationError(f"Single video must be <= {MAX_VIDEO_MB} MB")
         return value
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class CategorySummarySerializer(serializers.ModelSerializer):
+    """A product's category, for ``?expand=category``."""
+
+    class Meta:
+        model = Category
+        fields = ["id", "category_id", "name"]
+        read_only_fields = fields
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_by = serializers.SerializerMethodField()
     updated_by = serializers.SerializerMethodField()
     videos = ProductVideoSerializer(many=True, required=False, read_only=True)
@@ -67,23 +91,16 @@ class ProductSerializer(serializers.ModelSerializer):
         return value
 
     def validate_status(self, value):
-        allowed = [st[0] for st in Product.STATUS_CHOICES]
-        if value not in allowed:
+        if value not in Product.STATUS_VALUES:
+            allowed = [st[0] for st in Product.STATUS_CHOICES]
             raise serializers.ValidationError(f"Invalid status. Allowed: {allowed}")
         return value
 
     def validate(self, attrs):
         # check total video size if video_files provided
         video_files = attrs.get("video_files", [])
-        if self.instance:
-            # existing product
-            existing_size = sum([v.file.size for v in self.instance.videos.all() if v.file and hasattr(v.file, "size")])
-        else:
-            existing_size = 0
-
-        new_total = existing_size + sum([f.size for f in video_files])
-        if new_total > 20 * 1024 * 1024:
-            raise serializers.ValidationError("Total videos size for this product must be <= 20 MB")
+        if video_files:
+            check_video_quota(self.instance, [f.size for f in video_files])
         return attrs
 
     def create(self, validated_data):
@@ -95,12 +112,7 @@ class ProductSerializer(serializers.ModelSerializer):
             product.created_by = user
             product.updated_by = user
             product.save()
-        
-        for f in video_files:
-            pv = ProductVideo.objects.create(product=product, file=f)
-            from apps.products.tasks import process_uploaded_video
-            process_uploaded_video.delay(pv.id)
-        
+        self.add_videos(product, video_files)
         return product
 
     def update(self, instance, validated_data):
@@ -112,16 +124,20 @@ class ProductSerializer(serializers.ModelSerializer):
         if user:
             instance.updated_by = user
         instance.save()
-        
-        for f in video_files:
-            pv = ProductVideo.objects.create(product=instance, file=f)
-            from apps.products.tasks import process_uploaded_video
-            process_uploaded_video.delay(pv.id)
-        
+        self.add_videos(instance, video_files)
         return instance
 
+    def add_videos(self, product, video_files):
+        if not video_files:
+            return
+        # once per request, and only with files: the tasks module loads Celery
+        from apps.products.tasks import enqueue_video_processing
 
-class CategorySerializer(serializers.ModelSerializer):
+        for f in video_files:
+            enqueue_video_processing(store_video(product, f))
+
+
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     created_by = serializers.SerializerMethodField()
     updated_by = serializers.SerializerMethodField()
     products_count = serializers.SerializerMethodField()
@@ -138,7 +154,11 @@ class CategorySerializer(serializers.ModelSerializer):
         return getattr(obj.updated_by, "email", None)
 
     def get_products_count(self, obj):
-        return obj.products.filter(is_deleted=False).count()
+        # annotated by CategoryViewSet; single instances (create/update) fall back to a query
+        count = getattr(obj, "active_products_count", None)
+        if count is None:
+            count = obj.products.filter(is_deleted=False).count()
+        return count
 
     def validate_name(self, value):
         if len(value) > 50:
@@ -161,3 +181,24 @@ class CategorySerializer(serializers.ModelSerializer):
         if user and user.is_authenticated:
             instance.updated_by = user
         return super().update(instance, validated_data)
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    format = serializers.CharField(read_only=True)
+    progress = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id", "kind", "format", "status", "processed", "total", "progress", "error",
+            "download_url", "created_at", "started_at", "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_SUCCESS:
+            return None
+        url = reverse("export-job-download", args=[obj.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
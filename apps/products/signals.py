@@ -0,0 +1,70 @@
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import autocomplete, stats
+from .models import Category, CategoryStats, Product, ProductVideo
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def update_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.INDEXES[sender].apply, instance))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.INDEXES[sender].apply, instance, deleted=True))
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductVideo)
+def load_stats_state(sender, instance, raw=False, **kwargs):
+    # what the stats counted is the stored row, not what this instance was
+    # loaded with: another request may have saved it since. Locked until the
+    # save commits (StatsLockedSaveMixin).
+    instance._stats_state = None
+    if raw or instance._state.adding:
+        return
+    rows = sender.objects.select_for_update().filter(pk=instance.pk)
+    if sender is Product:
+        row = rows.values_list("category_id", "status", "price", "is_deleted").first()
+        instance._stats_state = row and (row[0], row[1], Decimal(str(row[2])), row[3])
+    else:
+        instance._stats_state = rows.values_list("product_id", "size", "is_deleted").first()
+
+
+@receiver(post_save, sender=Product)
+def update_product_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        stats.product_changed(instance, None if created else instance._stats_state, created)
+        instance._stats_state = instance.stats_state()
+
+
+@receiver(post_save, sender=ProductVideo)
+def update_video_stats(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        state = instance.stats_state()
+        stats.video_changed(instance, None if created else instance._stats_state, state)
+        instance._stats_state = state
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_stats(sender, instance, **kwargs):
+    stats.product_removed(instance)
+
+
+@receiver(post_delete, sender=ProductVideo)
+def remove_video_stats(sender, instance, **kwargs):
+    stats.video_changed(instance, instance.stats_state(), None)
+
+
+@receiver(post_save, sender=Category)
+def drop_deleted_category_stats(sender, instance, raw=False, **kwargs):
+    # Category.soft_delete takes all its products with a bulk update, no signals
+    if not raw and instance.is_deleted:
+        CategoryStats.objects.filter(category=instance).delete()
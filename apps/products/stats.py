@@ -0,0 +1,201 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import CategoryStats, Product, ProductVideo
+
+CENTS = Decimal("0.01")
+
+
+def shift(category_id, status, products=0, price_sum=0, videos=0, video_bytes=0, added=None, removed=None):
+    """
+    Add to the ``(category_id, status)`` row in one UPDATE (an INSERT the
+    first time). ``added`` widens the price bounds; ``removed`` marks them
+    stale if it was one of them.
+    """
+    deltas = {"product_count": products, "price_sum": price_sum, "video_count": videos, "video_bytes": video_bytes}
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if added is not None:
+        changes["price_min"] = Least(Coalesce(F("price_min"), Value(added)), Value(added))
+        changes["price_max"] = Greatest(Coalesce(F("price_max"), Value(added)), Value(added))
+    if removed is not None:
+        changes["bounds_stale"] = Case(
+            When(Q(price_min=removed) | Q(price_max=removed), then=Value(True)), default=F("bounds_stale")
+        )
+    if not changes:
+        return
+    rows = CategoryStats.objects.filter(category_id=category_id, status=status)
+    if rows.update(**changes) or products <= 0:
+        # a row starts with a product; anything else missing one predates
+        # the table (see rebuild_catalog_stats)
+        return
+    try:
+        with transaction.atomic():
+            CategoryStats.objects.create(
+                category_id=category_id,
+                status=status,
+                product_count=products,
+                price_sum=price_sum,
+                price_min=added,
+                price_max=added,
+                video_count=videos,
+                video_bytes=video_bytes,
+            )
+    except IntegrityError:
+        rows.update(**changes)  # created meanwhile
+
+
+def live_videos(product):
+    """Count and bytes of ``product``'s live videos, from its prefetched ``videos`` if loaded."""
+    prefetched = getattr(product, "_prefetched_objects_cache", {}).get("videos")
+    if prefetched is not None:
+        live = [video.size for video in prefetched if not video.is_deleted]
+        return len(live), sum(live)
+    totals = ProductVideo.objects.filter(product_id=product.pk, is_deleted=False).aggregate(
+        count=Count("id"), size=Coalesce(Sum("size"), 0)
+    )
+    return totals["count"], totals["size"]
+
+
+def product_changed(product, old, created):
+    """
+    Move ``product`` between rows after a save: ``old`` is its
+    ``stats_state()`` before (``None`` when created).
+    """
+    new = product.stats_state()
+    if new is None:
+        product.refresh_from_db(fields=["category", "status", "price", "is_deleted"])
+        new = product.stats_state()
+    if old == new:
+        return
+    before = old if old is not None and not old[3] else None
+    after = new if not new[3] else None
+    videos = (0, 0)
+    if not created and (before and before[:2]) != (after and after[:2]):
+        # its videos move with it
+        videos = live_videos(product)
+    if before is not None and after is not None and before[:2] == after[:2]:
+        # same row, new price
+        shift(*after[:2], price_sum=after[2] - before[2], added=after[2], removed=before[2])
+        return
+    with transaction.atomic(savepoint=False):
+        if before is not None:
+            category_id, status, price, _ = before
+            shift(category_id, status, -1, -price, -videos[0], -videos[1], removed=price)
+        if after is not None:
+            category_id, status, price, _ = after
+            shift(category_id, status, 1, price, videos[0], videos[1], added=price)
+
+
+def product_removed(product):
+    state = product.stats_state()
+    if state is not None and not state[3]:
+        category_id, status, price, _ = state
+        shift(category_id, status, -1, -price, removed=price)
+
+
+def video_changed(video, old, new):
+    """
+    Count a video's creation, (soft) deletion, restore or new size against
+    its product's row; ``old``/``new`` are ``stats_state()`` values, ``None``
+    when it did not / no longer exist(s).
+    """
+    count = (0 if old is None or old[2] else 1), (0 if new is None or new[2] else 1)
+    size = (old[1] if count[0] else 0), (new[1] if count[1] else 0)
+    if count[0] == count[1] and size[0] == size[1]:
+        return
+    product = Product.objects.filter(pk=video.product_id, is_deleted=False).values_list("category_id", "status").first()
+    if product is not None:
+        shift(*product, videos=count[1] - count[0], video_bytes=size[1] - size[0])
+
+
+def rebuild(category_ids=None):
+    """Recompute the rows (of ``category_ids``, default all) from the catalog; returns the row count."""
+    products = Product.objects.filter(is_deleted=False)
+    videos = ProductVideo.objects.filter(is_deleted=False, product__is_deleted=False)
+    rows = CategoryStats.objects.all()
+    if category_ids is not None:
+        products = products.filter(category__in=category_ids)
+        videos = videos.filter(product__category__in=category_ids)
+        rows = rows.filter(category__in=category_ids)
+
+    stats = {}
+    for row in products.values("category_id", "status").order_by().annotate(
+        count=Count("id"), total=Sum("price"), low=Min("price"), high=Max("price")
+    ):
+        stats[row["category_id"], row["status"]] = CategoryStats(
+            category_id=row["category_id"],
+            status=row["status"],
+            product_count=row["count"],
+            price_sum=row["total"],
+            price_min=row["low"],
+            price_max=row["high"],
+        )
+    for row in videos.values("product__category_id", "product__status").order_by().annotate(
+        count=Count("id"), size=Sum("size")
+    ):
+        entry = stats[row["product__category_id"], row["product__status"]]
+        entry.video_count, entry.video_bytes = row["count"], row["size"] or 0
+
+    with transaction.atomic(savepoint=False):
+        rows.delete()
+        CategoryStats.objects.bulk_create(stats.values())
+    return len(stats)
+
+
+FIELDS = ("pk", "category_id", "status", "product_count", "price_sum", "price_min", "price_max", "bounds_stale",
+          "video_count", "video_bytes")
+TOTALS = ("product_count", "price_sum", "video_count", "video_bytes")
+
+
+def refresh_bounds(rows):
+    """Recompute the price bounds of stale ``rows`` (dicts of ``FIELDS``, in place and stored)."""
+    for row in rows:
+        if not row["bounds_stale"]:
+            continue
+        bounds = Product.objects.filter(
+            category_id=row["category_id"], status=row["status"], is_deleted=False
+        ).aggregate(price_min=Min("price"), price_max=Max("price"))
+        row.update(bounds, bounds_stale=False)
+        CategoryStats.objects.filter(pk=row["pk"]).update(**bounds, bounds_stale=False)
+
+
+def as_dict(row):
+    count = row["product_count"]
+    return {
+        "products": count,
+        "price_min": row["price_min"],
+        "price_max": row["price_max"],
+        "price_avg": (row["price_sum"] / count).quantize(CENTS) if count else None,
+        "videos": row["video_count"],
+        "video_bytes": row["video_bytes"],
+    }
+
+
+def summary(category=None):
+    """
+    Stats per category and status, plus totals per status, from the summary
+    table alone: the cost depends on the number of categories, not products.
+    """
+    rows = CategoryStats.objects.filter(product_count__gt=0).order_by("category_id", "status")
+    if category is not None:
+        rows = rows.filter(category=category)
+    rows = list(rows.values(*FIELDS, code=F("category__category_id"), name=F("category__name")))
+    refresh_bounds(rows)
+
+    categories, totals = {}, {}
+    for row in rows:
+        entry = categories.setdefault(
+            row["category_id"],
+            {"category": row["category_id"], "category_id": row["code"], "name": row["name"], "statuses": {}},
+        )
+        entry["statuses"][row["status"]] = as_dict(row)
+        total = totals.setdefault(row["status"], dict.fromkeys(TOTALS, 0) | {"price_min": None, "price_max": None})
+        for field in TOTALS:
+            total[field] += row[field]
+        for bound, pick in (("price_min", min), ("price_max", max)):
+            if row[bound] is not None:
+                total[bound] = row[bound] if total[bound] is None else pick(total[bound], row[bound])
+    return {"categories": list(categories.values()), "totals": {status: as_dict(row) for status, row in totals.items()}}
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.urls import reverse
+
+_SIGNING_SALT = "apps.products.storage"
+
+
+def video_storage():
+    """The storage behind ``ProductVideo.file`` (``STORAGES["videos"]``)."""
+    return storages["videos"]
+
+
+class ObjectStorageMixin:
+    """
+    Object-store operations used for product videos, on top of Django's
+    ``Storage`` API.
+
+    * ``start_multipart(name)`` -> ``(name, upload_id)``, the name being the
+      available one the parts will be assembled under; then
+      ``upload_part(name, upload_id, number, data)`` -> part tag,
+      ``complete_multipart(name, upload_id, tags)`` or
+      ``abort_multipart(name, upload_id)``.
+    * ``copy(source, target)`` -> stored name: a copy made by the store
+      itself, without the bytes passing through Django.
+    * ``presigned_upload(name, max_size, expires)`` ->
+      ``{"method", "url", "fields"}`` for a client to send the file straight
+      to the store, and ``presigned_download(name, expires)`` -> URL.
+
+    ``save_chunks(name, chunks, size)`` stores an upload, in parts once it
+    is larger than ``VIDEO_MULTIPART_THRESHOLD``.
+    """
+
+    def start_multipart(self, name):
+        raise NotImplementedError
+
+    def upload_part(self, name, upload_id, number, data):
+        raise NotImplementedError
+
+    def complete_multipart(self, name, upload_id, tags):
+        raise NotImplementedError
+
+    def abort_multipart(self, name, upload_id):
+        raise NotImplementedError
+
+    def copy(self, source, target):
+        raise NotImplementedError
+
+    def presigned_upload(self, name, max_size, expires):
+        raise NotImplementedError
+
+    def presigned_download(self, name, expires):
+        raise NotImplementedError
+
+    def save_chunks(self, name, chunks, size):
+        if size <= settings.VIDEO_MULTIPART_THRESHOLD:
+            return self.save(name, ContentFile(b"".join(chunks)))
+
+        name, upload_id = self.start_multipart(name)
+        tags, buffer = [], bytearray()
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                # object stores want parts of at least 5 MiB (except the last)
+                if len(buffer) >= settings.VIDEO_MULTIPART_CHUNK_SIZE:
+                    tags.append(self.upload_part(name, upload_id, len(tags) + 1, bytes(buffer)))
+                    buffer.clear()
+            if buffer or not tags:
+                tags.append(self.upload_part(name, upload_id, len(tags) + 1, bytes(buffer)))
+            return self.complete_multipart(name, upload_id, tags)
+        except BaseException:
+            self.abort_multipart(name, upload_id)
+            raise
+
+
+def sign_blob(name, method, expires, **extra):
+    """A token allowing ``method`` on the object ``name`` for ``expires`` seconds."""
+    payload = {"name": name, "method": method, "expires": int(time.time()) + expires, **extra}
+    return signing.dumps(payload, salt=_SIGNING_SALT, compress=True)
+
+
+def unsign_blob(token, method):
+    """The payload of a ``sign_blob`` token for ``method``, or ``None`` if invalid or expired."""
+    try:
+        payload = signing.loads(token, salt=_SIGNING_SALT)
+    except signing.BadSignature:
+        return None
+    if payload.get("method") != method or payload["expires"] < time.time():
+        return None
+    return payload
+
+
+class LocalObjectStorage(ObjectStorageMixin, FileSystemStorage):
+    """
+    The object-store API over ``FileSystemStorage``: for development, tests
+    and single-host deployments.
+
+    Multipart parts are kept under ``.multipart/<upload_id>/`` until
+    completed; copies are hard links where the filesystem allows (so
+    duplicates take no space); presigned URLs point at ``StorageBlobView``,
+    which checks the signature instead of the user.
+    """
+
+    multipart_dir = ".multipart"
+
+    def _parts_path(self, upload_id):
+        uuid.UUID(upload_id)  # never a path
+        return self.path(os.path.join(self.multipart_dir, upload_id))
+
+    def start_multipart(self, name):
+        # reserve the name (empty until completed) so no other upload takes it
+        name = self.save(name, ContentFile(b""))
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._parts_path(upload_id))
+        return name, upload_id
+
+    def upload_part(self, name, upload_id, number, data):
+        digest = hashlib.md5(data, usedforsecurity=False).hexdigest()
+        with open(os.path.join(self._parts_path(upload_id), f"{number:05d}"), "wb") as fh:
+            fh.write(data)
+        return f"{number}:{digest}"
+
+    def complete_multipart(self, name, upload_id, tags):
+        parts = self._parts_path(upload_id)
+        target = self.path(name)
+        with open(f"{target}.part", "wb") as out:
+            for tag in tags:
+                number = int(tag.split(":", 1)[0])
+                with open(os.path.join(parts, f"{number:05d}"), "rb") as fh:
+                    shutil.copyfileobj(fh, out, 1024 * 1024)
+        os.replace(f"{target}.part", target)
+        shutil.rmtree(parts)
+        return name
+
+    def abort_multipart(self, name, upload_id):
+        shutil.rmtree(self._parts_path(upload_id), ignore_errors=True)
+        self.delete(name)
+
+    def copy(self, source, target):
+        while True:
+            name = self.get_available_name(target)
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(self.path(source), path)
+                return name
+            except FileExistsError:
+                continue  # taken meanwhile
+            except OSError:
+                break  # no hard links here (other device, filesystem)
+        with open(self.path(source), "rb") as fh:
+            return self.save(target, File(fh))
+
+    def presigned_upload(self, name, max_size, expires):
+        url = reverse("storage-blob", args=[sign_blob(name, "PUT", expires, max_size=max_size)])
+        return {"method": "PUT", "url": url, "fields": {}}
+
+    def presigned_download(self, name, expires):
+        return reverse("storage-blob", args=[sign_blob(name, "GET", expires)])
+
+
+def store_video(product, uploaded):
+    """
+    Save an uploaded file as a new ``ProductVideo`` of ``product``.
+
+    The name comes from ``product_video_upload_to``. If a stored video has
+    the same SHA-256 and size, the store copies that object instead of
+    receiving the bytes again; otherwise they are written (in parts for large
+    files). The row is saved with its ``product.video_added`` event.
+    """
+    from apps.products.models import OutboxEvent, ProductVideo
+
+    video = ProductVideo(product=product, size=uploaded.size)
+    field = ProductVideo._meta.get_field("file")
+    storage = field.storage
+    name = field.generate_filename(video, uploaded.name)
+
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    video.checksum = digest.hexdigest()
+
+    duplicate = (
+        ProductVideo.objects.filter(checksum=video.checksum, size=uploaded.size)
+        .exclude(file="")
+        .values_list("file", flat=True)
+        .first()
+    )
+    if duplicate and storage.exists(duplicate):
+        video.file.name = storage.copy(duplicate, name)
+    else:
+        video.file.name = storage.save_chunks(name, uploaded.chunks(), uploaded.size)
+    with transaction.atomic(savepoint=False):
+        video.save()
+        OutboxEvent.record(video, OutboxEvent.VIDEO_ADDED)
+    return video
+
+
+def file_checksum(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as fh:
+        for chunk in fh.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,70 @@
+"""
+S3 (and S3-compatible: MinIO, R2, ...) backend for product videos.
+
+Needs ``django-storages[s3]``; select it with
+``VIDEO_STORAGE_BACKEND=apps.products.storage_s3.S3ObjectStorage`` and the
+usual ``AWS_STORAGE_BUCKET_NAME`` / credentials settings.
+"""
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .storage import ObjectStorageMixin
+
+
+class S3ObjectStorage(ObjectStorageMixin, S3Storage):
+    file_overwrite = False
+
+    @property
+    def client(self):
+        return self.connection.meta.client
+
+    def _key(self, name):
+        return self._normalize_name(clean_name(name))
+
+    def start_multipart(self, name):
+        name = self.get_available_name(name)
+        upload = self.client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=self._key(name), **self._get_write_parameters(name)
+        )
+        return name, upload["UploadId"]
+
+    def upload_part(self, name, upload_id, number, data):
+        part = self.client.upload_part(
+            Bucket=self.bucket_name, Key=self._key(name), UploadId=upload_id, PartNumber=number, Body=data
+        )
+        return part["ETag"]
+
+    def complete_multipart(self, name, upload_id, tags):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self._key(name),
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [{"ETag": tag, "PartNumber": n} for n, tag in enumerate(tags, 1)]},
+        )
+        return name
+
+    def abort_multipart(self, name, upload_id):
+        self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self._key(name), UploadId=upload_id)
+
+    def copy(self, source, target):
+        target = self.get_available_name(target)
+        self.client.copy_object(
+            Bucket=self.bucket_name,
+            Key=self._key(target),
+            CopySource={"Bucket": self.bucket_name, "Key": self._key(source)},
+        )
+        return target
+
+    def presigned_upload(self, name, max_size, expires):
+        post = self.client.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=self._key(name),
+            Conditions=[["content-length-range", 0, max_size]],
+            ExpiresIn=expires,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+    def presigned_download(self, name, expires):
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket_name, "Key": self._key(name)}, ExpiresIn=expires
+        )
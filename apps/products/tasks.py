@@ -1,41 +1,112 @@
 import logging
+from datetime import timedelta
 
-from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from cp360_config.celery import app
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, max_retries=3)
+def enqueue_video_processing(video):
+    """Queue ``process_uploaded_video`` for ``video``; small files go ahead of large ones."""
+    if video.size <= settings.VIDEO_SMALL_FILE_BYTES:
+        priority = settings.VIDEO_PRIORITY_SMALL
+    else:
+        priority = settings.VIDEO_PRIORITY_LARGE
+    process_uploaded_video.apply_async((video.pk,), priority=priority)
+
+
+@app.task(bind=True, max_retries=3, ignore_result=True)
 def process_uploaded_video(self, product_video_id):
     from apps.products.models import ProductVideo
+    from apps.products.storage import file_checksum
 
     try:
         pv = ProductVideo.objects.get(id=product_video_id)
         
         if not pv.file:
             logger.warning(f"ProductVideo {product_video_id} has no file attached")
-            return {"status": "skipped", "reason": "no_file"}
+            return
 
-        logger.info(f"Processing video {product_video_id} for product {pv.product.id}")
+        logger.info(f"Processing video {product_video_id} for product {pv.product_id}")
         
-        file_path = pv.file.path if hasattr(pv.file, "path") else str(pv.file)
-        file_size = pv.file.size if hasattr(pv.file, "size") else 0
+        # through the video storage: the file may not be on this machine
+        storage, name = pv.file.storage, pv.file.name
+        file_size = storage.size(name)
+        if not pv.checksum or pv.size != file_size:
+            # direct uploads arrive without them
+            pv.size, pv.checksum = file_size, file_checksum(storage, name)
+            pv.save(update_fields=["size", "checksum"])
         
-        logger.info(f"Video file: {file_path}, size: {file_size} bytes")
+        logger.info(f"Video file: {name}, size: {file_size} bytes")
         
         logger.info(f"Video {product_video_id} processed successfully")
         
-        return {
-            "status": "success",
-            "product_video_id": product_video_id,
-            "product_id": pv.product.id,
-            "file_size": file_size,
-        }
-        
     except ProductVideo.DoesNotExist:
         logger.error(f"ProductVideo {product_video_id} not found")
-        return {"status": "error", "reason": "not_found"}
+        return
         
     except Exception as exc:
         logger.error(f"Error processing video {product_video_id}: {str(exc)}")
         raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+
+
+@app.task(ignore_result=True)
+def run_export_job(job_id):
+    from apps.products.exports import write_export
+    from apps.products.models import ExportJob
+    from apps.products.views import CategoryViewSet, ProductViewSet
+
+    viewsets = {ExportJob.KIND_CATEGORIES: CategoryViewSet, ExportJob.KIND_PRODUCTS: ProductViewSet}
+    job = ExportJob.objects.select_related("created_by").get(pk=job_id)
+    try:
+        write_export(job, viewsets[job.kind].for_export(job.params, job.created_by))
+    except Exception as exc:
+        logger.exception(f"Export job {job_id} failed")
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        return
+    logger.info(f"Export job {job_id} finished: {job.processed} records")
+
+
+@app.task(ignore_result=True)
+def reconcile_media_files(dry_run=False):
+    from apps.products.reconcile import reconcile_media
+
+    report = reconcile_media(
+        retention=timedelta(days=settings.MEDIA_GC_RETENTION_DAYS),
+        grace=timedelta(hours=settings.MEDIA_GC_GRACE_HOURS),
+        dry_run=dry_run,
+        batch_size=settings.MEDIA_GC_BATCH_SIZE,
+    )
+    logger.info(f"Media reconciliation: {report['files']}")
+    return report
+
+
+@app.task(ignore_result=True)
+def purge_deleted_rows():
+    from apps.products.purge import purge_deleted
+
+    report = purge_deleted(
+        retention=timedelta(days=settings.PURGE_RETENTION_DAYS),
+        batch_size=settings.PURGE_BATCH_SIZE,
+        pause=settings.PURGE_BATCH_PAUSE_SECONDS,
+        max_seconds=settings.PURGE_MAX_SECONDS,
+    )
+    logger.info(f"Purge of soft-deleted rows: {report}")
+    return report
+
+
+@app.task(bind=True, max_retries=5, ignore_result=True)
+def relay_outbox(self):
+    from apps.products.outbox import prune_sent, relay_events
+
+    try:
+        relay_events(batch_size=settings.OUTBOX_BATCH_SIZE)
+    except Exception as exc:
+        logger.warning(f"Outbox relay failed: {exc}")
+        raise self.retry(exc=exc, countdown=min(300, 10 * 2 ** self.request.retries))
+    prune_sent(timedelta(days=settings.OUTBOX_RETENTION_DAYS))
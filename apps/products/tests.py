@@ -1,3 +1,1050 @@
-from django.test import TestCase
+import gzip
+import io
+import itertools
+import json
+import os
+import unittest
+import shutil
+import tempfile
+from datetime import timedelta
+from importlib.util import find_spec
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core import representation
+from apps.core.audit import audit_log
+from apps.core.models import AuditEntry
+from apps.core.nplusone import NPlusOneError, detect_nplusone
+from apps.core.pagination import encode_cursor
+from apps.core.testing import QueryBudgetMixin
+from apps.products import analytics, autocomplete, exports, search, stats
+from apps.products.models import Category, CategoryStats, ExportJob, OutboxEvent, Product, ProductVideo
+from apps.products.outbox import FileSink, MemorySink, WebhookSink, get_sink, relay_events
+from apps.products.purge import purge_deleted
+from apps.products.reconcile import reconcile_media
+from apps.products.storage import video_storage
+from apps.products.serializers import CategorySerializer
+from apps.user.constants import UserRoles
+from apps.user.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+_phones = itertools.count(5550000000)
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def make_user(name, role=UserRoles.END_USER):
+    user = User.objects.create_user(
+        email=f"{name}@example.com", username=name, phone=str(next(_phones)), password="secret123"
+    )
+    user.role = role
+    user.save(update_fields=["role"])
+    return user
+
+
+def make_catalog(owner, categories=6, products_per_category=2):
+    for c in range(categories):
+        category = Category.objects.create(name=f"Category {c}", user=owner, created_by=owner, updated_by=owner)
+        for p in range(products_per_category):
+            product = Product.objects.create(
+                category=category,
+                title=f"Product {c}-{p}",
+                price="10.50",
+                created_by=owner,
+                updated_by=owner,
+            )
+            video = ProductVideo(product=product)
+            video.file.save(f"clip-{c}-{p}.mp4", ContentFile(b"0" * 64), save=True)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    NPLUSONE_ENABLED=True,
+    NPLUSONE_RAISE=True,
+    OUTBOX_SINK={"BACKEND": "apps.products.outbox.MemorySink"},
+    AUDIT_BACKGROUND_FLUSH=False,
+)
+class CatalogTestCase(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with override_settings(MEDIA_ROOT=MEDIA_ROOT):
+            cls.agent = make_user("agent")
+            cls.staff = make_user("staff", UserRoles.STAFF)
+            make_catalog(cls.agent)
+        cls.category = Category.objects.first()
+        cls.product = Product.objects.first()
+
+    def setUp(self):
+        # rate limit buckets live in the cache and would carry over between tests
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+
+
+class CategoryQueryBudgetTests(CatalogTestCase):
+    def test_list(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse("category-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["products_count"], 2)
+
+    def test_retrieve(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse("category-detail", args=[self.category.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        with self.assertQueryBudget(3):
+            response = self.client.post(reverse("category-list"), {"name": "New", "user": self.agent.pk}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        url = reverse("category-detail", args=[self.category.pk])
+        with self.assertQueryBudget(4):
+            response = self.client.put(url, {"name": "Renamed", "user": self.agent.pk}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        url = reverse("category-detail", args=[self.category.pk])
+        with self.assertQueryBudget(3):
+            response = self.client.patch(url, {"name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        # products, their soft delete, the category's, its stats rows, and one insert for all events
+        with self.assertQueryBudget(6):
+            response = self.client.delete(reverse("category-detail", args=[self.category.pk]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_restore(self):
+        self.category.soft_delete()
+        with self.assertQueryBudget(3):
+            response = self.client.post(reverse("category-restore", args=[self.category.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["is_deleted"])
+
+    def test_export(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse("category-export"))
+        self.assertEqual(len(response.content.splitlines()), 7)
+
+    def test_export_with_products(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse("category-export"), {"include_products": "true"})
+        self.assertEqual(len(response.content.splitlines()), 13)
+
+
+class ProductQueryBudgetTests(CatalogTestCase):
+    def test_list(self):
+        with self.assertQueryBudget(3):
+            response = self.client.get(reverse("product-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"][0]["videos"]), 1)
+
+    def test_retrieve(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse("product-detail", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        payload = {"category": self.category.pk, "title": "New", "price": "1.00"}
+        # plus the stats row update, and the stored row read before the second save
+        with self.assertQueryBudget(6):
+            response = self.client.post(reverse("product-list"), payload, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        payload = {"category": self.category.pk, "title": "Renamed", "price": "2.00"}
+        # plus the stored row the stats move from, and the stats row update
+        with self.assertQueryBudget(7):
+            response = self.client.put(reverse("product-detail", args=[self.product.pk]), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_partial_update(self):
+        with self.assertQueryBudget(6):
+            response = self.client.patch(reverse("product-detail", args=[self.product.pk]), {"price": "3.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_destroy(self):
+        # the stored row, the update, its stats row and its outbox event
+        with self.assertQueryBudget(6):
+            response = self.client.delete(reverse("product-detail", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 204)
+
+    def test_restore(self):
+        self.product.soft_delete()
+        with self.assertQueryBudget(6):
+            response = self.client.post(reverse("product-restore", args=[self.product.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data["is_deleted"])
+
+    def test_approve_and_reject(self):
+        self.client.force_authenticate(self.staff)
+        # the product leaves one stats row for another; the first insert of a row is not counted here
+        for status in (Product.STATUS_SUCCESS, Product.STATUS_REJECTED):
+            CategoryStats.objects.create(category=self.category, status=status)
+        for name, expected in (("product-approve", Product.STATUS_SUCCESS), ("product-reject", Product.STATUS_REJECTED)):
+            with self.assertQueryBudget(7):
+                response = self.client.post(reverse(name, args=[self.product.pk]))
+            self.assertEqual(response.data["status"], expected)
+
+    def test_export(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse("product-export"))
+        self.assertEqual(len(response.content.splitlines()), 13)
+
+
+class ExportFormatTests(CatalogTestCase):
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_gz_matches_csv(self):
+        for name, params in (("product-export", {}), ("category-export", {"include_products": "true"})):
+            plain = self.client.get(reverse(name), params).content
+            self.assertEqual(gzip.decompress(self.export(name, format="csv.gz", **params)), plain)
+
+    def test_ndjson_keeps_types(self):
+        rows = [json.loads(line) for line in self.export("product-export", format="ndjson").splitlines()]
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]["price"], 10.5)
+        self.assertIsInstance(rows[0]["id"], int)
+        self.assertEqual(rows[0]["created_at"], Product.objects.get(pk=rows[0]["id"]).created_at.isoformat())
+
+        Product.objects.filter(category=self.category).soft_delete()
+        rows = [json.loads(line) for line in self.export("category-export", format="ndjson", include_products="true").splitlines()]
+        empty = [row for row in rows if row["category_id"] == str(self.category.category_id)]
+        self.assertEqual([(row["product_id"], row["product_price"]) for row in empty], [(None, None)])
+
+    @unittest.skipUnless(find_spec("pyarrow"), "pyarrow is not installed")
+    def test_parquet_schema(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.export("product-export", format="parquet")))
+        self.assertEqual(table.num_rows, 12)
+        self.assertEqual(str(table.schema.field("price").type), "decimal128(12, 2)")
+        self.assertEqual(str(table.schema.field("created_at").type), "timestamp[us, tz=UTC]")
+
+    @override_settings(THROTTLE_CONCURRENCY={"export": {"per_client": 1, "queue_seconds": 0, "retry_after": 10}})
+    def test_streamed_export_holds_its_slot_until_sent(self):
+        streaming = self.client.get(reverse("product-export"), {"format": "ndjson"})
+        refused = self.client.get(reverse("product-export"), {"format": "ndjson"})
+        self.assertEqual((refused.status_code, refused["Retry-After"]), (429, "10"))
+        b"".join(streaming.streaming_content)
+        self.assertEqual(len(self.export("product-export", format="ndjson").splitlines()), 12)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse("product-export"), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("format", response.data)
+
+
+class FastListTests(CatalogTestCase):
+    def assertSameAsSerializer(self, name, **params):
+        fast = self.client.get(reverse(name), params)
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(reverse(name), params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_products_match_serializer(self):
+        Product.objects.create(category=self.category, title="No owner", price="0.1")  # null created_by
+        for i in range(10):
+            Product.objects.create(category=self.category, title=f"Product extra {i}", price=f"{i}.99")
+        self.assertSameAsSerializer("product-list")
+        self.assertSameAsSerializer("product-list", search="product", page=2)
+        self.assertSameAsSerializer("product-list", ordering="price", status=Product.STATUS_UPLOADED)
+
+    def test_categories_match_serializer(self):
+        Product.objects.filter(category=self.category).soft_delete()
+        self.assertSameAsSerializer("category-list")
+        self.assertSameAsSerializer("category-list", search="categ", ordering="name")
+
+
+class SparseFieldsTests(CatalogTestCase):
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(name, args=args), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_fields_trim_output_and_queries(self):
+        with self.assertQueryBudget(2):
+            results = self.get("product-list", fields="id,title").data["results"]
+        self.assertEqual(list(results[0]), ["id", "title"])
+
+        with self.assertQueryBudget(1):
+            data = self.get("category-detail", self.category.pk, fields="name,created_by").data
+        self.assertEqual(data, {"name": self.category.name, "created_by": "agent@example.com"})
+
+    def test_expand(self):
+        with self.assertQueryBudget(2):
+            self.get("product-list", fields="title", expand="category")
+        category = self.product.category
+        self.assertEqual(
+            self.get("product-detail", self.product.pk, fields="title", expand="category").data,
+            {"category": {"id": category.pk, "category_id": str(category.category_id), "name": category.name},
+             "title": self.product.title},
+        )
+        data = self.get("category-detail", self.category.pk, expand="user").data
+        self.assertEqual(data["user"], {"id": self.agent.pk, "email": "agent@example.com", "username": "agent"})
+        self.assertEqual(data["products_count"], 2)
+
+    def test_fast_list_matches_serializer(self):
+        for name, params in (
+            ("product-list", {"fields": "id,videos,created_by", "expand": "category"}),
+            ("category-list", {"fields": "category_id,products_count", "expand": "user"}),
+        ):
+            fast = self.get(name, **params)
+            with override_settings(FAST_LIST_SERIALIZATION=False):
+                slow = self.get(name, **params)
+            self.assertEqual(fast.content, slow.content)
+
+    def test_representation_is_compiled_once_per_field_set(self):
+        representation._compile_binder.cache_clear()
+        with mock.patch("apps.core.representation.compile", wraps=compile, create=True) as compiled:
+            counts = []
+            for _ in range(2):
+                self.get("product-list")
+                self.get("product-list", fields="id,title")
+                counts.append(compiled.call_count)
+        self.assertEqual(counts[0], counts[1])
+        self.assertGreaterEqual(counts[0], 2)
+
+    def test_unknown_names(self):
+        response = self.client.get(reverse("product-list"), {"fields": "title,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", str(response.data["fields"]))
+        response = self.client.get(reverse("product-list"), {"expand": "videos"})
+        self.assertEqual(response.status_code, 400)
+
+
+class VideoFileTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.video = ProductVideo(product=self.product)
+        self.video.file.save("range.mp4", ContentFile(bytes(range(256)) * 4), save=True)
+        self.url = reverse("product-video-file", args=[self.video.pk])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, bytes(range(256)) * 4)
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response["Content-Length"], "1024")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+    def test_ranges(self):
+        response, body = self.get(range="bytes=10-19")
+        self.assertEqual((response.status_code, response["Content-Range"]), (206, "bytes 10-19/1024"))
+        self.assertEqual(body, bytes(range(10, 20)))
+
+        response, body = self.get(range="bytes=-4")
+        self.assertEqual((response["Content-Range"], body), ("bytes 1020-1023/1024", bytes([252, 253, 254, 255])))
+        response, body = self.get(range="bytes=1000-")
+        self.assertEqual(len(body), 24)
+
+        response, _ = self.get(range="bytes=2048-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */1024"))
+
+    def test_conditional_requests(self):
+        etag = self.get()[0]["ETag"]
+        self.assertEqual(self.get(if_none_match=etag)[0].status_code, 304)
+        self.assertEqual(self.get(range="bytes=0-9", if_range=etag)[0].status_code, 206)
+        self.assertEqual(self.get(range="bytes=0-9", if_range='"stale"')[0].status_code, 200)
+
+    @override_settings(MEDIA_SERVE_BACKEND="x-accel-redirect", MEDIA_ACCEL_PREFIX="/protected/")
+    def test_accel_redirect(self):
+        response, body = self.get(range="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.video.file.name}")
+        self.assertEqual(body, b"")
+
+    def test_permissions(self):
+        self.product.soft_delete()
+        self.assertEqual(self.get()[0].status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get()[0].status_code, 401)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class VideoStorageTests(CatalogTestCase):
+    def upload(self, product, content, name="clip.mp4"):
+        url = reverse("product-detail", args=[product.pk])
+        response = self.client.patch(url, {"video_files": [SimpleUploadedFile(name, content)]}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        return product.videos.order_by("-pk").first()
+
+    @override_settings(VIDEO_MULTIPART_THRESHOLD=1000, VIDEO_MULTIPART_CHUNK_SIZE=1000)
+    def test_multipart_upload(self):
+        content = bytes(range(256)) * 10
+        video = self.upload(self.product, content)
+        self.assertTrue(video.file.name.startswith(f"products/{self.product.pk}/videos/clip"))
+        self.assertEqual(video_storage().open(video.file.name).read(), content)
+        self.assertEqual((video.size, len(video.checksum)), (len(content), 64))
+
+    def test_duplicate_upload_is_copied_in_store(self):
+        first = self.upload(self.product, b"same bytes")
+        other = Product.objects.exclude(pk=self.product.pk).first()
+        second = self.upload(other, b"same bytes")
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(first.checksum, second.checksum)
+        storage = video_storage()
+        # hard link: one copy on disk
+        self.assertEqual(os.stat(storage.path(first.file.name)).st_ino, os.stat(storage.path(second.file.name)).st_ino)
+
+    def test_quota_counts_stored_sizes(self):
+        ProductVideo.objects.filter(product=self.product).update(size=20 * 1024 * 1024 - 5)
+        url = reverse("product-detail", args=[self.product.pk])
+        response = self.client.patch(url, {"video_files": [SimpleUploadedFile("a.mp4", b"too much")]}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+
+    def test_presigned_upload_and_attach(self):
+        response = self.client.post(
+            reverse("product-video-upload-url", args=[self.product.pk]), {"filename": "direct.mp4", "size": 5}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        upload, token = response.data["upload"], response.data["token"]
+        self.assertEqual(upload["method"], "PUT")
+
+        anonymous = APIClient()
+        self.assertEqual(anonymous.put(upload["url"], b"123456", content_type="video/mp4").status_code, 413)
+        attach = reverse("product-attach-video", args=[self.product.pk])
+        self.assertEqual(self.client.post(attach, {"token": token}, format="json").status_code, 400)
+        self.assertEqual(anonymous.put(upload["url"], b"12345", content_type="video/mp4").status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(attach, {"token": token}, format="json")
+        self.assertEqual(response.status_code, 201)
+        video = ProductVideo.objects.get(pk=response.data["id"])
+        self.assertEqual(video.size, 5)
+        self.assertEqual(len(video.checksum), 64)  # filled in by process_uploaded_video
+        # neither the token nor the upload URL can be used again
+        self.assertEqual(self.client.post(attach, {"token": token}, format="json").status_code, 400)
+        self.assertEqual(anonymous.put(upload["url"], b"54321", content_type="video/mp4").status_code, 409)
+        self.assertEqual(ProductVideo.objects.filter(file=video.file.name).count(), 1)
+
+        download = video_storage().presigned_download(video.file.name, 60)
+        self.assertEqual(b"".join(anonymous.get(download).streaming_content), b"12345")
+        self.assertEqual(anonymous.get(download.replace("/storage/", "/storage/x")).status_code, 404)
+
+
+class TaskRoutingTests(CatalogTestCase):
+    def test_tasks_have_their_queues(self):
+        from cp360_config.celery import app
+
+        for name, queue in (
+            ("apps.products.tasks.process_uploaded_video", "videos"),
+            ("apps.products.tasks.run_export_job", "exports"),
+            ("apps.products.tasks.purge_deleted_rows", "maintenance"),
+        ):
+            self.assertEqual(app.amqp.router.route({}, name)["queue"].name, queue)
+            self.assertTrue(app.tasks[name].ignore_result)
+
+    @override_settings(VIDEO_SMALL_FILE_BYTES=100)
+    def test_small_videos_go_first(self):
+        from apps.products.tasks import enqueue_video_processing, process_uploaded_video
+
+        small, large = ProductVideo(pk=1, size=100), ProductVideo(pk=2, size=101)
+        with mock.patch.object(process_uploaded_video, "apply_async") as apply_async:
+            enqueue_video_processing(small)
+            enqueue_video_processing(large)
+        priorities = [call.kwargs["priority"] for call in apply_async.call_args_list]
+        self.assertGreater(priorities[0], priorities[1])
+
+
+class ReconcileMediaTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = video_storage()
+        self.orphan = self.storage.save("products/0/videos/failed-upload.mp4", ContentFile(b"x" * 10))
+        long_ago = timezone.now() - timedelta(days=40)
+        videos = list(ProductVideo.objects.order_by("pk").select_related("product"))[:4]
+        for video in videos:
+            # files are not rolled back with the database
+            with open(self.storage.path(video.file.name), "wb") as fh:
+                fh.write(b"0" * 64)
+        self.live = videos[0].file.name
+        videos[1].soft_delete()
+        ProductVideo.objects.filter(pk=videos[1].pk).update(deleted_at=long_ago)
+        self.expired = videos[1].file.name
+        videos[2].soft_delete()
+        self.recently_deleted = videos[2].file.name
+        Product.objects.filter(pk=videos[3].product.pk).update(is_deleted=True, deleted_at=long_ago)
+        self.product_expired = videos[3].file.name
+
+    def reconcile(self, **kwargs):
+        return reconcile_media(retention=timedelta(days=30), batch_size=2, samples=1000, **kwargs)
+
+    def test_dry_run_reports_without_deleting(self):
+        report = self.reconcile(grace=timedelta(0), dry_run=True)
+        self.assertEqual(report["examples"]["orphan"].count(self.orphan), 1)
+        self.assertCountEqual(report["examples"]["expired"], [self.expired, self.product_expired])
+        self.assertEqual(report["files"]["deleted"], 0)
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_deletes_orphans_and_expired_files_only(self):
+        self.assertEqual(self.reconcile(grace=timedelta(hours=1), dry_run=False)["files"]["orphan"], 0)
+        self.assertTrue(self.storage.exists(self.orphan))  # may still be uploading
+
+        self.reconcile(grace=timedelta(0), dry_run=False)
+        for name in (self.orphan, self.expired, self.product_expired):
+            self.assertFalse(self.storage.exists(name))
+        for name in (self.live, self.recently_deleted):
+            self.assertTrue(self.storage.exists(name))
+
+    def test_abandoned_multipart_uploads(self):
+        name, abandoned = self.storage.start_multipart("products/0/videos/big.mp4")
+        self.storage.upload_part(name, abandoned, 1, b"x" * 10)
+        _, active = self.storage.start_multipart("products/0/videos/other.mp4")
+        long_ago = (timezone.now() - timedelta(days=2)).timestamp()
+        parts = self.storage._parts_path(abandoned)
+        for path in (os.path.join(parts, "00001"), parts):
+            os.utime(path, (long_ago, long_ago))
+
+        report = self.reconcile(dry_run=False)
+        self.assertEqual(report["multipart"], {"uploads": 2, "stale": 1, "deleted": 1, "errors": 0, "bytes": 10})
+        self.assertFalse(os.path.exists(parts))
+        self.assertTrue(os.path.exists(self.storage._parts_path(active)))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("reconcile_media", "--dry-run", "--grace-hours", "0", stdout=out)
+        self.assertTrue(json.loads(out.getvalue())["dry_run"])
+        self.assertTrue(self.storage.exists(self.orphan))
+
+
+class PurgeTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = video_storage()
+        for video in ProductVideo.objects.all():
+            # files are not rolled back with the database
+            with open(self.storage.path(video.file.name), "wb") as fh:
+                fh.write(b"0" * 64)
+        self.long_ago = timezone.now() - timedelta(days=100)
+        self.old_category, self.kept_category, self.recent_category = Category.objects.order_by("pk")[:3]
+        for category in (self.old_category, self.kept_category, self.recent_category):
+            category.soft_delete()
+        Category.objects.filter(pk__in=[self.old_category.pk, self.kept_category.pk]).update(deleted_at=self.long_ago)
+        Product.objects.filter(category__in=[self.old_category, self.kept_category]).update(deleted_at=self.long_ago)
+        # restored on its own: keeps its category
+        self.restored = self.kept_category.products.first()
+        self.restored.restore()
+
+    def purge(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return purge_deleted(timedelta(days=90), pause=0, **kwargs)
+
+    def test_purges_old_rows_in_batches_with_files(self):
+        files = list(ProductVideo.objects.filter(product__category=self.old_category).values_list("file", flat=True))
+        report = self.purge(batch_size=1)
+        self.assertEqual(report["rows"], {"products.Category": 1, "products.Product": 3, "products.ProductVideo": 3})
+        self.assertEqual((report["files"], report["batches"], report["complete"]), (3, 4, True))
+
+        self.assertFalse(Category.objects.filter(pk=self.old_category.pk).exists())
+        self.assertTrue(Category.objects.filter(pk=self.kept_category.pk).exists())
+        self.assertTrue(Product.objects.filter(pk=self.restored.pk).exists())
+        self.assertEqual(self.recent_category.products.count(), 2)
+        for name in files:
+            self.assertFalse(self.storage.exists(name))
+        self.assertTrue(self.storage.exists(self.restored.videos.get().file.name))
+
+    def test_keeps_recent_products_and_shared_files(self):
+        product = self.old_category.products.first()
+        Product.objects.filter(pk=product.pk).update(deleted_at=timezone.now())
+        shared = ProductVideo.objects.filter(product__category=self.old_category).exclude(product=product).first()
+        ProductVideo.objects.create(product=self.restored, file=shared.file.name, size=64)
+
+        report = self.purge()
+        self.assertNotIn("products.Category", report["rows"])
+        self.assertTrue(Product.objects.filter(pk=product.pk).exists())
+        self.assertFalse(ProductVideo.objects.filter(pk=shared.pk).exists())
+        self.assertTrue(self.storage.exists(shared.file.name))
+
+    def test_dry_run_and_time_limit(self):
+        report = self.purge(dry_run=True)
+        self.assertEqual(report["rows"]["products.Product"], 3)
+        self.assertEqual(Product.objects.count(), 12)
+
+        report = self.purge(max_seconds=0)
+        self.assertEqual((report["complete"], report["batches"]), (False, 0))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("purge_deleted", "--pause", "0", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["rows"]["products.Category"], 1)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class OutboxTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        MemorySink.events.clear()
+        self.client.force_authenticate(self.staff)
+
+    def post(self, action, product):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse(f"product-{action}", args=[product.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_lifecycle_events_are_relayed_in_order(self):
+        other = Product.objects.exclude(pk=self.product.pk).first()
+        self.post("approve", self.product)
+        self.post("reject", other)
+        self.post("reject", self.product)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("product-detail", args=[self.product.pk]))
+        self.post("restore", self.product)
+
+        events = [(event["type"], event["key"]) for event in MemorySink.events]
+        key = f"product:{self.product.pk}"
+        self.assertEqual(
+            [event for event in events if event[1] == key],
+            [("product.approved", key), ("product.rejected", key), ("product.deleted", key), ("product.restored", key)],
+        )
+        self.assertIn(("product.rejected", f"product:{other.pk}"), events)
+        self.assertFalse(OutboxEvent.objects.filter(sent_at__isnull=True).exists())
+
+    def test_actions_are_audited(self):
+        audit_log.flush()
+        self.post("approve", self.product)
+        audit_log.flush()
+        entry = AuditEntry.objects.latest("id")
+        self.assertEqual((entry.action, entry.object_id, entry.actor_id), ("approve", str(self.product.pk), self.staff.pk))
+
+    def test_event_rolls_back_with_its_change(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.product.set_status(Product.STATUS_SUCCESS, self.staff)
+            raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failed_delivery_is_retried(self):
+        self.product.set_status(Product.STATUS_SUCCESS, self.staff)
+        with mock.patch.object(MemorySink, "send", side_effect=OSError("sink down")):
+            with self.assertRaises(OSError):
+                relay_events()
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.sent_at, event.attempts, event.last_error), (None, 1, "sink down"))
+
+        self.assertEqual(relay_events()["sent"], 1)
+        self.assertEqual(MemorySink.events[0]["data"]["status"], Product.STATUS_SUCCESS)
+
+    def test_claimed_batch_is_not_sent_twice(self):
+        self.product.set_status(Product.STATUS_SUCCESS, self.staff)
+
+        def send(sink, events):
+            # a relay starting meanwhile finds the batch claimed
+            self.assertEqual(relay_events()["sent"], 0)
+
+        with mock.patch.object(MemorySink, "send", send):
+            self.assertEqual(relay_events()["sent"], 1)
+        event = OutboxEvent.objects.get()
+        self.assertIsNotNone(event.sent_at)
+        self.assertIsNone(event.claimed_until)
+
+    def test_sink_options_follow_the_backend(self):
+        for backend, sink in (("apps.products.outbox.FileSink", FileSink), ("apps.products.outbox.WebhookSink", WebhookSink)):
+            with override_settings(OUTBOX_SINK={"BACKEND": backend, "OPTIONS": settings.OUTBOX_SINK_OPTIONS[backend]}):
+                self.assertIsInstance(get_sink(), sink)
+
+    def test_video_upload_event(self):
+        self.client.force_authenticate(self.agent)
+        url = reverse("product-detail", args=[self.product.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {"video_files": [SimpleUploadedFile("new.mp4", b"abc")]}, format="multipart")
+        [event] = [event for event in MemorySink.events if event["type"] == "product.video_added"]
+        self.assertEqual((event["data"]["product"], event["data"]["size"]), (self.product.pk, 3))
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class CatalogStatsTests(CatalogTestCase):
+    def assertMatchesRebuild(self):
+        incremental = stats.summary()
+        stats.rebuild()
+        self.assertEqual(incremental, stats.summary())
+
+    def test_follows_lifecycle_changes(self):
+        other = Product.objects.exclude(category=self.category).first()
+        self.product.set_status(Product.STATUS_SUCCESS, self.staff)
+        other.category, other.price = self.category, "99.00"
+        other.save()
+        self.assertMatchesRebuild()
+
+        row = CategoryStats.objects.get(category=self.category, status=Product.STATUS_UPLOADED)
+        self.assertEqual((row.product_count, row.video_count, row.price_max), (2, 2, 99))
+        other.soft_delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(stats.summary(self.category.pk)["categories"][0]["statuses"]["uploaded"]["price_max"], 10.5)
+
+        other.restore()
+        self.product.videos.first().soft_delete()
+        self.product.videos.first().restore()
+        ProductVideo.objects.filter(product=other).first().delete()
+        self.client.patch(
+            reverse("product-detail", args=[self.product.pk]),
+            {"video_files": [SimpleUploadedFile("new.mp4", b"abc")]},
+            format="multipart",
+        )
+        self.assertMatchesRebuild()
+
+    def test_stale_instances_move_the_stored_row(self):
+        first, second = Product.objects.get(pk=self.product.pk), Product.objects.get(pk=self.product.pk)
+        first.set_status(Product.STATUS_SUCCESS, self.staff)
+        second.set_status(Product.STATUS_REJECTED, self.staff)
+        self.assertMatchesRebuild()
+
+    def test_category_delete_drops_its_rows(self):
+        self.client.delete(reverse("category-detail", args=[self.category.pk]))
+        self.assertFalse(CategoryStats.objects.filter(category=self.category).exists())
+        self.assertMatchesRebuild()
+
+    def test_endpoint(self):
+        with self.assertQueryBudget(1):
+            response = self.client.get(reverse("catalog-stats"))
+        self.assertEqual(len(response.data["categories"]), 6)
+        self.assertEqual(
+            response.data["totals"]["uploaded"],
+            {"products": 12, "price_min": 10.5, "price_max": 10.5, "price_avg": 10.5, "videos": 12, "video_bytes": 0},
+        )
+        response = self.client.get(reverse("catalog-stats"), {"category": self.category.pk})
+        self.assertEqual([entry["category"] for entry in response.data["categories"]], [self.category.pk])
+        self.assertEqual(self.client.get(reverse("catalog-stats"), {"category": "x"}).status_code, 400)
+
+    def test_rebuild_command(self):
+        CategoryStats.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_catalog_stats", stdout=out)
+        self.assertIn("Rebuilt 6 stats rows.", out.getvalue())
+        self.assertEqual(stats.summary()["totals"]["uploaded"]["products"], 12)
+
+
+@unittest.skipUnless(find_spec("numpy"), "numpy is not installed")
+class PriceAnalyticsTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i, product in enumerate(Product.objects.filter(category=self.category).order_by("pk")):
+            product.price = ("9999.00", "12.00")[i]
+            product.save()
+        for i, product in enumerate(Product.objects.exclude(category=self.category).order_by("pk")):
+            product.price = f"{10 + i}.25"
+            product.save()
+
+    def get(self, **params):
+        response = self.client.get(reverse("product-analytics"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_matches_numpy_per_category_and_overall(self):
+        import numpy as np
+
+        data = self.get(bins=5)
+        prices = np.array([float(price) for price in Product.objects.values_list("price", flat=True)])
+        overall = data["overall"]
+        self.assertEqual(data["products"], 12)
+        self.assertEqual(
+            list(overall["percentiles"].values()), np.round(np.percentile(prices, analytics.PERCENTILES), 2).tolist()
+        )
+        self.assertEqual(overall["histogram"]["counts"], np.histogram(prices, 5)[0].tolist())
+        self.assertEqual((overall["min"], overall["max"], overall["mean"]), (10.25, 9999.0, round(prices.mean(), 2)))
+        self.assertEqual(overall["outliers"]["ids"], [Product.objects.get(price="9999.00").pk])
+
+        [first] = [entry for entry in data["categories"] if entry["category"] == self.category.pk]
+        self.assertEqual((first["products"], first["min"], first["max"]), (2, 12.0, 9999.0))
+        self.assertEqual(first["histogram"]["counts"], [1, 0, 0, 0, 1])
+        self.assertEqual(len(data["categories"]), 6)
+
+    def test_filters_apply(self):
+        self.product.set_status(Product.STATUS_SUCCESS, self.staff)
+        data = self.get(status=Product.STATUS_SUCCESS)
+        self.assertEqual(data["products"], 1)
+        self.assertEqual(data["overall"]["histogram"]["counts"][0], 1)
+        self.assertEqual(self.get(status=Product.STATUS_CANCELLED), {"products": 0, "bins": 20, "overall": None, "categories": []})
+
+    def test_cached_until_products_change(self):
+        self.get()
+        # just the catalog version (two index lookups and the stats table)
+        with self.assertQueryBudget(3):
+            self.get()
+        self.product.soft_delete()
+        self.assertEqual(self.get()["products"], 11)
+
+    def test_invalid_bins_and_missing_numpy(self):
+        for bins in ("x", 0, 10_000):
+            self.assertEqual(self.client.get(reverse("product-analytics"), {"bins": bins}).status_code, 400)
+        with mock.patch.object(analytics, "load_numpy", return_value=False):
+            self.assertEqual(self.client.get(reverse("product-analytics")).status_code, 501)
+
+
+class NPlusOneDetectorTests(CatalogTestCase):
+    def test_repeated_queries_name_the_serializer_field(self):
+        categories = list(Category.objects.all())
+        with self.assertRaises(NPlusOneError) as ctx:
+            with detect_nplusone("CategorySerializer", raise_errors=True):
+                CategorySerializer(categories, many=True).data
+        self.assertIn("in get_products_count", str(ctx.exception))
+        self.assertIn("apps/products/serializers.py", str(ctx.exception))
+
+    def test_warns_outside_tests(self):
+        with self.assertLogs("apps.core.nplusone", "WARNING"):
+            with detect_nplusone("loop", raise_errors=False):
+                for category in Category.objects.all():
+                    category.products.count()
+
+
+class FullTextSearchTests(CatalogTestCase):
+    def search(self, name, term, **params):
+        response = self.client.get(reverse(name), {"search": term, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_missing_index_is_looked_up_again(self):
+        search._available.clear()
+        with mock.patch.dict(search.FTS_INDEXES, {Product: ("missing_fts", ("title",))}):
+            self.assertFalse(search.fts_available(Product))
+        self.assertTrue(search.fts_available(Product))
+
+    def test_prefix_search_is_ranked(self):
+        Product.objects.create(category=self.category, title="Walnut desk", description="solid walnut")
+        Product.objects.create(category=self.category, title="Lamp", description="walnut base")
+        results = self.search("product-list", "walnu")
+        self.assertEqual([row["title"] for row in results], ["Walnut desk", "Lamp"])
+        self.assertEqual(self.search("product-list", "walnut desk")[0]["title"], "Walnut desk")
+
+    def test_index_follows_updates_soft_delete_and_restore(self):
+        product = Product.objects.create(category=self.category, title="Oak shelf")
+        self.assertEqual(len(self.search("product-list", "oak")), 1)
+
+        product.title = "Pine shelf"
+        product.save()
+        self.assertEqual(self.search("product-list", "oak"), [])
+        self.assertEqual(len(self.search("product-list", "pine")), 1)
+
+        product.soft_delete()
+        self.assertEqual(self.search("product-list", "pine"), [])
+        product.restore()
+        self.assertEqual(len(self.search("product-list", "pine")), 1)
+
+        Product.objects.filter(pk=product.pk).delete()
+        self.assertEqual(self.search("product-list", "pine"), [])
+
+    def test_categories_and_explicit_ordering(self):
+        results = self.search("category-list", "categ", ordering="name")
+        self.assertEqual([row["name"] for row in results], [f"Category {i}" for i in range(6)])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search("product-list", 'Product" OR title:*'), self.search("product-list", "product title"))
+        self.assertEqual(self.search("product-list", "***"), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM products_product_fts")
+        self.assertEqual(self.search("product-list", "product"), [])
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(len(self.search("product-list", "product")), 12)
+
+
+class AutocompleteTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        for index in autocomplete.INDEXES.values():
+            index.reset()
+        self.url = reverse("autocomplete")
+
+    def suggest(self, prefix, **params):
+        response = self.client.get(self.url, {"q": prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefix_lookup(self):
+        data = self.suggest("product 1-")
+        self.assertEqual([row["title"] for row in data["products"]], ["Product 1-0", "Product 1-1"])
+        self.assertEqual(data["categories"], [])
+        self.assertEqual(len(self.suggest("CATEG", type="categories", limit=3)["categories"]), 3)
+
+    def test_signals_apply_committed_writes(self):
+        self.suggest("x")  # build
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(category=self.category, title="Crème brûlée torch")
+        self.assertEqual(self.suggest("creme")["products"], [{"id": product.pk, "title": product.title}])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.soft_delete()
+        self.assertEqual(self.suggest("creme")["products"], [])
+
+    def test_rebuild_runs_outside_the_search_lock(self):
+        self.suggest("x")  # build
+        load, seen = autocomplete.PrefixIndex.load, []
+
+        def slow_load(index, rows):
+            load(index, rows)
+            # meanwhile searches get the current index and writes still apply
+            seen.append([row["title"] for row in autocomplete.products.search("product 1-")])
+            with self.captureOnCommitCallbacks(execute=True):
+                Product.objects.create(category=self.category, title="Zebra lamp")
+
+        with override_settings(AUTOCOMPLETE_REBUILD_SECONDS=0):
+            with mock.patch.object(autocomplete.PrefixIndex, "load", slow_load):
+                self.suggest("x", type="products")
+        self.assertEqual(seen, [["Product 1-0", "Product 1-1"]])
+        self.assertEqual([row["title"] for row in self.suggest("zebra")["products"]], ["Zebra lamp"])
+
+    @override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0)
+    def test_refresh_picks_up_writes_without_signals(self):
+        self.suggest("x")
+        Product.objects.filter(title="Product 0-0").update(title="Zebra lamp", updated_at=timezone.now())
+        Product.objects.filter(title="Product 0-1").soft_delete()
+        self.assertEqual([row["title"] for row in self.suggest("zebra")["products"]], ["Zebra lamp"])
+        self.assertEqual(self.suggest("product 0-")["products"], [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"q": "a", "type": "users"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"q": "a", "limit": "ten"}).status_code, 400)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class ChangesTests(CatalogTestCase):
+    def sync(self, name, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_initial_sync_pages_through_everything(self):
+        seen, cursor = [], None
+        while True:
+            data = self.sync("product-changes", cursor, limit=5)
+            seen += [row["id"] for row in data["results"]]
+            cursor = data["cursor"]
+            if not data["has_more"]:
+                break
+        self.assertEqual(sorted(seen), sorted(Product.objects.values_list("id", flat=True)))
+        self.assertEqual(self.sync("product-changes", cursor)["results"], [])
+
+    def test_updates_tombstones_and_restores(self):
+        cursor = self.sync("category-changes")["cursor"]
+        category = Category.objects.last()
+        category.name = "Renamed"
+        category.save()
+        self.category.soft_delete()
+
+        data = self.sync("category-changes", cursor)
+        self.assertEqual([row["name"] for row in data["results"]], ["Renamed"])
+        self.assertEqual([row["category_id"] for row in data["deleted"]], [self.category.category_id])
+
+        self.category.restore()
+        data = self.sync("category-changes", data["cursor"])
+        self.assertEqual([row["category_id"] for row in data["results"]], [str(self.category.category_id)])
+        self.assertEqual(data["deleted"], [])
+
+    @override_settings(SYNC_SETTLE_SECONDS=3600)
+    def test_recent_changes_are_held_back(self):
+        self.assertEqual(self.sync("product-changes")["results"], [])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse("product-changes"), {"cursor": "nope"}).status_code, 404)
+
+    @override_settings(PURGE_RETENTION_DAYS=90)
+    def test_cursor_older_than_retention_is_gone(self):
+        cursor = encode_cursor([(timezone.now() - timedelta(days=91)).isoformat(), 0])
+        self.assertEqual(self.client.get(reverse("product-changes"), {"cursor": cursor}).status_code, 410)
+
+
+# Celery reads CELERY_* from Django settings on access, so this runs tasks inline
+@override_settings(EXPORT_CHUNK_SIZE=5, CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class ExportJobTests(CatalogTestCase):
+    def start(self, name, **params):
+        url = reverse(name)
+        if params:
+            url = f"{url}?{urlencode(params, doseq=True)}"
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertIn(response.status_code, {200, 202})
+        return response.data
+
+    def download(self, job_id):
+        response = self.client.get(reverse("export-job-download", args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_job_matches_synchronous_export(self):
+        for name, params in (
+            ("product", {"status": Product.STATUS_UPLOADED}),
+            ("category", {"include_products": "true", "product_ids": [self.product.pk]}),
+        ):
+            job = self.start(f"{name}-export-jobs", **params)
+            data = self.client.get(reverse("export-job-detail", args=[job["id"]])).data
+            self.assertEqual((data["status"], data["progress"]), (ExportJob.STATUS_SUCCESS, 100))
+            expected = self.client.get(reverse(f"{name}-export"), params).content
+            self.assertEqual(self.download(job["id"]), expected)
+
+    def test_identical_request_reuses_artifact_until_data_changes(self):
+        first = self.start("product-export-jobs")
+        second = self.start("product-export-jobs")
+        self.assertEqual(second["id"], first["id"])
+        self.assertNotEqual(self.start("product-export-jobs", status="success")["id"], first["id"])
+
+        self.product.title = "Changed"
+        self.product.save()
+        third = self.start("product-export-jobs")
+        self.assertNotEqual(third["id"], first["id"])
+        self.assertIn(b"Changed", self.download(third["id"]))
+
+    def test_owner_email_change_invalidates_category_export(self):
+        first = self.start("category-export-jobs")
+        owner = self.category.user
+        owner.email = "renamed@example.com"
+        owner.save()
+        second = self.start("category-export-jobs")
+        self.assertNotEqual(second["id"], first["id"])
+        self.assertIn(b"renamed@example.com", self.download(second["id"]))
+
+    def test_stalled_job_is_failed_not_reused(self):
+        first = self.start("product-export-jobs")
+        ExportJob.objects.filter(pk=first["id"]).update(
+            status=ExportJob.STATUS_RUNNING, progressed_at=timezone.now() - timedelta(hours=1)
+        )
+        second = self.start("product-export-jobs")
+        self.assertNotEqual(second["id"], first["id"])
+        self.assertEqual(ExportJob.objects.get(pk=first["id"]).status, ExportJob.STATUS_FAILED)
+
+    def test_failed_job_leaves_no_partial_file(self):
+        def broken(columns, batches):
+            yield b"id\n"
+            raise RuntimeError("disk full")
+
+        csv_format = exports.EXPORT_FORMATS["csv"]._replace(encode=broken)
+        with mock.patch.dict(exports.EXPORT_FORMATS, {"csv": csv_format}):
+            job = self.start("product-export-jobs")
+        self.assertEqual(ExportJob.objects.get(pk=job["id"]).status, ExportJob.STATUS_FAILED)
+        self.assertFalse(os.path.exists(os.path.join(settings.MEDIA_ROOT, "exports", f"{job['id']}.csv.part")))
+
+    def test_job_in_other_format(self):
+        job = self.start("product-export-jobs", format="csv.gz")
+        self.assertEqual(job["format"], "csv.gz")
+        self.assertEqual(gzip.decompress(self.download(job["id"])), self.client.get(reverse("product-export")).content)
+
+    def test_download_before_completion(self):
+        job = ExportJob.objects.create(kind=ExportJob.KIND_PRODUCTS, fingerprint="x", data_version="y")
+        response = self.client.get(reverse("export-job-download", args=[job.pk]))
+        self.assertEqual(response.status_code, 409)
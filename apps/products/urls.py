@@ -1,10 +1,24 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from apps.products.views import CategoryViewSet, ProductViewSet
+from apps.products.views import (
+    AutocompleteView,
+    CatalogStatsView,
+    CategoryViewSet,
+    ExportJobViewSet,
+    ProductVideoFileView,
+    ProductViewSet,
+    StorageBlobView,
+)
 
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet, basename="category")
 router.register(r"products", ProductViewSet, basename="product")
+router.register(r"export-jobs", ExportJobViewSet, basename="export-job")
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
+    path("stats/", CatalogStatsView.as_view(), name="catalog-stats"),
+    path("videos/<int:pk>/file/", ProductVideoFileView.as_view(), name="product-video-file"),
+    path("storage/<str:token>/", StorageBlobView.as_view(), name="storage-blob"),
+] + router.urls
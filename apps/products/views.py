@@ -1,42 +1,89 @@
-import csv
 import io
-import logging
+import mimetypes
+import os
+from collections import defaultdict
 
-from django.http import HttpResponse
-from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from apps.core.audit import AuditMixin
+from apps.core.media import serve_media
+from apps.core.negotiation import FirstRendererNegotiation
+from apps.core.parsers import FastJSONParser
 from apps.core.permission import IsAdmin, IsAgent, IsStaff
+from apps.core.representation import SparseFieldsMixin, ValuesListMixin, compile_representation
+from apps.core.sync import ChangesMixin
+from apps.core.throttling import ConcurrencyLimitMixin
 from apps.user.constants import UserRoles
+from apps.user.serializers import UserSummarySerializer
 
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from . import analytics, autocomplete, stats
+from .exports import EXPORT_FORMATS, ExportMixin, export_fingerprint, export_params
+from .models import Category, ExportJob, OutboxEvent, Product, ProductVideo
+from .search import FullTextSearchFilter
+from .serializers import (
+    MAX_VIDEO_MB,
+    CategorySerializer,
+    CategorySummarySerializer,
+    ExportJobSerializer,
+    ProductSerializer,
+    ProductVideoSerializer,
+    check_video_quota,
+)
+from .storage import sign_blob, unsign_blob, video_storage
 
-logger = logging.getLogger(__name__)
 
-
-def log_action(fn):
-    def wrapper(self, request, *args, **kwargs):
-        user = request.user
-        logger.info(
-            "products.action",
-            extra={
-                "user": getattr(user, "email", None),
-                "action": fn.__name__,
-                "view": self.__class__.__name__,
-            },
-        )
-        return fn(self, request, *args, **kwargs)
-
-    return wrapper
-
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.filter(is_deleted=False).select_related("user")
+class CategoryViewSet(
+    ConcurrencyLimitMixin, AuditMixin, SparseFieldsMixin, ValuesListMixin, ChangesMixin, ExportMixin, viewsets.ModelViewSet
+):
+    queryset = Category.objects.select_related("user", "created_by", "updated_by")
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
+    search_fields = ["name"]
+    tombstone_field = "category_id"
+    export_kind = ExportJob.KIND_CATEGORIES
+    field_lookups = {
+        "created_by": "created_by__email",
+        "updated_by": "updated_by__email",
+        "products_count": "active_products_count",
+    }
+    expandable_fields = {"user": UserSummarySerializer}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action not in {"restore", "changes"}:
+            qs = qs.filter(is_deleted=False)
+        if self.wants_field("products_count"):
+            # correlated count rather than JOIN + GROUP BY: only evaluated for
+            # the rows returned, and keeps the query ungrouped for the FTS rank
+            qs = qs.annotate(
+                active_products_count=Coalesce(
+                    Subquery(
+                        Product.objects.filter(category=OuterRef("pk"), is_deleted=False)
+                        .order_by()
+                        .values("category")
+                        .annotate(count=Count("id"))
+                        .values("count"),
+                        output_field=IntegerField(),
+                    ),
+                    Value(0),
+                )
+            )
+        return qs
 
     def get_permissions(self):
         if self.action in {"create", "update", "partial_update", "destroy", "restore"}:
@@ -55,7 +102,6 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(updated_by=self.request.user)
 
-    @log_action
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         instance.soft_delete()
@@ -67,44 +113,74 @@ class CategoryViewSet(viewsets.ModelViewSet):
         instance.restore()
         return Response(self.get_serializer(instance).data)
 
-    @action(detail=False, methods=["get"], url_path="export")
-    def export(self, request):
-        include_products = request.query_params.get("include_products", "false").lower() in {"true", "1", "yes"}
-        product_ids = request.query_params.getlist("product_ids")
-
-        qs = self.filter_queryset(self.get_queryset())
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
-        header = ["category_id", "name", "user_email", "created_at", "updated_at"]
-        if include_products:
-            header += ["product_id", "product_title", "product_price", "product_status"]
-        writer.writerow(header)
-
-        for cat in qs:
-            if include_products:
-                products = cat.products.filter(is_deleted=False)
-                if product_ids:
-                    products = products.filter(id__in=product_ids)
-                if products.exists():
-                    for p in products:
-                        writer.writerow([str(cat.category_id), cat.name, cat.user.email, cat.created_at, cat.updated_at, p.id, p.title, str(p.price), p.status])
-                else:
-                    writer.writerow([str(cat.category_id), cat.name, cat.user.email, cat.created_at, cat.updated_at, "", "", "", ""])
-            else:
-                writer.writerow([str(cat.category_id), cat.name, cat.user.email, cat.created_at, cat.updated_at])
-
-        resp = HttpResponse(buffer.getvalue(), content_type="text/csv")
-        resp["Content-Disposition"] = f"attachment; filename=categories_{timezone.now().date()}.csv"
-        return resp
-
-
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.filter(is_deleted=False).select_related("category")
+    def get_export(self, queryset, params):
+        include_products = params.get("include_products", "false").lower() in {"true", "1", "yes"}
+        columns = [
+            ("category_id", "uuid"), ("name", "str"), ("user_email", "str"),
+            ("created_at", "datetime"), ("updated_at", "datetime"),
+        ]
+        fields = ["category_id", "name", "user__email", "created_at", "updated_at"]
+        if not include_products:
+            return columns, queryset.values_list(*fields), lambda chunk: chunk
+
+        products = Product.objects.filter(is_deleted=False)
+        product_ids = params.getlist("product_ids")
+        if product_ids:
+            products = products.filter(id__in=product_ids)
+        no_products = [None] * 4
+
+        def expand(chunk):
+            # one product query per chunk of categories
+            by_category = defaultdict(list)
+            for category_pk, *product in products.filter(category__in=[row[0] for row in chunk]).values_list(
+                "category_id", "id", "title", "price", "status"
+            ):
+                by_category[category_pk].append(product)
+            rows = []
+            for category_pk, *category in chunk:
+                rows += [category + product for product in by_category[category_pk]] or [category + no_products]
+            return rows
+
+        columns += [("product_id", "int"), ("product_title", "str"), ("product_price", "decimal"), ("product_status", "str")]
+        return columns, queryset.values_list("pk", *fields), expand
+
+
+class ProductViewSet(
+    ConcurrencyLimitMixin, AuditMixin, SparseFieldsMixin, ValuesListMixin, ChangesMixin, ExportMixin, viewsets.ModelViewSet
+):
+    queryset = Product.objects.select_related("category", "created_by", "updated_by").prefetch_related("videos")
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    parser_classes = [FastJSONParser, MultiPartParser, FormParser]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
+    filterset_fields = ["status", "category"]
+    search_fields = ["title", "description"]
+    export_kind = ExportJob.KIND_PRODUCTS
+    field_lookups = {"created_by": "created_by__email", "updated_by": "updated_by__email", "videos": None}
+    expandable_fields = {"category": CategorySummarySerializer}
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action not in {"restore", "changes"}:
+            qs = qs.filter(is_deleted=False)
+        return qs
+
+    def add_list_related(self, data, pks):
+        if not self.wants_field("videos"):
+            return
+        # same single query the "videos" prefetch runs
+        to_dict, fields = compile_representation(ProductVideoSerializer(context=self.get_serializer_context()))
+        videos = defaultdict(list)
+        for row in ProductVideo.objects.filter(product__in=pks).values("product", *fields):
+            videos[row["product"]].append(to_dict(row))
+        for item, pk in zip(data, pks):
+            item["videos"] = videos[pk]
 
     def get_permissions(self):
-        if self.action in {"create", "update", "partial_update", "destroy", "restore", "approve", "reject"}:
+        if self.action in {
+            "create", "update", "partial_update", "destroy", "restore", "approve", "reject",
+            "video_upload_url", "attach_video",
+        }:
             class IsAgentOrStaffOrAdmin(permissions.BasePermission):
                 def has_permission(self, request, view):
                     return IsAgent().has_permission(request, view) or \
@@ -113,6 +189,12 @@ class ProductViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsAgentOrStaffOrAdmin()]
         return [IsAuthenticated()]
 
+    def get_throttle_scope(self, request):
+        # video files come in multipart bodies
+        if self.action in {"create", "update", "partial_update"} and request.content_type.startswith("multipart/"):
+            return "upload"
+        return super().get_throttle_scope(request)
+
     def perform_create(self, serializer):
         user = self.request.user
         serializer.save(created_by=user, updated_by=user)
@@ -136,9 +218,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         if request.user.role not in [UserRoles.STAFF, UserRoles.ADMIN]:
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
-        instance.status = Product.STATUS_SUCCESS
-        instance.updated_by = request.user
-        instance.save()
+        instance.set_status(Product.STATUS_SUCCESS, request.user)
         return Response(self.get_serializer(instance).data)
 
     @action(detail=True, methods=["post"], url_path="reject")
@@ -146,26 +226,248 @@ class ProductViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         if request.user.role not in [UserRoles.STAFF, UserRoles.ADMIN]:
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
-        instance.status = Product.STATUS_REJECTED
-        instance.updated_by = request.user
-        instance.save()
+        instance.set_status(Product.STATUS_REJECTED, request.user)
         return Response(self.get_serializer(instance).data)
 
-    @action(detail=False, methods=["get"], url_path="export")
-    def export(self, request):
-        product_ids = request.query_params.getlist("product_ids")
-        qs = self.filter_queryset(self.get_queryset())
+    @action(detail=True, methods=["post"], url_path="videos/upload-url")
+    def video_upload_url(self, request, pk=None):
+        """Presigned upload straight to the video store, plus the token to attach it with."""
+        product = self.get_object()
+        filename = request.data.get("filename")
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            raise ValidationError({"size": ["A size in bytes is required."]})
+        if not filename:
+            raise ValidationError({"filename": ["This field is required."]})
+        if not 0 < size <= MAX_VIDEO_MB * 1024 * 1024:
+            raise ValidationError({"size": [f"Single video must be <= {MAX_VIDEO_MB} MB"]})
+        check_video_quota(product, [size])
+
+        storage = video_storage()
+        name = storage.get_available_name(
+            ProductVideo._meta.get_field("file").generate_filename(ProductVideo(product=product), filename)
+        )
+        expires = settings.VIDEO_PRESIGN_SECONDS
+        return Response(
+            {
+                "upload": storage.presigned_upload(name, size, expires),
+                "token": sign_blob(name, "ATTACH", expires, product=product.pk, max_size=size),
+                "expires_in": expires,
+            }
+        )
+
+    @action(detail=True, methods=["post"], url_path="videos")
+    def attach_video(self, request, pk=None):
+        """Create the video for a file uploaded with ``videos/upload-url``."""
+        product = self.get_object()
+        payload = unsign_blob(request.data.get("token", ""), "ATTACH")
+        if payload is None or payload["product"] != product.pk:
+            raise ValidationError({"token": ["Invalid or expired upload token."]})
+        storage, name = video_storage(), payload["name"]
+        if ProductVideo.objects.filter(file=name).exists():
+            raise ValidationError({"token": ["This upload is already attached."]})
+        if not storage.exists(name):
+            raise ValidationError({"token": ["Nothing has been uploaded with this token yet."]})
+        size = storage.size(name)
+        if size > payload["max_size"]:
+            storage.delete(name)
+            raise ValidationError({"token": ["The uploaded file is larger than announced."]})
+        check_video_quota(product, [size])
+
+        with transaction.atomic(savepoint=False):
+            # concurrent attaches of one token queue on the product row; the
+            # first creates the video, the others see it
+            Product.objects.select_for_update().values_list("pk").get(pk=product.pk)
+            if ProductVideo.objects.filter(file=name).exists():
+                raise ValidationError({"token": ["This upload is already attached."]})
+            video = ProductVideo.objects.create(product=product, file=name, size=size)
+            OutboxEvent.record(video, OutboxEvent.VIDEO_ADDED)
+        from .tasks import enqueue_video_processing
+
+        transaction.on_commit(lambda: enqueue_video_processing(video))
+        return Response(
+            ProductVideoSerializer(video, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=["get"], url_path="analytics", url_name="analytics")
+    def price_analytics(self, request):
+        """Price distributions per category, for the products the list would return; cached until they change."""
+        if not analytics.load_numpy():
+            return Response(
+                {"detail": "Price analytics needs numpy, which is not installed."}, status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        try:
+            bins = int(request.query_params.get("bins", settings.PRICE_ANALYTICS_BINS))
+        except ValueError:
+            raise ValidationError({"bins": ["Must be an integer."]})
+        if not 1 <= bins <= settings.PRICE_ANALYTICS_MAX_BINS:
+            raise ValidationError({"bins": [f"Must be between 1 and {settings.PRICE_ANALYTICS_MAX_BINS}."]})
+
+        version = analytics.catalog_version()
+        key = "products:analytics:" + export_fingerprint("analytics", [export_params(request.query_params), version])
+        result = cache.get(key)
+        if result is None:
+            queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+            result = analytics.price_analytics(queryset, bins)
+            cache.set(key, result, settings.PRICE_ANALYTICS_CACHE_SECONDS)
+        return Response(result)
+
+    def get_export(self, queryset, params):
+        product_ids = params.getlist("product_ids")
         if product_ids:
-            qs = qs.filter(id__in=product_ids)
+            queryset = queryset.filter(id__in=product_ids)
+        columns = [
+            ("id", "int"), ("category_id", "uuid"), ("title", "str"), ("description", "str"),
+            ("price", "decimal"), ("status", "str"), ("created_at", "datetime"), ("updated_at", "datetime"),
+        ]
+        rows = queryset.prefetch_related(None).values_list(
+            "id", "category__category_id", "title", "description", "price", "status", "created_at", "updated_at"
+        )
+        return columns, rows, lambda chunk: chunk
 
-        buffer = io.StringIO()
-        writer = csv.writer(buffer)
-        header = ["id", "category_id", "title", "description", "price", "status", "created_at", "updated_at"]
-        writer.writerow(header)
 
-        for p in qs:
-            writer.writerow([p.id, str(p.category.category_id), p.title, p.description, str(p.price), p.status, p.created_at, p.updated_at])
+class ExportJobViewSet(viewsets.GenericViewSet):
+    """
+    Poll and download background exports (``<list>/export/jobs/``).
+
+    Jobs are addressed by UUID and shared between users asking for the same
+    export, so any authenticated user holding the id may read one; the data
+    is what ``export`` already serves them.
+    """
+
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=True, methods=["get"], url_path="download")
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_SUCCESS:
+            return Response(
+                {"detail": f"Export is {job.status}.", "progress": job.progress}, status=status.HTTP_409_CONFLICT
+            )
+        if not os.path.exists(job.file.path):
+            raise Http404("Export file no longer exists.")
+        fmt = EXPORT_FORMATS[job.format]
+        return FileResponse(
+            open(job.file.path, "rb"),
+            as_attachment=True,
+            filename=f"{job.kind}_{job.created_at.date()}.{fmt.extension}",
+            content_type=fmt.content_type,
+        )
+
+
+class ProductVideoFileView(APIView):
+    """
+    ``GET /api/videos/<id>/file/``: a product video, with byte ranges for seeking.
+
+    Any authenticated user may fetch videos of live products (as with the
+    product endpoints); videos of soft-deleted products or soft-deleted
+    videos are 404.
+    """
+
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get(self, request, pk):
+        video = (
+            ProductVideo.objects.filter(pk=pk, is_deleted=False, product__is_deleted=False).only("file").first()
+        )
+        if video is None or not video.file:
+            raise Http404("Video not found.")
+        storage = video.file.storage
+        try:
+            root = storage.path("")
+        except NotImplementedError:
+            # remote store: the client downloads from it directly
+            return HttpResponseRedirect(storage.presigned_download(video.file.name, settings.VIDEO_PRESIGN_SECONDS))
+        content_type, _ = mimetypes.guess_type(video.file.name)
+        return serve_media(request, video.file.name, content_type, root=root)
+
+
+class StorageBlobView(ConcurrencyLimitMixin, APIView):
+    """
+    Presigned URLs of ``LocalObjectStorage``: ``GET`` downloads, ``PUT`` uploads.
+
+    The signed token in the URL is the authorization (as with an object
+    store), so clients need no API credentials for the transfer itself.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    content_negotiation_class = FirstRendererNegotiation
+
+    def get_throttle_scope(self, request):
+        return "upload" if request.method == "PUT" else "default"
+
+    def get(self, request, token):
+        payload = unsign_blob(token, "GET")
+        if payload is None:
+            raise Http404("Invalid or expired link.")
+        content_type, _ = mimetypes.guess_type(payload["name"])
+        return serve_media(request, payload["name"], content_type, root=video_storage().path(""))
+
+    def put(self, request, token):
+        payload = unsign_blob(token, "PUT")
+        if payload is None:
+            raise Http404("Invalid or expired link.")
+        if ProductVideo.objects.filter(file=payload["name"]).exists():
+            # attached: its size and checksum are recorded, the bytes must not change
+            return HttpResponse(status=status.HTTP_409_CONFLICT)
+        path = video_storage().path(payload["name"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stream, written = request.stream or io.BytesIO(), 0
+        with open(f"{path}.part", "wb") as fh:
+            while chunk := stream.read(64 * 1024):
+                written += len(chunk)
+                if written > payload["max_size"]:
+                    break
+                fh.write(chunk)
+        if written > payload["max_size"]:
+            os.remove(f"{path}.part")
+            return HttpResponse(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        os.replace(f"{path}.part", path)
+        return HttpResponse(status=status.HTTP_201_CREATED)
+
+
+class AutocompleteView(APIView):
+    """Prefix suggestions for the search box, served from in-memory indexes."""
+
+    permission_classes = [IsAuthenticated]
+    max_limit = 50
+
+    def get(self, request, *args, **kwargs):
+        prefix = request.query_params.get("q", "")
+        kind = request.query_params.get("type", "all")
+        if kind not in {"all", "products", "categories"}:
+            return Response({"detail": "type must be all, products or categories."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), self.max_limit))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {}
+        if kind in {"all", "products"}:
+            data["products"] = autocomplete.products.search(prefix, limit)
+        if kind in {"all", "categories"}:
+            data["categories"] = autocomplete.categories.search(prefix, limit)
+        return Response(data)
+
+
+class CatalogStatsView(APIView):
+    """Product counts, prices and video totals per category and status, from the summary table."""
+
+    permission_classes = [IsAuthenticated]
 
-        resp = HttpResponse(buffer.getvalue(), content_type="text/csv")
-        resp["Content-Disposition"] = f"attachment; filename=products_{timezone.now().date()}.csv"
-        return resp
+    def get(self, request, *args, **kwargs):
+        category = request.query_params.get("category")
+        if category is not None:
+            try:
+                category = int(category)
+            except ValueError:
+                return Response({"detail": "category must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats.summary(category))
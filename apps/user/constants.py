@@ -8,3 +8,5 @@ class UserRoles:
         (STAFF, "Staff"),
         (END_USER, "End User"),
     ]
+
+    VALUES = frozenset(choice[0] for choice in CHOICES)
@@ -1,7 +1,7 @@
 # Libraries
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db.models.functions import Lower
 from apps.user.user_manager import UserManager
 from apps.user.constants import UserRoles
 
@@ -37,6 +37,14 @@ class User(AbstractUser):
         db_table = "users"
         verbose_name = "User"
         verbose_name_plural = "Users"
+        indexes = [
+            # keyset pagination of the admin user list
+            models.Index(fields=["created_at", "id"], name="users_created_id_idx"),
+            models.Index(fields=["role", "created_at"], name="users_role_created_idx"),
+            # case-insensitive prefix search on email/username
+            models.Index(Lower("email"), name="users_email_lower_idx"),
+            models.Index(Lower("username"), name="users_username_lower_idx"),
+        ]
 
     def __str__(self):
         return self.email
@@ -46,6 +54,9 @@ class User(AbstractUser):
         return f"{self.first_name} {self.last_name}".strip()
 
     def tokens(self):
+        # not at module level: every process loads this model, few issue tokens
+        from rest_framework_simplejwt.tokens import RefreshToken
+
         refresh = RefreshToken.for_user(self)
         return {
             "refresh": str(refresh),
@@ -3,6 +3,7 @@ from django.contrib import auth
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed, ValidationError
 
+from apps.core.serializers import TimedSerializerMixin
 from apps.user.constants import UserRoles
 from apps.user.models import User
 from apps.user.validation import (
@@ -14,9 +15,10 @@ from apps.user.validation import (
     validate_unique_field,
     validate_username_format,
 )
+from apps.user.verification import read_token
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -35,6 +37,15 @@ class UserDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "role", "is_active", "is_verified", "created_at", "updated_at"]
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """A related user, for ``?expand=``."""
+
+    class Meta:
+        model = User
+        fields = ["id", "email", "username"]
+        read_only_fields = fields
+
+
 class RegisterUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, style={"input_type": "password"})
 
@@ -160,6 +171,17 @@ class AdminUserUpdateSerializer(serializers.ModelSerializer):
 class EmailVerificationSerializers(serializers.Serializer):
     token = serializers.CharField(max_length=555)
 
+    def validate(self, attrs):
+        user = read_token(attrs["token"])
+        if user is None:
+            raise ValidationError({"token": "Invalid or expired verification link."})
+        attrs["user"] = user
+        return attrs
+
+
+class ResendVerificationSerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=254)
+
 
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField(max_length=100)
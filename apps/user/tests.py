@@ -1,3 +1,249 @@
-from django.test import TestCase
+import re
+from datetime import timedelta
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.core.models import QueuedEmail
+from apps.core.testing import QueryBudgetMixin
+from apps.user.constants import UserRoles
+from apps.user.models import User
+from apps.user.validation import validate_user_records
+from apps.user.verification import make_token
+
+
+def make_user(index, **extra):
+    return User.objects.create_user(
+        email=f"user{index}@example.com",
+        username=f"user{index}",
+        phone=f"55500{index:04d}",
+        password="secret123",
+        **extra,
+    )
+
+
+class AdminUserListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", phone="99990000", password="secret123"
+        )
+        User.objects.filter(pk=cls.admin.pk).update(role=UserRoles.ADMIN)
+        cls.users = [make_user(i) for i in range(5)]
+        make_user(10, role=UserRoles.STAFF, is_verified=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse("admin-user-list")
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_keyset_pages_cover_all_users_once(self):
+        seen = []
+        url = f"{self.url}?page_size=3"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list("id", flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_counts_by_role_follow_filters(self):
+        response = self.client.get(self.url, {"is_verified": "false"})
+        self.assertEqual(
+            response.data["counts"],
+            {UserRoles.ADMIN: 1, UserRoles.STAFF: 0, UserRoles.END_USER: 5, "total": 6},
+        )
+
+    def test_filters_and_prefix_search(self):
+        response = self.client.get(self.url, {"role": UserRoles.STAFF})
+        self.assertEqual([row["username"] for row in response.data["results"]], ["user10"])
+
+        response = self.client.get(self.url, {"search": "USER1"})
+        self.assertEqual({row["username"] for row in response.data["results"]}, {"user1", "user10"})
+
+        response = self.client.get(self.url, {"search": "admin@"})
+        self.assertEqual([row["email"] for row in response.data["results"]], ["admin@example.com"])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"role": "owner"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"created_after": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"cursor": "not-a-cursor"}).status_code, 404)
+
+
+class ValidateUserRecordsTests(TestCase):
+    def test_formats_and_uniqueness_in_one_pass(self):
+        make_user(1)
+        records = [
+            {"email": "USER1@example.com", "username": "fresh", "phone": "12345678"},
+            {"email": "new@example.com", "username": "_bad", "phone": "5550001"},
+            {"email": "other@example.com", "username": "Fresh", "phone": "12345678"},
+            {"email": "ok@example.com", "username": "ok", "role": "end_user"},
+        ]
+        with self.assertNumQueries(3):
+            cleaned, errors = validate_user_records(records)
+
+        self.assertEqual(len(cleaned), 4)
+        self.assertEqual(errors[0], {"email": ["Email already exists."]})
+        self.assertEqual(set(errors[1]), {"username", "phone"})
+        self.assertEqual(
+            errors[2],
+            {"username": ["Username is duplicated in this batch."], "phone": ["Phone is duplicated in this batch."]},
+        )
+        self.assertNotIn(3, errors)
+
+    def test_values_that_are_not_text(self):
+        records = [{"email": 5, "username": None, "phone": 12345678, "role": ["admin"]}, "not a record"]
+        cleaned, errors = validate_user_records(records, check_unique=False)
+        self.assertEqual(
+            errors[0],
+            {"email": ["Invalid email format."], "username": ["Not a valid string."], "role": ["Not a valid string."]},
+        )
+        self.assertEqual(cleaned[0]["phone"], "12345678")
+        self.assertEqual(list(errors[1]), ["non_field_errors"])
+
+
+@override_settings(NPLUSONE_ENABLED=True, NPLUSONE_RAISE=True, AUDIT_BACKGROUND_FLUSH=False)
+class UserQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com", username="admin", phone="99990000", password="secret123"
+        )
+        User.objects.filter(pk=cls.admin.pk).update(role=UserRoles.ADMIN)
+        cls.users = [make_user(i, is_verified=True) for i in range(6)]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register(self):
+        payload = {"email": "new@example.com", "username": "newbie", "phone": "12345678", "password": "secret123"}
+        # plus the queued verification email
+        with self.assertQueryBudget(8):
+            response = self.client.post(reverse("user-register"), payload, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        payload = {"email": "user0@example.com", "password": "secret123"}
+        with self.assertQueryBudget(2):
+            response = self.client.post(reverse("user-login"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile(self):
+        self.client.force_authenticate(self.users[0])
+        with self.assertQueryBudget(0):
+            self.assertEqual(self.client.get(reverse("user-profile")).status_code, 200)
+        with self.assertQueryBudget(3):
+            response = self.client.patch(reverse("user-profile"), {"username": "renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_password_change(self):
+        self.client.force_authenticate(self.users[0])
+        payload = {"old_password": "secret123", "new_password": "secret456"}
+        # the update and the queued notification
+        with self.assertQueryBudget(2):
+            response = self.client.post(reverse("user-password-change"), payload, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertQueryBudget(2):
+            response = self.client.get(reverse("admin-user-list"))
+        self.assertEqual(len(response.data["results"]), 7)
+
+    def test_admin_detail(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("admin-user-detail", args=[self.users[1].pk])
+        with self.assertQueryBudget(1):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertQueryBudget(4):
+            response = self.client.patch(url, {"first_name": "Jane"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_status(self):
+        self.client.force_authenticate(self.admin)
+        url = reverse("admin-user-status", args=[self.users[1].pk])
+        with self.assertQueryBudget(3):
+            response = self.client.patch(url, {"is_active": False}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_performance_metrics(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertQueryBudget(0):
+            self.assertEqual(self.client.get(reverse("performance-metrics")).status_code, 200)
+
+
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_TASK_EAGER_PROPAGATES=True,
+    EMAIL_VERIFICATION_URL="https://app.example.com/verify?token={token}",
+)
+class EmailVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def register(self):
+        payload = {"email": "new@example.com", "username": "newbie", "phone": "12345678", "password": "secret123"}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(reverse("user-register"), payload, format="json").status_code, 201)
+        return User.objects.get(email="new@example.com")
+
+    def login(self):
+        payload = {"email": "new@example.com", "password": "secret123"}
+        return self.client.post(reverse("user-login"), payload, format="json").status_code
+
+    def verify(self, token):
+        return self.client.post(reverse("user-verify-email"), {"token": token}, format="json").status_code
+
+    def test_register_sends_link_that_verifies(self):
+        self.register()
+        [message] = mail.outbox
+        self.assertEqual(message.to, ["new@example.com"])
+        token = re.search(r"https://app\.example\.com/verify\?token=(\S+)", message.body).group(1)
+        self.assertEqual(self.login(), 401)
+        self.assertEqual(self.verify(token), 200)
+        self.assertEqual(self.login(), 200)
+
+    def test_bad_expired_and_stale_tokens(self):
+        user = self.register()
+        token = make_token(user)
+        self.assertEqual(self.verify(token + "x"), 400)
+        with override_settings(EMAIL_VERIFICATION_MAX_AGE=-1):
+            self.assertEqual(self.verify(token), 400)
+        User.objects.filter(pk=user.pk).update(email="changed@example.com")
+        self.assertEqual(self.verify(token), 400)
+        self.assertFalse(User.objects.get(pk=user.pk).is_verified)
+
+    def test_resend_is_limited_per_address_and_client(self):
+        self.register()
+        url = reverse("user-verify-email-resend")
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                self.assertEqual(self.client.post(url, {"email": "new@example.com"}, format="json").status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)  # the link sent at registration is recent
+        statuses = [self.client.post(url, {"email": "x@example.com"}, format="json").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_resend_and_password_change_notice(self):
+        user = self.register()
+        QueuedEmail.objects.update(created_at=timezone.now() - timedelta(minutes=10))
+        url = reverse("user-verify-email-resend")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {"email": "NEW@example.com"}, format="json").status_code, 200)
+            self.assertEqual(self.client.post(url, {"email": "nobody@example.com"}, format="json").status_code, 200)
+        self.assertEqual(len(mail.outbox), 2)
+
+        self.client.force_authenticate(user)
+        payload = {"old_password": "secret123", "new_password": "Secret456!"}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("user-password-change"), payload, format="json")
+        self.assertEqual(mail.outbox[-1].subject, "Your password was changed")
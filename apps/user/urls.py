@@ -3,11 +3,14 @@ from django.urls import path
 
 from apps.user.views import (
     AdminUserDetailView,
+    AdminUserListView,
     AdminUserStatusView,
+    EmailVerificationView,
     LoginView,
     PasswordChangeView,
     ProfileView,
     RegisterView,
+    ResendVerificationView,
 )
 
 
@@ -15,8 +18,11 @@ from apps.user.views import (
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="user-register"),
     path("login/", LoginView.as_view(), name="user-login"),
+    path("verify-email/", EmailVerificationView.as_view(), name="user-verify-email"),
+    path("verify-email/resend/", ResendVerificationView.as_view(), name="user-verify-email-resend"),
     path("profile/", ProfileView.as_view(), name="user-profile"),
     path("profile/password/", PasswordChangeView.as_view(), name="user-password-change"),
+    path("admin/users/", AdminUserListView.as_view(), name="admin-user-list"),
     path("admin/users/<int:pk>/", AdminUserDetailView.as_view(), name="admin-user-detail"),
     path("admin/users/<int:pk>/status/", AdminUserStatusView.as_view(), name="admin-user-status"),
 ]
@@ -1,8 +1,10 @@
+from functools import partial
 from typing import Optional
 
-from django.db.models import Q
+from django.db.models.functions import Lower
 from rest_framework import serializers
 
+from apps.core.validation import EMAIL_RE, USERNAME_RE, validate_records
 from apps.user.constants import UserRoles
 from apps.user.models import User
 
@@ -16,18 +18,15 @@ def validate_alpha(value, field_name):
 
 
 def validate_email_format(value):
-    import re
-    pattern = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
-    if not re.match(pattern, value):
+    if not EMAIL_RE.match(value):
         raise serializers.ValidationError("Invalid email format.")
     return value
 
 
 def validate_username_format(value):
-    import re
     if len(value) > 50:
         raise serializers.ValidationError("Username must be ≤ 50 characters.")
-    if not re.match(r"^[A-Za-z0-9][A-Za-z0-9._-]*$", value):
+    if not USERNAME_RE.match(value):
         raise serializers.ValidationError(
             "Username may contain letters, numbers, '.', '-', '_' and cannot start with a special character."
         )
@@ -65,7 +64,61 @@ def validate_unique_field(value, field_name: str, instance: Optional[User] = Non
 
 
 def validate_role_choice(value: str) -> str:
-    allowed = [choice[0] for choice in UserRoles.CHOICES]
-    if value not in allowed:
+    if value not in UserRoles.VALUES:
         raise serializers.ValidationError("Invalid role selection.")
-    return value
\ No newline at end of file
+    return value
+
+
+USER_FIELD_VALIDATORS = {
+    "email": validate_email_format,
+    "username": validate_username_format,
+    "phone": validate_phone_format,
+    "first_name": partial(validate_alpha, field_name="First name"),
+    "last_name": partial(validate_alpha, field_name="Last name"),
+    "role": validate_role_choice,
+    "password": validate_password_strength,
+}
+
+# (field, case_insensitive) pairs that must be unique across users
+USER_UNIQUE_FIELDS = (("email", True), ("username", True), ("phone", False))
+
+
+def validate_user_records(records, check_unique=True):
+    """
+    Bulk counterpart of the register serializer's field validation.
+
+    Format checks run in one pass over ``records``; uniqueness is then checked
+    with one query per unique field for the whole batch (plus duplicates
+    inside the batch) instead of one ``exists()`` per record and field.
+    """
+    cleaned, errors = validate_records(records, USER_FIELD_VALIDATORS)
+    if not check_unique:
+        return cleaned, errors
+
+    for field, case_insensitive in USER_UNIQUE_FIELDS:
+        keys = {}
+        for index, row in enumerate(cleaned):
+            value = row.get(field)
+            if not isinstance(value, str) or field in errors.get(index, {}):
+                continue
+            keys.setdefault(value.lower() if case_insensitive else value, []).append(index)
+        if not keys:
+            continue
+
+        if case_insensitive:
+            taken = User.objects.alias(key=Lower(field)).filter(key__in=list(keys))
+            taken = {value.lower() for value in taken.values_list(field, flat=True)}
+        else:
+            taken = set(User.objects.filter(**{f"{field}__in": list(keys)}).values_list(field, flat=True))
+
+        verbose = field.replace("_", " ").title()
+        for key, indexes in keys.items():
+            if key in taken:
+                message, flagged = f"{verbose} already exists.", indexes
+            elif len(indexes) > 1:
+                message, flagged = f"{verbose} is duplicated in this batch.", indexes[1:]
+            else:
+                continue
+            for index in flagged:
+                errors.setdefault(index, {}).setdefault(field, []).append(message)
+    return cleaned, errors
\ No newline at end of file
@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from apps.core.mail import queue_email
+from apps.core.models import QueuedEmail
+from apps.user.models import User
+
+SALT = "apps.user.verify-email"
+
+
+def make_token(user):
+    # signed over the address: changing the email voids links sent to the old one
+    return signing.dumps({"user": user.pk, "email": user.email}, salt=SALT)
+
+
+def read_token(token):
+    """The user ``token`` was made for, or ``None`` if it is invalid, expired or stale."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=settings.EMAIL_VERIFICATION_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return User.objects.filter(pk=payload["user"], email=payload["email"]).first()
+
+
+def send_verification_email(user):
+    link = settings.EMAIL_VERIFICATION_URL.format(token=make_token(user))
+    queue_email(
+        "Verify your email address",
+        f"Hi {user.username},\n\nConfirm your email address to finish setting up your account:\n\n{link}\n\n"
+        f"The link is valid for {settings.EMAIL_VERIFICATION_MAX_AGE // 3600} hours. If you did not sign up, "
+        "ignore this email.",
+        [user.email],
+        kind="verify-email",
+    )
+
+
+def verification_recently_sent(user):
+    """True when a verification email to ``user`` was queued in the last ``EMAIL_VERIFICATION_RESEND_SECONDS``."""
+    since = timezone.now() - timedelta(seconds=settings.EMAIL_VERIFICATION_RESEND_SECONDS)
+    return QueuedEmail.objects.filter(kind="verify-email", to=[user.email], created_at__gte=since).exists()
+
+
+def send_password_changed_email(user):
+    queue_email(
+        "Your password was changed",
+        f"Hi {user.username},\n\nThe password of your account was just changed. If this was not you, contact "
+        "an administrator right away.",
+        [user.email],
+        kind="password-changed",
+    )
@@ -1,18 +1,30 @@
+from datetime import datetime, time
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from apps.core.audit import AuditMixin
+from apps.core.pagination import KeysetPagination
 from apps.user.constants import UserRoles
 from apps.user.models import User
 from apps.user.serializers import (
     AdminUserUpdateSerializer,
+    EmailVerificationSerializers,
     PasswordChangeSerializer,
     RegisterUserSerializer,
+    ResendVerificationSerializer,
     UserDetailSerializer,
     UserLoginSerializer,
     UserStatusSerializer,
     UserUpdateSerializer,
 )
+from apps.user.verification import send_password_changed_email, send_verification_email, verification_recently_sent
 
 
 def _is_admin(user: User) -> bool:
@@ -24,6 +36,7 @@ def _is_admin(user: User) -> bool:
 class RegisterView(generics.GenericAPIView):
     serializer_class = RegisterUserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
 
     def post(self, request, *args, **kwargs):
         data = request.data.copy()
@@ -40,7 +53,9 @@ class RegisterView(generics.GenericAPIView):
 
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()
+        with transaction.atomic(savepoint=False):
+            user = serializer.save()
+            send_verification_email(user)
         return Response(
             {
                 "message": "User registered successfully.",
@@ -53,6 +68,7 @@ class RegisterView(generics.GenericAPIView):
 class LoginView(generics.GenericAPIView):
     serializer_class = UserLoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "login"
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -103,11 +119,125 @@ class PasswordChangeView(generics.GenericAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={"request": request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic(savepoint=False):
+            user = serializer.save()
+            send_password_changed_email(user)
         return Response({"message": "Password updated successfully."})
 
 
-class AdminUserDetailView(generics.RetrieveUpdateAPIView):
+class EmailVerificationView(generics.GenericAPIView):
+    """Confirm an email address with the token from the verification email."""
+
+    serializer_class = EmailVerificationSerializers
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+        if not user.is_verified:
+            user.is_verified = True
+            user.save(update_fields=["is_verified", "updated_at"])
+        return Response({"message": "Email verified successfully."})
+
+
+class ResendVerificationView(generics.GenericAPIView):
+    """Send the verification email again; answers the same whether or not the address is known."""
+
+    serializer_class = ResendVerificationSerializer
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = "verify_resend"
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = User.objects.filter(email__iexact=serializer.validated_data["email"], is_verified=False).first()
+        # one link per address per EMAIL_VERIFICATION_RESEND_SECONDS, however
+        # many clients ask: the endpoint must not be a way to flood an inbox
+        if user is not None and user.is_active and not verification_recently_sent(user):
+            send_verification_email(user)
+        return Response({"message": "If the address needs verifying, a new link is on its way."})
+
+
+def _parse_bool(value, name):
+    lowered = value.lower()
+    if lowered in {"true", "1", "yes"}:
+        return True
+    if lowered in {"false", "0", "no"}:
+        return False
+    raise ValidationError({name: "Must be true or false."})
+
+
+def _parse_created(value, name):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is not None:
+            parsed = datetime.combine(day, time.min)
+    if parsed is None:
+        raise ValidationError({name: "Must be an ISO 8601 date or datetime."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _prefix_upper_bound(prefix):
+    # smallest string greater than every string starting with ``prefix``
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class AdminUserListView(generics.ListAPIView):
+    serializer_class = UserDetailSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = KeysetPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        params = self.request.query_params
+        qs = User.objects.all()
+
+        role = params.get("role")
+        if role:
+            if role not in UserRoles.VALUES:
+                raise ValidationError({"role": "Invalid role selection."})
+            qs = qs.filter(role=role)
+        for flag in ("is_active", "is_verified"):
+            if params.get(flag):
+                qs = qs.filter(**{flag: _parse_bool(params[flag], flag)})
+        if params.get("created_after"):
+            qs = qs.filter(created_at__gte=_parse_created(params["created_after"], "created_after"))
+        if params.get("created_before"):
+            qs = qs.filter(created_at__lt=_parse_created(params["created_before"], "created_before"))
+
+        search = params.get("search", "").strip().lower()
+        if search:
+            # range scans on the LOWER(email)/LOWER(username) indexes instead of LIKE
+            upper = _prefix_upper_bound(search)
+            qs = qs.alias(email_key=Lower("email"), username_key=Lower("username")).filter(
+                Q(email_key__gte=search, email_key__lt=upper)
+                | Q(username_key__gte=search, username_key__lt=upper)
+            )
+        return qs
+
+    def get_role_counts(self, queryset):
+        counts = {value: 0 for value, _ in UserRoles.CHOICES}
+        rows = queryset.order_by().values("role").annotate(count=Count("id"))
+        for row in rows:
+            counts[row["role"]] = row["count"]
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        counts = self.get_role_counts(queryset)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data["counts"] = counts
+        return response
+
+
+class AdminUserDetailView(AuditMixin, generics.RetrieveUpdateAPIView):
     serializer_class = AdminUserUpdateSerializer
     permission_classes = [permissions.IsAdminUser]
     queryset = User.objects.all()
@@ -125,7 +255,7 @@ class AdminUserDetailView(generics.RetrieveUpdateAPIView):
         return self.patch(request, *args, **kwargs)
 
 
-class AdminUserStatusView(generics.UpdateAPIView):
+class AdminUserStatusView(AuditMixin, generics.UpdateAPIView):
     serializer_class = UserStatusSerializer
     permission_classes = [permissions.IsAdminUser]
     queryset = User.objects.all()
@@ -0,0 +1,56 @@
+"""
+Benchmarks for the API.
+
+Each module is runnable with ``python -m benchmarks.<name>`` from the project
+root and prints a JSON report on stdout so results can be diffed between
+commits. Settings come from the same environment / ``.env`` as ``manage.py``.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cp360_config.settings")
+    import django
+
+    django.setup()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(samples, points=(50, 90, 95, 99)):
+    """Nearest-rank percentiles of ``samples``; empty input gives ``None``s."""
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        if not ordered:
+            result[f"p{point}"] = None
+            continue
+        rank = max(0, min(len(ordered) - 1, round(point / 100 * len(ordered)) - 1))
+        result[f"p{point}"] = ordered[rank]
+    return result
+
+
+def report(name, results, **meta):
+    payload = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        **meta,
+        "results": results,
+    }
+    json.dump(payload, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+    return payload
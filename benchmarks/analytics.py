@@ -0,0 +1,103 @@
+"""
+Price analytics: NumPy over chunked reads against plain Python, time and memory.
+
+    python -m benchmarks.analytics --chunk-sizes 10000,50000,200000
+
+Run on a large catalog (``python -m benchmarks.seed --products 1000000
+--videos-per-product 0``). ``numpy`` is ``apps.products.analytics`` over
+every live product for each chunk size; ``python`` computes the same
+histograms and percentiles with lists per category (``statistics``), as a
+first version would. ``peak_mb`` is the tracemalloc peak (NumPy reports its
+buffers to tracemalloc), taken in a second run. ``endpoint`` times ``GET /api/products/analytics/``
+cold and then served from the cache.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from django.core.cache import cache  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from apps.products import analytics  # noqa: E402
+from apps.products.models import Product  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+
+def python_analytics(queryset, bins):
+    prices = defaultdict(list)
+    for category_id, price in queryset.values_list("category_id", "price").iterator(chunk_size=2000):
+        prices[category_id].append(float(price))
+    result = {}
+    for category_id, values in prices.items():
+        values.sort()
+        low, high = values[0], values[-1]
+        width = (high - low) / bins or 1
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        cuts = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+        result[category_id] = {"counts": counts, "percentiles": [cuts[q - 1] for q in analytics.PERCENTILES]}
+    return result
+
+
+def measure(call):
+    # timed and traced in separate runs: tracing slows allocation-heavy code a lot
+    started = time.perf_counter()
+    call()
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_mb": round(peak / 2**20, 1)}
+
+
+def time_endpoint(user, bins):
+    client = APIClient()
+    client.force_authenticate(user)
+    cache.clear()
+    timings = {}
+    for name in ("cold_s", "cached_s"):
+        started = time.perf_counter()
+        response = client.get(reverse("product-analytics"), {"bins": bins})
+        timings[name] = round(time.perf_counter() - started, 4)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunk-sizes", default="10000,50000,200000")
+    parser.add_argument("--bins", type=int, default=20)
+    parser.add_argument("--skip-python", action="store_true", help="skip the plain Python baseline")
+    args = parser.parse_args()
+
+    if not analytics.load_numpy():
+        raise SystemExit("numpy is not installed")
+    queryset = Product.objects.filter(is_deleted=False)
+    user = User.objects.filter(email="agent@bench.local").first()
+    if user is None:
+        raise SystemExit("No benchmark catalog: run python -m benchmarks.seed first")
+
+    results = {"numpy": {}}
+    with override_settings(DEBUG=False):
+        for chunk_size in map(int, args.chunk_sizes.split(",")):
+            with override_settings(PRICE_ANALYTICS_CHUNK_SIZE=chunk_size):
+                results["numpy"][str(chunk_size)] = measure(lambda: analytics.price_analytics(queryset, args.bins))
+        if not args.skip_python:
+            results["python"] = measure(lambda: python_analytics(queryset, args.bins))
+        results["endpoint"] = time_endpoint(user, args.bins)
+
+    report("analytics", results, products=queryset.count(), bins=args.bins)
+
+
+if __name__ == "__main__":
+    main()
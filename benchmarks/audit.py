@@ -0,0 +1,62 @@
+"""
+Audit log: time added to a request, queued versus a synchronous insert.
+
+    python -m benchmarks.audit --entries 5000
+
+``sync_insert`` creates each entry on the spot, as a logging handler writing
+to the table would; ``queued`` is ``audit_log.record``, with the background
+thread inserting batches of ``AUDIT_BATCH_SIZE``. ``drain_s`` is how long the
+thread takes to write everything queued. The entries are deleted afterwards
+(bypassing the append-only guard).
+"""
+import argparse
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.db.models import Max, QuerySet  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from apps.core.audit import audit_log  # noqa: E402
+from apps.core.models import AuditEntry  # noqa: E402
+
+ENTRY = {"actor_id": 1, "actor_email": "bench@example.com", "view": "Bench", "action": "update",
+         "method": "PATCH", "path": "/api/bench/1/", "object_id": "1", "status": 200}
+
+
+def timed_calls(call, count):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return {key: round(value, 1) for key, value in percentiles(samples, (50, 99)).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    first = (AuditEntry.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+    results = {}
+    try:
+        with override_settings(DEBUG=False, AUDIT_BACKGROUND_FLUSH=True):
+            results["sync_insert_us"] = timed_calls(lambda: AuditEntry.objects.create(**ENTRY), args.entries)
+            results["queued_us"] = timed_calls(lambda: audit_log.record(**ENTRY), args.entries)
+            started = time.perf_counter()
+            while audit_log.written + audit_log.dropped < args.entries:
+                time.sleep(0.005)
+            results["drain_s"] = round(time.perf_counter() - started, 3)
+            results["dropped"] = audit_log.dropped
+    finally:
+        QuerySet.delete(AuditEntry.objects.filter(id__gte=first))
+
+    report("audit", results, entries=args.entries, batch_size=settings.AUDIT_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Autocomplete prefix index: build time, memory and lookup latency.
+
+    python -m benchmarks.autocomplete --titles 1000000 --lookups 20000
+
+Runs ``PrefixIndex`` on synthetic product titles without touching the
+database, so it measures the data structure the endpoint serves from.
+Lookups use random 1-6 character prefixes of existing titles.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from apps.products.autocomplete import PrefixIndex  # noqa: E402
+
+WORDS = (
+    "alpha bravo classic deluxe eco flex giga hyper iron jet kilo lite mega nano omni prime "
+    "quad retro smart turbo ultra vivid wave xeno young zen walnut oak lamp desk chair"
+).split()
+
+
+def make_titles(count, rng):
+    for i in range(count):
+        yield i + 1, f"{' '.join(rng.sample(WORDS, 3)).title()} {i}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--titles", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = list(make_titles(args.titles, rng))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = PrefixIndex(max_entries=args.titles)
+    index.load((pk, title, (pk, title)) for pk, title in titles)
+    build_s = time.perf_counter() - started
+    memory_mb = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+    tracemalloc.stop()
+
+    prefixes = []
+    for _ in range(args.lookups):
+        title = rng.choice(titles)[1]
+        prefixes.append(title[: rng.randint(1, 6)])
+
+    samples = []
+    hits = 0
+    for prefix in prefixes:
+        start = time.perf_counter()
+        hits += len(index.search(prefix, args.limit))
+        samples.append((time.perf_counter() - start) * 1000)
+
+    renamed = titles[:1000]
+    started = time.perf_counter()
+    for pk, title in renamed:
+        index.upsert(pk, f"renamed {title}", (pk, title))
+    upsert_ms = (time.perf_counter() - started) * 1000 / len(renamed)
+
+    report(
+        "autocomplete",
+        {
+            "build_s": round(build_s, 3),
+            "index_memory_mb": round(memory_mb, 1),
+            "lookup_ms": {
+                "mean": round(sum(samples) / len(samples), 4),
+                "max": round(max(samples), 4),
+                **{key: round(value, 4) for key, value in percentiles(samples).items()},
+            },
+            "avg_results": round(hits / len(prefixes), 2),
+            "upsert_ms_each": round(upsert_ms, 4),
+        },
+        titles=args.titles,
+        lookups=args.lookups,
+    )
+
+
+if __name__ == "__main__":
+    main()
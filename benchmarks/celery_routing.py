@@ -0,0 +1,164 @@
+"""
+Celery routing: how long an export waits behind a burst of video uploads.
+
+    python -m benchmarks.celery_routing --videos 200 --exports 10
+
+Runs in-process workers on the ``memory://`` transport (no broker needed)
+against stand-in tasks named like the real ones, which sleep instead of
+working (under their own names: ``shared_task`` registers the real ones
+with every app). ``single`` sends everything to one queue served by one pool, as
+before routing; ``routed`` uses the project's ``CELERY_TASK_ROUTES`` with a
+pool per queue. Reported is the wait from dispatch to an export starting.
+The memory transport ignores priorities, so the small/large ordering on
+``videos`` needs RabbitMQ to be seen.
+
+A second run compares dispatching with a result backend (``cache+memory://``)
+against ``ignore_result``.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from celery import Celery  # noqa: E402
+from celery.contrib.testing.worker import start_worker  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+SCENARIOS = ("single", "routed", "result_backend", "ignore_result")
+
+# stand-in -> real task
+TASKS = {
+    "bench.process_uploaded_video": "apps.products.tasks.process_uploaded_video",
+    "bench.run_export_job": "apps.products.tasks.run_export_job",
+}
+
+
+class Tally:
+    """What the stand-in tasks report back, shared by the apps of one run."""
+
+    def __init__(self):
+        self.waits, self.done, self.finished = [], threading.Event(), threading.Semaphore(0)
+
+
+def make_app(tally, routes, result_backend=None):
+    app = Celery("bench", broker="memory://", backend=result_backend, set_as_current=False)
+    app.conf.update(
+        task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+        task_routes={name: routes[real] for name, real in TASKS.items() if real in routes},
+        # unlimited: with the prefetch window full the memory transport only
+        # polls again after the worker's 2 s drain timeout, swamping the numbers
+        worker_prefetch_multiplier=0,
+        task_acks_late=True,
+        broker_transport_options={"polling_interval": 0.001},
+    )
+
+    @app.task(name="bench.process_uploaded_video", ignore_result=result_backend is None)
+    def video(seconds):
+        time.sleep(seconds)
+        tally.finished.release()
+
+    @app.task(name="bench.run_export_job", ignore_result=result_backend is None)
+    def export(sent, expected):
+        tally.waits.append(time.perf_counter() - sent)
+        if len(tally.waits) == expected:
+            tally.done.set()
+
+    return app, video, export
+
+
+def run_routing(routes, pools, videos, exports, seconds):
+    tally = Tally()
+    _, video, export = make_app(tally, routes)
+    # an app per worker: the queues a worker consumes are selected on its app
+    workers = [
+        start_worker(
+            make_app(tally, routes)[0], concurrency=concurrency, pool="threads", queues=queues, perform_ping_check=False
+        )
+        for queues, concurrency in pools
+    ]
+    for worker in workers:
+        worker.__enter__()
+    try:
+        started = time.perf_counter()
+        for _ in range(videos):
+            video.delay(seconds)
+        for _ in range(exports):
+            export.delay(time.perf_counter(), exports)
+        tally.done.wait(timeout=videos * seconds + 60)
+        elapsed = time.perf_counter() - started
+    finally:
+        for worker in reversed(workers):
+            worker.__exit__(None, None, None)
+    return {
+        "export_wait_ms": {k: round(v * 1000, 1) for k, v in percentiles(tally.waits, (50, 95)).items()},
+        "exports_done": len(tally.waits),
+        "seconds": round(elapsed, 2),
+    }
+
+
+def run_results(count, result_backend):
+    tally = Tally()
+    app, video, _ = make_app(tally, {}, result_backend)
+    with start_worker(app, concurrency=4, pool="threads", perform_ping_check=False):
+        started = time.perf_counter()
+        for _ in range(count):
+            video.delay(0)
+        for _ in range(count):
+            tally.finished.acquire(timeout=60)
+        return round(count / (time.perf_counter() - started))
+
+
+def run_scenario(name, args):
+    if name == "single":
+        return run_routing({}, [(None, 4)], args.videos, args.exports, args.video_seconds)
+    if name == "routed":
+        pools = [(["videos"], 3), (["exports", "default"], 1)]
+        return run_routing(settings.CELERY_TASK_ROUTES, pools, args.videos, args.exports, args.video_seconds)
+    return run_results(args.tasks, "cache+memory://" if name == "result_backend" else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--exports", type=int, default=10)
+    parser.add_argument("--video-seconds", type=float, default=0.01)
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks for the result backend comparison")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        json.dump(run_scenario(args.scenario, args), sys.stdout)
+        return
+
+    # a process per scenario: the memory transport keeps its broker state in
+    # class attributes, and workers left behind by one run upset the next
+    results = {}
+    for name in SCENARIOS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.celery_routing", "--scenario", name, *sys.argv[1:]],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results[name] = json.loads(out)
+    report(
+        "celery_routing",
+        {
+            "single": results["single"],
+            "routed": results["routed"],
+            "tasks_per_s": {"result_backend": results["result_backend"], "ignore_result": results["ignore_result"]},
+        },
+        videos=args.videos,
+        exports=args.exports,
+        video_seconds=args.video_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
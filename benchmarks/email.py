@@ -0,0 +1,108 @@
+"""
+Email: queued batches over a pooled SMTP connection against a connection per message.
+
+    python -m benchmarks.email --emails 500 --handshake-ms 40
+
+Runs against a local SMTP sink that accepts everything; ``--handshake-ms``
+delays its greeting to stand in for the TLS and login round trips of a real
+server. ``per_message`` sends each email with ``send_mail`` (a new
+connection each time), as the API did before the queue; ``queued`` queues
+them all and times ``deliver_email``'s ``deliver_emails``, which includes
+claiming and marking the rows. The queued rows are deleted afterwards.
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from django.core.mail import send_mail  # noqa: E402
+from django.db.models import Max  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from apps.core import mail  # noqa: E402
+from apps.core.models import QueuedEmail  # noqa: E402
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        time.sleep(self.server.handshake)
+        self.reply("220 sink ready")
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b"DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.received += 1
+                self.reply("250 queued")
+            elif command == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 ok")
+
+
+class Sink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self, handshake):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.handshake = handshake
+        self.received = 0
+
+
+def timed(call, count):
+    started = time.perf_counter()
+    call()
+    seconds = time.perf_counter() - started
+    return {"seconds": round(seconds, 3), "per_second": round(count / seconds, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--handshake-ms", type=float, default=40)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    sink = Sink(args.handshake_ms / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    smtp = {
+        "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+        "EMAIL_HOST": "127.0.0.1",
+        "EMAIL_PORT": sink.server_address[1],
+        "EMAIL_USE_TLS": False,
+        "EMAIL_HOST_USER": "",
+        "EMAIL_HOST_PASSWORD": "",
+    }
+    addresses = [f"bench{i}@example.com" for i in range(args.emails)]
+
+    def per_message():
+        for address in addresses:
+            send_mail("Benchmark", "Hello", None, [address])
+
+    first = (QueuedEmail.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+    results = {}
+    try:
+        with override_settings(DEBUG=False, **smtp):
+            results["per_message"] = timed(per_message, args.emails)
+            mail.queue_emails({"subject": "Benchmark", "body": "Hello", "to": [address]} for address in addresses)
+            results["queued"] = timed(lambda: mail.deliver_emails(batch_size=args.batch_size), args.emails)
+            results["queued"]["connections"] = mail.pool.opened
+            mail.pool.discard()
+    finally:
+        QueuedEmail.objects.filter(id__gte=first).delete()
+        sink.shutdown()
+
+    report("email", results, emails=args.emails, handshake_ms=args.handshake_ms, received=sink.received)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Export formats: throughput, output size and peak memory per format.
+
+    python -m benchmarks.seed --products 200000
+    python -m benchmarks.exports --repeat 3
+
+Drives the same code as ``GET /api/<kind>/export/?format=`` (queryset,
+batches and encoder) but drains the byte stream into nothing, so the numbers
+exclude the network. Peak memory is measured with ``tracemalloc`` in a
+separate pass, since tracing slows everything down. Parquet is skipped when
+pyarrow is not installed.
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from rest_framework.exceptions import ValidationError  # noqa: E402
+
+from apps.products.exports import EXPORT_FORMATS, export_format, iter_batches  # noqa: E402
+from apps.products.views import CategoryViewSet, ProductViewSet  # noqa: E402
+
+EXPORTS = {
+    "products": (ProductViewSet, {}),
+    "categories_with_products": (CategoryViewSet, {"include_products": ["true"]}),
+}
+
+
+def run_export(viewset, params, name):
+    view = viewset.for_export({**params, "format": [name]})
+    columns, rows, expand = view.get_export(view.filter_queryset(view.get_queryset()), view.request.query_params)
+    records = 0
+    size = 0
+
+    def progress(done):
+        nonlocal records
+        records = done
+
+    batches = iter_batches(rows, expand, settings.EXPORT_CHUNK_SIZE, progress)
+    for chunk in EXPORT_FORMATS[name].encode(columns, batches):
+        size += len(chunk)
+    return records, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for label, (viewset, params) in EXPORTS.items():
+        for name in args.formats.split(","):
+            try:
+                export_format({"format": name})
+            except ValidationError as exc:
+                results[f"{label}.{name}"] = {"skipped": str(exc.detail["format"][0])}
+                continue
+
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                records, size = run_export(viewset, params, name)
+                samples.append(time.perf_counter() - started)
+
+            tracemalloc.start()
+            run_export(viewset, params, name)
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+            best = min(samples)
+            results[f"{label}.{name}"] = {
+                "records": records,
+                "bytes": size,
+                "seconds": {"min": round(best, 3), **{k: round(v, 3) for k, v in percentiles(samples, (50,)).items()}},
+                "records_per_s": round(records / best) if best else None,
+                "output_mb_per_s": round(size / best / (1024 * 1024), 2) if best else None,
+                "peak_memory_mb": round(peak_mb, 2),
+            }
+
+    report("exports", results, repeat=args.repeat, chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+if __name__ == "__main__":
+    main()
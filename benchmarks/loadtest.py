@@ -0,0 +1,233 @@
+"""
+Scripted load test against a running API server.
+
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 \
+        --concurrency 8 --requests 200 --scenarios list,filter,deep_page
+
+Seed the database first (``python -m benchmarks.seed``); the scenarios log in
+with the seeded ``agent@bench.local`` / ``staff@bench.local`` accounts.
+``--serve`` starts ``manage.py runserver --noreload`` on the base URL's port
+for the duration of the run; uploads in ``create_with_videos`` are processed
+in-process when the server runs with ``CELERY_TASK_ALWAYS_EAGER=True``.
+
+Each scenario runs ``--requests`` requests over ``--concurrency`` threads
+after ``--warmup`` untimed ones and reports throughput, status codes and
+latency percentiles (ms) as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+from benchmarks import percentiles, report
+
+AGENT = "agent@bench.local"
+STAFF = "staff@bench.local"
+PASSWORD = "benchpass123"
+
+
+class Client:
+    def __init__(self, base_url, token=None, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if body is not None:
+            headers["Content-Type"] = content_type
+            if content_type == "application/json":
+                body = json.dumps(body).encode("utf-8")
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def json(self, method, path, body=None):
+        status, payload = self.request(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {payload[:200]!r}")
+        return json.loads(payload)
+
+
+def login(base_url, email):
+    data = Client(base_url).json("POST", "/api/users/login/", {"email": email, "password": PASSWORD})
+    return Client(base_url, data["tokens"]["access"])
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    for name, (filename, content) in files:
+        parts.append(
+            (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                "Content-Type: video/mp4\r\n\r\n"
+            ).encode("utf-8")
+            + content
+            + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class Scenarios:
+    """Each scenario is a ``(rng) -> (method, path, body, content_type)`` factory."""
+
+    def __init__(self, base_url, video_bytes):
+        self.agent = login(base_url, AGENT)
+        self.staff = login(base_url, STAFF)
+        self.video = b"\0" * video_bytes
+
+        first = self.agent.json("GET", "/api/products/")
+        self.product_count = first["count"]
+        self.last_page = max(1, -(-self.product_count // max(1, len(first["results"]))))
+        self.product_ids = [row["id"] for row in first["results"]]
+        self.category_ids = list({row["category"] for row in first["results"]})
+        if not self.product_ids:
+            raise SystemExit("No products found: run `python -m benchmarks.seed` first.")
+
+    def client_for(self, name):
+        return self.staff if name == "approve" else self.agent
+
+    def list(self, rng):
+        return "GET", "/api/products/", None, None
+
+    def filter(self, rng):
+        query = urlencode({"status": rng.choice(["uploaded", "success"]), "category": rng.choice(self.category_ids)})
+        return "GET", f"/api/products/?{query}", None, None
+
+    def deep_page(self, rng):
+        page = rng.randint(max(1, self.last_page - 10), self.last_page)
+        return "GET", f"/api/products/?page={page}", None, None
+
+    def export(self, rng):
+        return "GET", "/api/products/export/", None, None
+
+    def create_with_videos(self, rng):
+        body, content_type = multipart(
+            {"category": rng.choice(self.category_ids), "title": "Load test product", "price": "9.99"},
+            [("video_files", ("clip.mp4", self.video))],
+        )
+        return "POST", "/api/products/", body, content_type
+
+    def approve(self, rng):
+        return "POST", f"/api/products/{rng.choice(self.product_ids)}/approve/", None, None
+
+
+SCENARIOS = ["list", "filter", "deep_page", "export", "create_with_videos", "approve"]
+
+
+def run_scenario(scenarios, name, total, concurrency, warmup, seed):
+    client = scenarios.client_for(name)
+    factory = getattr(scenarios, name)
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+
+    def one(index, record=True):
+        # from the seed and index alone: the pool runs requests in any order,
+        # and a given --seed must still send the same mix
+        rng = random.Random(f"{seed}:{index}")
+        method, path, body, content_type = factory(rng)
+        start = time.perf_counter()
+        status, _ = client.request(method, path, body, content_type or "application/json")
+        elapsed = (time.perf_counter() - start) * 1000
+        if record:
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    for i in range(warmup):
+        one(-i - 1, record=False)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(total / wall, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(max(latencies), 3),
+            **{key: round(value, 3) for key, value in percentiles(latencies).items()},
+        },
+    }
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            Client(base_url, timeout=2).request("GET", "/api/")
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from {SCENARIOS}")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--video-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--serve", action="store_true", help="start a dev server for the run")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    server = None
+    if args.serve:
+        port = urlparse(args.base_url).port or 8000
+        server = subprocess.Popen(
+            [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"],
+            env={**os.environ, "CELERY_TASK_ALWAYS_EAGER": "True"},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    try:
+        wait_until_up(args.base_url)
+        scenarios = Scenarios(args.base_url, args.video_bytes)
+        results = {
+            name: run_scenario(scenarios, name, args.requests, args.concurrency, args.warmup, args.seed)
+            for name in names
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    report("loadtest", results, base_url=args.base_url, catalog_products=scenarios.product_count)
+
+
+if __name__ == "__main__":
+    main()
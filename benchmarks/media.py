@@ -0,0 +1,97 @@
+"""
+Video delivery: ``serve_media`` vs Django's ``static.serve``.
+
+    python -m benchmarks.media --size-mb 64 --repeat 5
+
+Writes a ``--size-mb`` file under ``MEDIA_ROOT/benchmarks/`` and drains
+responses in-process, the way a WSGI server without ``sendfile`` reads
+them: whole-file throughput for both views, then a player seeking to
+``--seeks`` random offsets and reading ``--range-kb`` from each. The static
+view ignores ``Range``, so every seek costs it the whole file. Under
+gunicorn ``serve_media`` goes through ``sendfile`` and the bytes never reach
+Python, so the in-process numbers are its worst case.
+"""
+import argparse
+import os
+import random
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.views.static import serve  # noqa: E402
+
+from apps.core.media import serve_media  # noqa: E402
+
+NAME = "benchmarks/media.bin"
+
+
+def drain(response):
+    size = 0
+    for chunk in response:
+        size += len(chunk)
+    response.close()
+    return size
+
+
+def time_requests(view, requests):
+    samples, size = [], 0
+    for request in requests:
+        started = time.perf_counter()
+        size += drain(view(request))
+        samples.append(time.perf_counter() - started)
+    return samples, size
+
+
+def summarize(samples, size):
+    total = sum(samples)
+    return {
+        "requests": len(samples),
+        "bytes": size,
+        "mb_per_s": round(size / total / (1024 * 1024), 1) if total else None,
+        **{f"{k}_ms": round(v * 1000, 2) for k, v in percentiles(samples, (50, 99)).items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seeks", type=int, default=50)
+    parser.add_argument("--range-kb", type=int, default=1024)
+    args = parser.parse_args()
+
+    path = os.path.join(settings.MEDIA_ROOT, NAME)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = args.size_mb * 1024 * 1024
+    with open(path, "wb") as fh:
+        for _ in range(args.size_mb):
+            fh.write(os.urandom(1024 * 1024))
+
+    factory = RequestFactory()
+    views = {
+        "static_serve": lambda request: serve(request, NAME, document_root=settings.MEDIA_ROOT),
+        "serve_media": lambda request: serve_media(request, NAME, "application/octet-stream"),
+    }
+    span = args.range_kb * 1024
+    offsets = [random.randrange(0, size - span) for _ in range(args.seeks)]
+    results = {}
+    try:
+        for label, view in views.items():
+            full = [factory.get("/") for _ in range(args.repeat)]
+            seeks = [factory.get("/", headers={"range": f"bytes={o}-{o + span - 1}"}) for o in offsets]
+            results[label] = {
+                "full_file": summarize(*time_requests(view, full)),
+                "seeks": summarize(*time_requests(view, seeks)),
+            }
+    finally:
+        os.remove(path)
+
+    report("media", results, size_mb=args.size_mb, range_kb=args.range_kb)
+
+
+if __name__ == "__main__":
+    main()
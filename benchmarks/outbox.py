@@ -0,0 +1,93 @@
+"""
+Outbox: cost of recording events and relay throughput per batch size.
+
+    python -m benchmarks.outbox --events 20000 --batch-sizes 100,500,2000
+
+``record`` times approving products with and without their event (the
+extra insert in the same transaction). ``relay`` fills the outbox with
+``--events`` events and drains it into the memory and file sinks. Runs in
+a transaction that is rolled back, so the database is left as it was and no
+relay task is queued.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from django.db import transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from apps.products.models import OutboxEvent, Product  # noqa: E402
+from apps.products.outbox import FileSink, MemorySink, relay_events  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def time_record(products):
+    timings = {}
+    with transaction.atomic():
+        started = time.perf_counter()
+        for product in products:
+            product.status = Product.STATUS_SUCCESS
+            with transaction.atomic(savepoint=False):
+                product.save()
+        timings["save_ms"] = (time.perf_counter() - started) * 1000 / len(products)
+        started = time.perf_counter()
+        for product in products:
+            product.set_status(Product.STATUS_SUCCESS, None)
+        timings["save_with_event_ms"] = (time.perf_counter() - started) * 1000 / len(products)
+    return {key: round(value, 3) for key, value in timings.items()}
+
+
+def time_relay(sink, events, batch_size):
+    OutboxEvent.objects.update(sent_at=None)
+    started = time.perf_counter()
+    summary = relay_events(batch_size=batch_size, sink=sink)
+    seconds = time.perf_counter() - started
+    assert summary["sent"] == events
+    return round(events / seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch-sizes", default="100,500,2000")
+    parser.add_argument("--products", type=int, default=500)
+    args = parser.parse_args()
+
+    products = list(Product.objects.filter(is_deleted=False)[: args.products])
+    if not products:
+        raise SystemExit("No products: run python -m benchmarks.seed first")
+    results = {}
+    path = os.path.join(tempfile.mkdtemp(), "events.jsonl")
+    try:
+        with override_settings(DEBUG=False), transaction.atomic():
+            results["record"] = time_record(products)
+            OutboxEvent.objects.all().delete()
+            OutboxEvent.record_many((products[i % len(products)], OutboxEvent.PRODUCT_APPROVED) for i in range(args.events))
+            results["relay_events_per_s"] = {}
+            for batch_size in map(int, args.batch_sizes.split(",")):
+                MemorySink.events.clear()
+                results["relay_events_per_s"][str(batch_size)] = {
+                    "memory": time_relay(MemorySink(), args.events, batch_size),
+                    "file": time_relay(FileSink(path), args.events, batch_size),
+                }
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+    report("outbox", results, events=args.events, products=len(products))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Media reconciliation: files per second and peak memory as the tree grows.
+
+    python -m benchmarks.reconcile --files 10000,100000
+
+Creates ``--files`` empty files under ``<video storage>/products/bench-*/``
+(no rows reference them) and runs a dry-run ``reconcile_media`` over the
+whole tree, with ``tracemalloc`` on. Peak memory should stay flat as the
+file count grows. The files are removed afterwards.
+"""
+import argparse
+import os
+import shutil
+import time
+import tracemalloc
+from datetime import timedelta
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from apps.products.models import PRODUCT_VIDEO_ROOT  # noqa: E402
+from apps.products.reconcile import reconcile_media  # noqa: E402
+from apps.products.storage import video_storage  # noqa: E402
+
+FILES_PER_DIR = 10
+
+
+def make_tree(root, files):
+    dirs = []
+    for d in range(0, files, FILES_PER_DIR):
+        path = os.path.join(root, PRODUCT_VIDEO_ROOT, f"bench-{d}", "videos")
+        os.makedirs(path)
+        dirs.append(os.path.dirname(path))
+        for f in range(min(FILES_PER_DIR, files - d)):
+            open(os.path.join(path, f"{f}.mp4"), "wb").close()
+    return dirs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", default="10000,100000")
+    args = parser.parse_args()
+
+    root = video_storage().path("")
+    results = {}
+    for files in map(int, args.files.split(",")):
+        dirs = make_tree(root, files)
+        try:
+            tracemalloc.start()
+            started = time.perf_counter()
+            # DEBUG keeps every query's SQL, which is not the job's memory
+            with override_settings(DEBUG=False):
+                summary = reconcile_media(grace=timedelta(0), dry_run=True, batch_size=settings.MEDIA_GC_BATCH_SIZE)
+            seconds = time.perf_counter() - started
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        finally:
+            for path in dirs:
+                shutil.rmtree(path)
+        results[str(files)] = {
+            "scanned": summary["scanned"],
+            "orphans": summary["files"]["orphan"],
+            "seconds": round(seconds, 2),
+            "files_per_s": round(summary["scanned"] / seconds),
+            "peak_memory_mb": round(peak_mb, 2),
+        }
+
+    report("reconcile", results, batch_size=settings.MEDIA_GC_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+JSON encode/decode: DRF's stdlib JSONRenderer/JSONParser vs the orjson pair.
+
+    python -m benchmarks.seed --products 20000 --videos-per-product 1
+    python -m benchmarks.renderers --rows 20,1000 --repeat 50
+
+Payloads are real product list pages (``ProductSerializer`` output with
+nested videos, as ``/api/products/`` returns them) and, for decoding, bulk
+create bodies built from the same rows. Reports per-payload time and MB/s.
+"""
+import argparse
+import io
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from apps.core.parsers import FastJSONParser  # noqa: E402
+from apps.core.renderers import FastJSONRenderer, orjson  # noqa: E402
+from apps.products.models import Product  # noqa: E402
+from apps.products.serializers import ProductSerializer  # noqa: E402
+
+WRITE_FIELDS = ("category", "title", "description", "price", "status")
+
+
+def time_calls(func, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(payload)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(samples, size):
+    best = min(samples)
+    return {
+        "p50_ms": round(percentiles(samples, (50,))["p50"] * 1000, 3),
+        "min_ms": round(best * 1000, 3),
+        "mb_per_s": round(size / best / (1024 * 1024), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="20,1000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    stdlib, fast = JSONRenderer(), FastJSONRenderer()
+    results = {}
+    for rows in map(int, args.rows.split(",")):
+        products = Product.objects.select_related("created_by", "updated_by").prefetch_related("videos")[:rows]
+        page = {"count": rows, "next": None, "previous": None, "results": ProductSerializer(products, many=True).data}
+        body = stdlib.render(page)
+        assert fast.render(page) == body, "renderers disagree"
+
+        bulk = stdlib.render([{field: item[field] for field in WRITE_FIELDS} for item in page["results"]])
+        decoded = JSONParser().parse(io.BytesIO(bulk))
+        assert FastJSONParser().parse(io.BytesIO(bulk)) == decoded, "parsers disagree"
+
+        results[f"{rows}_rows"] = {
+            "page_bytes": len(body),
+            "encode": {
+                "stdlib": summarize(time_calls(stdlib.render, page, args.repeat), len(body)),
+                "fast": summarize(time_calls(fast.render, page, args.repeat), len(body)),
+            },
+            "decode": {
+                "stdlib": summarize(
+                    time_calls(lambda data: JSONParser().parse(io.BytesIO(data)), bulk, args.repeat), len(bulk)
+                ),
+                "fast": summarize(
+                    time_calls(lambda data: FastJSONParser().parse(io.BytesIO(data)), bulk, args.repeat), len(bulk)
+                ),
+            },
+        }
+
+    report("renderers", results, repeat=args.repeat, orjson=getattr(orjson, "__version__", None))
+
+
+if __name__ == "__main__":
+    main()
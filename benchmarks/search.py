@@ -0,0 +1,83 @@
+"""
+Search latency: DRF ``icontains`` (LIKE '%term%') vs the FTS5 index.
+
+    python -m benchmarks.seed --products 200000
+    python -m benchmarks.search --repeat 20 --terms turbo,"smart wave",zen
+
+For each term and model, times the first page (20 rows) plus the ``count()``
+the paginator runs, the same work ``/api/products/?search=`` does.
+"""
+import argparse
+import time
+from functools import reduce
+from operator import and_, or_
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.db.models import Q  # noqa: E402
+
+from apps.products.models import Category, Product  # noqa: E402
+from apps.products.search import fts_available, full_text_search  # noqa: E402
+
+SEARCH_FIELDS = {Product: ("title", "description"), Category: ("name",)}
+
+
+def like_search(queryset, terms):
+    fields = SEARCH_FIELDS[queryset.model]
+    return queryset.filter(
+        reduce(and_, (reduce(or_, (Q(**{f"{field}__icontains": term}) for field in fields)) for term in terms))
+    ).order_by("-created_at")
+
+
+def time_query(build, repeat):
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        qs = build()
+        rows = qs.count()
+        list(qs[:20])
+        samples.append((time.perf_counter() - start) * 1000)
+    return rows, samples
+
+
+def summarize(rows, samples):
+    return {
+        "matches": rows,
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        **{f"{key}_ms": round(value, 3) for key, value in percentiles(samples, (50, 95)).items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--terms", default="turbo,smart wave,zen,number 12")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for model in (Product, Category):
+        if not fts_available(model):
+            raise SystemExit(f"No FTS index for {model.__name__}: run migrations on SQLite first.")
+        base = model.objects.filter(is_deleted=False)
+        for term in args.terms.split(","):
+            terms = term.split()
+            like_rows, like = time_query(lambda: like_search(base, terms), args.repeat)
+            fts_rows, fts = time_query(lambda: full_text_search(base, terms), args.repeat)
+            results[f"{model.__name__}:{term}"] = {
+                "like": summarize(like_rows, like),
+                "fts": summarize(fts_rows, fts),
+                "speedup_p50": round(percentiles(like, (50,))["p50"] / percentiles(fts, (50,))["p50"], 2),
+            }
+    report(
+        "search",
+        results,
+        rows={"products": Product.objects.count(), "categories": Category.objects.count()},
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Seed a reproducible benchmark catalog.
+
+    python -m benchmarks.seed --users 50 --categories 200 --products 20000 \
+        --videos-per-product 1 --seed 42
+
+Rows are bulk inserted into the configured database (SQLite by default) and
+are tagged so ``--flush`` can remove a previous run: users get an
+``@bench.local`` email, categories a ``bench-`` name prefix. Two fixed
+accounts are always created for the load test, both with password
+``BENCH_PASSWORD``: ``agent@bench.local`` (end user) and ``staff@bench.local``.
+Video rows point at small files written under ``MEDIA_ROOT`` (skip them with
+``--video-bytes 0``; the rows are still created).
+"""
+import argparse
+import os
+import random
+import time
+from decimal import Decimal
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import transaction  # noqa: E402
+
+from apps.products.models import Category, Product, ProductVideo  # noqa: E402
+from apps.products.stats import rebuild as rebuild_stats  # noqa: E402
+from apps.user.constants import UserRoles  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+BENCH_DOMAIN = "bench.local"
+BENCH_PASSWORD = "benchpass123"
+CATEGORY_PREFIX = "bench-"
+WORDS = (
+    "alpha bravo classic deluxe eco flex giga hyper iron jet kilo lite mega nano "
+    "omni prime quad retro smart turbo ultra vivid wave xeno young zen"
+).split()
+BATCH_SIZE = 1000
+
+
+def flush():
+    # the catalog managers soft-delete on delete(); seeded rows are removed for real
+    ProductVideo.objects.filter(product__category__name__startswith=CATEGORY_PREFIX).hard_delete()
+    Product.objects.filter(category__name__startswith=CATEGORY_PREFIX).hard_delete()
+    Category.objects.filter(name__startswith=CATEGORY_PREFIX).hard_delete()
+    User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+
+
+def seed_users(count, password):
+    users = [
+        User(
+            email=f"{name}@{BENCH_DOMAIN}",
+            username=f"bench_{name}",
+            phone=phone,
+            password=password,
+            role=role,
+            is_staff=role == UserRoles.STAFF,
+            is_verified=True,
+        )
+        for name, phone, role in [
+            ("agent", "7000000000", UserRoles.END_USER),
+            ("staff", "7000000001", UserRoles.STAFF),
+        ]
+    ]
+    users += [
+        User(
+            email=f"user{i}@{BENCH_DOMAIN}",
+            username=f"bench_user{i}",
+            phone=f"{7100000000 + i}",
+            password=password,
+            is_verified=True,
+        )
+        for i in range(count)
+    ]
+    User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+    return list(User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").values_list("id", flat=True))
+
+
+def seed_categories(count, user_ids, rng):
+    categories = []
+    for i in range(count):
+        owner = rng.choice(user_ids)
+        categories.append(
+            Category(
+                name=f"{CATEGORY_PREFIX}{rng.choice(WORDS)}-{i}",
+                user_id=owner,
+                created_by_id=owner,
+                updated_by_id=owner,
+            )
+        )
+    Category.objects.bulk_create(categories, batch_size=BATCH_SIZE)
+    return list(Category.objects.filter(name__startswith=CATEGORY_PREFIX).values_list("id", flat=True))
+
+
+def seed_products(count, category_ids, user_ids, rng):
+    statuses = [value for value, _ in Product.STATUS_CHOICES]
+    batch = []
+    for i in range(count):
+        owner = rng.choice(user_ids)
+        words = rng.sample(WORDS, 3)
+        batch.append(
+            Product(
+                category_id=rng.choice(category_ids),
+                title=f"{' '.join(words).title()} {i}"[:50],
+                description=f"{words[0]} {words[1]} product number {i} in the benchmark catalog",
+                price=Decimal(rng.randint(100, 500_000)) / 100,
+                status=rng.choice(statuses),
+                created_by_id=owner,
+                updated_by_id=owner,
+            )
+        )
+        if len(batch) == BATCH_SIZE:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+    return Product.objects.filter(category_id__in=category_ids).values_list("id", flat=True)
+
+
+def seed_videos(product_ids, per_product, video_bytes):
+    payload = b"\0" * video_bytes
+    batch = []
+    created = 0
+    for product_id in product_ids.iterator(chunk_size=BATCH_SIZE):
+        for n in range(per_product):
+            name = f"products/{product_id}/videos/bench-{n}.mp4"
+            if video_bytes:
+                path = os.path.join(settings.MEDIA_ROOT, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as fh:
+                    fh.write(payload)
+            batch.append(ProductVideo(product_id=product_id, file=name))
+        if len(batch) >= BATCH_SIZE:
+            ProductVideo.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    ProductVideo.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--videos-per-product", type=int, default=1)
+    parser.add_argument("--video-bytes", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=42, help="random seed; same seed, same catalog")
+    parser.add_argument("--flush", action="store_true", help="remove previously seeded rows first")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings = {}
+    started = time.perf_counter()
+    with transaction.atomic():
+        if args.flush:
+            flush()
+            timings["flush_s"] = round(time.perf_counter() - started, 3)
+
+        step = time.perf_counter()
+        user_ids = seed_users(args.users, make_password(BENCH_PASSWORD))
+        timings["users_s"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        category_ids = seed_categories(args.categories, user_ids, rng)
+        timings["categories_s"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        product_ids = seed_products(args.products, category_ids, user_ids, rng)
+        timings["products_s"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        videos = seed_videos(product_ids, args.videos_per_product, args.video_bytes) if args.videos_per_product else 0
+        timings["videos_s"] = round(time.perf_counter() - step, 3)
+
+        # bulk inserts send no signals
+        step = time.perf_counter()
+        rebuild_stats(category_ids)
+        timings["stats_s"] = round(time.perf_counter() - step, 3)
+
+    timings["total_s"] = round(time.perf_counter() - started, 3)
+    report(
+        "seed",
+        timings,
+        seed=args.seed,
+        rows={"users": len(user_ids), "categories": len(category_ids), "products": args.products, "videos": videos},
+    )
+
+
+if __name__ == "__main__":
+    main()
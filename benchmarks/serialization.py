@@ -0,0 +1,83 @@
+"""
+List serialization: DRF serializers vs the ``.values()`` fast path.
+
+    python -m benchmarks.seed --products 20000 --videos-per-product 1
+    python -m benchmarks.serialization --rows 1000,10000 --repeat 5
+
+Calls the product and category ``list`` views with pagination off and the
+queryset cut to ``--rows``, once with ``FAST_LIST_SERIALIZATION`` off
+(serializer instances) and once on, and times view + JSON rendering (the
+fast path streams unpaginated arrays). Both modes are checked to render the
+same bytes.
+"""
+import argparse
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from apps.products.views import CategoryViewSet, ProductViewSet  # noqa: E402
+from apps.user.models import User  # noqa: E402
+
+
+def limited(viewset, rows):
+    class Limited(viewset):
+        pagination_class = None
+
+        def filter_queryset(self, queryset):
+            return super().filter_queryset(queryset)[:rows]
+
+    return Limited.as_view({"get": "list"})
+
+
+def run(view, user, fast):
+    request = APIRequestFactory().get("/")
+    force_authenticate(request, user)
+    with override_settings(FAST_LIST_SERIALIZATION=fast):
+        started = time.perf_counter()
+        response = view(request)
+        if response.streaming:
+            content = b"".join(response.streaming_content)
+        else:
+            content = response.render().content
+        return time.perf_counter() - started, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    user = User.objects.order_by("id").first()
+    results = {}
+    for label, viewset in (("products", ProductViewSet), ("categories", CategoryViewSet)):
+        for rows in map(int, args.rows.split(",")):
+            view = limited(viewset, rows)
+            timings = {}
+            bodies = {}
+            for mode, fast in (("serializer", False), ("values", True)):
+                samples = []
+                for _ in range(args.repeat):
+                    seconds, bodies[mode] = run(view, user, fast)
+                    samples.append(seconds * 1000)
+                timings[mode] = {
+                    "min_ms": round(min(samples), 2),
+                    **{f"{k}_ms": round(v, 2) for k, v in percentiles(samples, (50,)).items()},
+                }
+            results[f"{label}.{rows}"] = {
+                **timings,
+                "speedup": round(timings["serializer"]["p50_ms"] / timings["values"]["p50_ms"], 2),
+                "identical": bodies["serializer"] == bodies["values"],
+                "response_bytes": len(bodies["values"]),
+            }
+
+    report("serialization", results, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
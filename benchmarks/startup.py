@@ -0,0 +1,105 @@
+"""
+Startup: time to first request of a web process and boot time of a worker.
+
+    python -m benchmarks.startup --runs 5
+
+Each run is a fresh interpreter. ``web`` loads the WSGI application and
+serves ``GET /api/products/`` (401 without a token, but routing,
+middleware, DRF and the authentication classes are all loaded):
+``boot_s`` is until the application is ready, ``first_request_s`` until
+the response is complete, ``process_s`` the whole process as seen from
+outside. ``worker`` imports the Celery app and loads Django and the task
+modules as ``celery worker`` does before consuming, under each settings
+module of ``--worker-settings``. Medians over ``--runs``. ``imports`` sums
+the ``-X importtime`` self time of a web process per top-level package.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks import report
+
+WEB = """
+import io, json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cp360_config.settings")
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": "/api/products/", "SERVER_NAME": "localhost", "SERVER_PORT": "80",
+    "SERVER_PROTOCOL": "HTTP/1.1", "HTTP_HOST": "localhost", "REMOTE_ADDR": "127.0.0.1",
+    "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr, "wsgi.url_scheme": "http",
+}
+statuses = []
+b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({"boot_s": booted - started, "first_request_s": done - started, "status": statuses[0]}))
+"""
+
+WORKER = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+from cp360_config.celery import app
+app.loader.import_default_modules()
+print(json.dumps({"boot_s": time.perf_counter() - started, "tasks": len(app.tasks), "modules": len(sys.modules)}))
+"""
+
+
+def run(script, *args, flags=()):
+    started = time.perf_counter()
+    done = subprocess.run(
+        [sys.executable, *flags, "-c", script, *args], capture_output=True, text=True, env=os.environ, check=True
+    )
+    result = json.loads(done.stdout.splitlines()[-1])
+    result["process_s"] = time.perf_counter() - started
+    return result, done.stderr
+
+
+def medians(results):
+    summary = {}
+    for key, value in results[0].items():
+        if isinstance(value, float):
+            summary[key] = round(statistics.median(result[key] for result in results), 4)
+        else:
+            summary[key] = value
+    return summary
+
+
+def import_breakdown(stderr, top):
+    packages, total = Counter(), 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, _, name = line.split(":", 1)[1].split("|")
+        packages[name.strip().split(".")[0]] += int(own)
+        total += int(own)
+    return {"total_ms": round(total / 1000, 1), **{name: round(us / 1000, 1) for name, us in packages.most_common(top)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="packages listed in the import breakdown")
+    parser.add_argument("--worker-settings", default="cp360_config.settings,cp360_config.settings_worker")
+    args = parser.parse_args()
+
+    results = {"web": medians([run(WEB)[0] for _ in range(args.runs)]), "worker": {}}
+    for module in args.worker_settings.split(","):
+        try:
+            results["worker"][module] = medians([run(WORKER, module)[0] for _ in range(args.runs)])
+        except subprocess.CalledProcessError as exc:
+            results["worker"][module] = {"error": exc.stderr.strip().splitlines()[-1]}
+    results["imports"] = import_breakdown(run(WEB, flags=["-X", "importtime"])[1], args.top)
+
+    report("startup", results, runs=args.runs)
+
+
+if __name__ == "__main__":
+    main()
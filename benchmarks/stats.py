@@ -0,0 +1,107 @@
+"""
+Catalog stats: the summary table against aggregating the catalog per request.
+
+    python -m benchmarks.stats --repeat 50
+
+``aggregate`` computes what ``GET /api/stats/`` returns straight from the
+product and video tables (two grouped queries over every live row);
+``summary`` reads the precomputed rows, as the endpoint does. ``writes``
+times a product save with and without its stats row update, in a
+transaction that is rolled back. Needs a seeded catalog
+(``python -m benchmarks.seed``).
+"""
+import argparse
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.db import transaction  # noqa: E402
+from django.db.models import Count, Max, Min, Sum  # noqa: E402
+from django.db.models.signals import post_save  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from apps.products import signals  # noqa: E402
+from apps.products.models import CategoryStats, Product, ProductVideo  # noqa: E402
+from apps.products.stats import summary  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def aggregate():
+    products = list(
+        Product.objects.filter(is_deleted=False)
+        .values("category_id", "status")
+        .order_by()
+        .annotate(count=Count("id"), total=Sum("price"), low=Min("price"), high=Max("price"))
+    )
+    videos = list(
+        ProductVideo.objects.filter(is_deleted=False, product__is_deleted=False)
+        .values("product__category_id", "product__status")
+        .order_by()
+        .annotate(count=Count("id"), size=Sum("size"))
+    )
+    return products, videos
+
+
+def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {key: round(value, 3) for key, value in percentiles(samples, (50, 95)).items()}
+
+
+def time_saves(products, price):
+    started = time.perf_counter()
+    for product in products:
+        product.price = price
+        product.save(update_fields=["price"])
+    return round((time.perf_counter() - started) * 1000 / len(products), 3)
+
+
+def time_writes(products):
+    timings = {}
+    try:
+        with transaction.atomic():
+            timings["save_with_stats_ms"] = time_saves(products, "1.00")
+            post_save.disconnect(signals.update_product_stats, sender=Product)
+            try:
+                timings["save_ms"] = time_saves(products, "2.00")
+            finally:
+                post_save.connect(signals.update_product_stats, sender=Product)
+            raise Rollback
+    except Rollback:
+        pass
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--products", type=int, default=500, help="products saved for the write timings")
+    args = parser.parse_args()
+
+    products = list(Product.objects.filter(is_deleted=False)[: args.products])
+    if not products:
+        raise SystemExit("No products: run python -m benchmarks.seed first")
+    with override_settings(DEBUG=False):
+        results = {
+            "aggregate_ms": timed(aggregate, args.repeat),
+            "summary_ms": timed(summary, args.repeat),
+            "writes": time_writes(products),
+        }
+    report(
+        "stats",
+        results,
+        products=Product.objects.filter(is_deleted=False).count(),
+        stats_rows=CategoryStats.objects.count(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Throttling: per-client buckets and slots under load, against one shared limit.
+
+    python -m benchmarks.throttle --seconds 2 --greedy-threads 16 --clients 4
+
+One greedy client runs ``--greedy-threads`` threads and ``--clients``
+others one thread each, all calling as fast as they can. ``tokens`` takes
+from token buckets at ``--rate``: ``per_client`` gives each client its
+own bucket (``RoleRateThrottle``), ``shared`` one bucket for everyone, as a
+global limit would. ``slots`` holds concurrency places for ``--hold-ms``:
+``per_client`` caps each client at 2 of 8, ``shared`` only caps the total.
+``fairness`` is Jain's index over what each client got (1.0 is an even
+split). ``take_us`` is the cost of one bucket update on the configured
+``THROTTLE_CACHE``.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import percentiles, report, setup_django
+
+setup_django()
+
+from django.conf import settings  # noqa: E402
+
+from apps.core.throttling import ConcurrencySlot, parse_rate, take, throttle_cache  # noqa: E402
+
+
+def fairness(counts):
+    return round(sum(counts) ** 2 / (len(counts) * sum(c * c for c in counts)), 3) if any(counts) else None
+
+
+def run(clients, work, seconds):
+    served = {client: 0 for client in clients}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def loop(client):
+        mine = 0
+        while time.monotonic() < stop:
+            mine += work(client)
+        with lock:
+            served[client] += mine
+
+    threads = [threading.Thread(target=loop, args=(c,)) for c, n in clients.items() for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"served": served, "fairness": fairness(list(served.values()))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=2)
+    parser.add_argument("--greedy-threads", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rate", default="50/s")
+    parser.add_argument("--hold-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    clients = {"greedy": args.greedy_threads, **{f"client{i}": 1 for i in range(args.clients)}}
+    capacity, period = parse_rate(args.rate)
+    throttle_cache().clear()
+
+    samples = []
+    for i in range(5000):
+        started = time.perf_counter()
+        take(f"bench:overhead:{i % 50}", 10**9, 1)
+        samples.append((time.perf_counter() - started) * 1e6)
+
+    results = {"take_us": {key: round(value, 1) for key, value in percentiles(samples, (50, 99)).items()}}
+    results["tokens"] = {
+        "per_client": run(clients, lambda c: take(f"bench:tokens:{c}", capacity, period) == 0, args.seconds),
+        "shared": run(clients, lambda c: take("bench:tokens:all", capacity, period) == 0, args.seconds),
+    }
+
+    def slots(per_client):
+        limits = {"per_client": per_client, "total": 8, "queue_seconds": 0, "retry_after": 1, "lease_seconds": 60}
+
+        def work(client):
+            slot = ConcurrencySlot("bench", client, limits)
+            if not slot.try_acquire():
+                time.sleep(0.0005)
+                return 0
+            time.sleep(args.hold_ms / 1000)
+            slot.release()
+            return 1
+
+        return work
+
+    results["slots"] = {
+        "per_client": run(clients, slots(2), args.seconds),
+        "shared": run(clients, slots(8), args.seconds),
+    }
+    throttle_cache().clear()
+
+    report("throttle", results, cache=settings.CACHES[settings.THROTTLE_CACHE]["BACKEND"], rate=args.rate,
+           seconds=args.seconds, clients=clients)
+
+
+if __name__ == "__main__":
+    main()
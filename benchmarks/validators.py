@@ -0,0 +1,181 @@
+"""
+Microbenchmarks for the request validators.
+
+    python -m benchmarks.validators [--number 100000] [--batch 1000] [--seeded 10000]
+
+Each validator is timed against the previous implementation (pattern given
+as a string, list of allowed values rebuilt per call) on a mix of valid and
+invalid input. ``user_records`` validates a batch of registrations, half of
+them taken, against ``--seeded`` users: ``validate_user_records`` with its
+per-field uniqueness queries versus the register serializer's validators
+record by record, with a ``validate_unique_field`` query per unique field.
+The seeded users are deleted afterwards.
+"""
+import argparse
+import timeit
+
+from benchmarks import report, setup_django
+
+setup_django()
+
+from rest_framework import serializers  # noqa: E402
+
+from apps.products.models import Product  # noqa: E402
+from apps.products.serializers import ProductSerializer  # noqa: E402
+from apps.user.constants import UserRoles  # noqa: E402
+from apps.user.models import User  # noqa: E402
+from apps.user.validation import (  # noqa: E402
+    USER_FIELD_VALIDATORS,
+    USER_UNIQUE_FIELDS,
+    validate_email_format,
+    validate_role_choice,
+    validate_unique_field,
+    validate_user_records,
+    validate_username_format,
+)
+
+EMAILS = ["jane.doe@example.com", "bad@@example", "x_y+z@sub.domain.org", "no-at-sign"]
+USERNAMES = ["jane.doe", "_bad", "user-123", "a" * 40]
+ROLES = [UserRoles.END_USER, UserRoles.ADMIN, "owner", UserRoles.STAFF]
+STATUSES = [Product.STATUS_SUCCESS, "archived", Product.STATUS_UPLOADED, Product.STATUS_CANCELLED]
+
+
+def legacy_email(value):
+    import re
+    pattern = r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$"
+    if not re.match(pattern, value):
+        raise serializers.ValidationError("Invalid email format.")
+    return value
+
+
+def legacy_username(value):
+    import re
+    if len(value) > 50:
+        raise serializers.ValidationError("Username must be ≤ 50 characters.")
+    if not re.match(r"^[A-Za-z0-9][A-Za-z0-9._-]*$", value):
+        raise serializers.ValidationError("Invalid username.")
+    return value
+
+
+def legacy_role(value):
+    allowed = [choice[0] for choice in UserRoles.CHOICES]
+    if value not in allowed:
+        raise serializers.ValidationError("Invalid role selection.")
+    return value
+
+
+def legacy_status(value):
+    allowed = [st[0] for st in Product.STATUS_CHOICES]
+    if value not in allowed:
+        raise serializers.ValidationError(f"Invalid status. Allowed: {allowed}")
+    return value
+
+
+def run_all(validator, values):
+    for value in values:
+        try:
+            validator(value)
+        except serializers.ValidationError:
+            pass
+
+
+def per_call_ns(fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return round(best / number * 1e9, 1)
+
+
+PREFIX = "vbench"
+
+
+def seed_users(count):
+    User.objects.bulk_create(
+        (
+            User(
+                email=f"{PREFIX}{i}@example.com",
+                username=f"{PREFIX}{i}",
+                phone=f"{5550000000 + i}",
+                password="!",
+            )
+            for i in range(count)
+        ),
+        batch_size=1000,
+    )
+
+
+def make_records(size, seeded):
+    # the first half of the batch collides with seeded users
+    start = max(0, seeded - size // 2)
+    return [
+        {
+            "email": f"{PREFIX}{i}@example.com" if i % 10 else "broken",
+            "username": f"{PREFIX}{i}",
+            "phone": f"{5550000000 + i}",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "role": UserRoles.END_USER,
+            "password": "secret123",
+        }
+        for i in range(start, start + size)
+    ]
+
+
+def per_record(records):
+    for record in records:
+        failed = set()
+        for field, validator in USER_FIELD_VALIDATORS.items():
+            try:
+                validator(record[field])
+            except serializers.ValidationError:
+                failed.add(field)
+        for field, case_insensitive in USER_UNIQUE_FIELDS:
+            if field in failed:
+                continue
+            try:
+                validate_unique_field(record[field], field, case_insensitive=case_insensitive)
+            except serializers.ValidationError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=100_000, help="calls per validator run")
+    parser.add_argument("--batch", type=int, default=1_000, help="records per batch")
+    parser.add_argument("--seeded", type=int, default=10_000, help="users in the table while validating")
+    args = parser.parse_args()
+
+    cases = {
+        "email": (legacy_email, validate_email_format, EMAILS),
+        "username": (legacy_username, validate_username_format, USERNAMES),
+        "role": (legacy_role, validate_role_choice, ROLES),
+        "product_status": (legacy_status, ProductSerializer().validate_status, STATUSES),
+    }
+    results = {}
+    for name, (legacy, current, values) in cases.items():
+        number = max(1, args.number // len(values))
+        before = per_call_ns(lambda: run_all(legacy, values), number) / len(values)
+        after = per_call_ns(lambda: run_all(current, values), number) / len(values)
+        results[name] = {
+            "legacy_ns_per_call": round(before, 1),
+            "ns_per_call": round(after, 1),
+            "speedup": round(before / after, 2),
+        }
+
+    seed_users(args.seeded)
+    try:
+        records = make_records(args.batch, args.seeded)
+        loop = per_call_ns(lambda: per_record(records), 1)
+        batch = per_call_ns(lambda: validate_user_records(records), 1)
+    finally:
+        User.objects.filter(username__startswith=PREFIX).delete()
+    results["user_records"] = {
+        "records": args.batch,
+        "seeded_users": args.seeded,
+        "per_record_ms_per_batch": round(loop / 1e6, 1),
+        "batch_ms_per_batch": round(batch / 1e6, 1),
+        "speedup": round(loop / batch, 2),
+    }
+    report("validators", results, number=args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,12 @@
-from .celery import app as celery_app
+def __getattr__(name):
+    # Celery takes longer to import than the rest of a web process needs to
+    # boot, so the app is only created when something asks for it: the
+    # worker (``celery -A cp360_config``) or the first task module imported.
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ("celery_app",)
 
+__all__ = ("celery_app",)
@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import celeryd_after_setup
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cp360_config.settings")
 
@@ -10,3 +11,12 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 app.autodiscover_tasks()
 
+
+@celeryd_after_setup.connect
+def consume_profile_queues(sender, instance, **kwargs):
+    """Under ``CELERY_WORKER_PROFILE``, consume its queues unless ``-Q`` picked some."""
+    from django.conf import settings
+
+    queues = instance.app.amqp.queues
+    if settings.WORKER_PROFILE and queues.consume_from is None:
+        queues.select(settings.WORKER_PROFILES[settings.WORKER_PROFILE]["queues"])
@@ -0,0 +1,29 @@
+"""
+Settings for Celery workers:
+
+    DJANGO_SETTINGS_MODULE=cp360_config.settings_worker celery -A cp360_config worker
+
+The web settings minus what only serves HTTP requests: the admin, sessions,
+messages, static files, CORS, JWT and the middleware. Django's system checks
+are skipped at worker start (they load the URLconf, every view and the
+migration graph); run ``manage.py check`` when deploying instead.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+WEB_ONLY_APPS = {
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    "corsheaders",
+    "rest_framework_simplejwt",
+}
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+MIDDLEWARE = []
+
+# read by Celery's Django fixup, after these settings are loaded
+os.environ.setdefault("CELERY_SKIP_CHECKS", "1")
@@ -4,12 +4,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from apps.core.views import AuditLogView, PerformanceMetricsView
+
 
 # URL patterns
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/auth/", include("apps.core.urls")),
     path("api/users/", include("apps.user.urls")),
+    path("api/metrics/", PerformanceMetricsView.as_view(), name="performance-metrics"),
+    path("api/audit/", AuditLogView.as_view(), name="audit-log"),
     path("api/", include("apps.products.urls")),
 ]
 